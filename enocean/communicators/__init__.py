@@ -1,4 +1,14 @@
 ''' Provider for different Communicator -classes for EnOcean. '''
+from enocean.communicators.queues import BoundedQueue, AsyncioBoundedQueue
+from enocean.communicators.dedupe import DuplicateFilter
+from enocean.communicators.scheduler import TransmitScheduler, TokenBucket
 from enocean.communicators.communicator import Communicator
 from enocean.communicators.serialcommunicator import SerialCommunicator
 from enocean.communicators.tcpcommunicator import TCPCommunicator
+from enocean.communicators.asynciocommunicator import AsyncioCommunicator, AsyncioSerialCommunicator, AsyncioTCPCommunicator
+from enocean.communicators.dispatcher import CallbackDispatcher
+from enocean.communicators.router import PacketRouter
+from enocean.communicators.forwarder import TCPForwarder
+from enocean.communicators.aggregator import Aggregator, Reception
+from enocean.communicators.decoder import ProcessPoolDecoder
+from enocean.communicators.tracker import ReplyTracker, TimerWheel
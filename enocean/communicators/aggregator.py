@@ -0,0 +1,120 @@
+# -*- encoding: utf-8 -*-
+from __future__ import print_function, unicode_literals, division, absolute_import
+import time
+import logging
+import threading
+from collections import deque, namedtuple, OrderedDict
+
+from enocean.protocol.packet import RadioPacket
+from enocean.protocol.constants import OVERFLOW
+from enocean.communicators.queues import BoundedQueue
+from enocean.communicators.dedupe import telegram_key
+
+# Packet, and the gateways which received it, as an OrderedDict of gateway -> dBm (None for non-radio packets).
+Reception = namedtuple('Reception', ['packet', 'gateways'])
+
+
+class Aggregator(threading.Thread):
+    '''
+    Merges the packets received by several communicators (gateways) into one stream.
+
+    The same radio telegram is often received by more than one gateway.
+    Telegrams with the same packet type and data (including the sender and status, but not the repeater count,
+    see telegram_key()) received within `window` seconds are merged into one Reception,
+    with the packet received with the best signal (dBm), and the signal strength of each gateway,
+    which received the telegram.
+    Receptions are put to the `receive` queue (limited by `receive_size` and `receive_overflow`),
+    or passed to the callback, after the window has passed.
+    Other packets (RESPONSE, EVENT etc.) are passed on right away.
+
+        aggregator = Aggregator()
+        aggregator.start()
+        SerialCommunicator('/dev/ttyUSB0', callback=aggregator.receiver('USB0')).start()
+        SerialCommunicator('/dev/ttyUSB1', callback=aggregator.receiver('USB1')).start()
+        reception = aggregator.receive.get()
+    '''
+    logger = logging.getLogger('enocean.communicators.Aggregator')
+
+    def __init__(self, callback=None, window=0.1, receive_size=0, receive_overflow=OVERFLOW.DROP_OLDEST):
+        super(Aggregator, self).__init__()
+        self.daemon = True
+        self.window = window
+        self.receive = BoundedQueue(receive_size, receive_overflow)
+        self.__callback = callback
+        # Counters
+        self.received = 0
+        self.duplicates = 0
+        # Telegrams waiting for the window to pass, indexed by (packet type, data),
+        # and as [deadline, key, packet, gateways] -lists in the order they were received.
+        self._pending = {}
+        self._order = deque()
+        self._condition = threading.Condition()
+        self._stop_flag = threading.Event()
+
+    def receiver(self, gateway):
+        ''' Returns the callback for the communicator of `gateway` (any hashable name or id) '''
+        return lambda packet: self.add(gateway, packet)
+
+    def add(self, gateway, packet):
+        ''' Add the packet received by the gateway '''
+        if not isinstance(packet, RadioPacket):
+            self._emit(Reception(packet, OrderedDict([(gateway, None)])))
+            return
+
+        key = telegram_key(packet)
+        now = time.time()
+        with self._condition:
+            self.received += 1
+            entry = self._pending.get(key)
+            if entry is None:
+                entry = [now + self.window, key, packet, OrderedDict([(gateway, packet.dBm)])]
+                self._pending[key] = entry
+                self._order.append(entry)
+                if len(self._order) == 1:
+                    self._condition.notify()
+                return
+
+            self.duplicates += 1
+            gateways = entry[3]
+            if gateway not in gateways or packet.dBm > gateways[gateway]:
+                gateways[gateway] = packet.dBm
+            if packet.dBm > entry[2].dBm:
+                entry[2] = packet
+
+    def _emit(self, reception):
+        if self.__callback is None:
+            self.receive.put(reception)
+            return
+        try:
+            self.__callback(reception)
+        except Exception:
+            self.logger.exception('Exception in callback')
+
+    def _expired(self, now):
+        ''' Returns the receptions, whose window has passed, call with the condition held '''
+        receptions = []
+        while self._order and self._order[0][0] <= now:
+            _, key, packet, gateways = self._order.popleft()
+            del self._pending[key]
+            receptions.append(Reception(packet, gateways))
+        return receptions
+
+    def stop(self):
+        ''' Stop the thread, passing on the telegrams waiting '''
+        self._stop_flag.set()
+        with self._condition:
+            self._condition.notify()
+
+    def run(self):
+        while True:
+            with self._condition:
+                stopped = self._stop_flag.is_set()
+                if not stopped:
+                    timeout = self._order[0][0] - time.time() if self._order else None
+                    if timeout is None or timeout > 0:
+                        self._condition.wait(timeout)
+                receptions = self._expired(float('inf') if stopped else time.time())
+            for reception in receptions:
+                self._emit(reception)
+            if stopped:
+                break
@@ -0,0 +1,412 @@
+# -*- encoding: utf-8 -*-
+from __future__ import print_function, unicode_literals, division, absolute_import
+import os
+import errno
+import asyncio
+import logging
+import datetime
+from collections import deque, OrderedDict
+
+import serial
+
+from enocean.protocol.packet import Packet, UTETeachInPacket
+from enocean.protocol.framer import PacketFramer
+from enocean.protocol.constants import PACKET, PARSE_RESULT, RETURN_CODE, OVERFLOW
+from enocean.communicators.queues import AsyncioBoundedQueue
+from enocean.communicators.dedupe import DuplicateFilter
+
+
+class AsyncioCommunicator(asyncio.Protocol):
+    '''
+    asyncio communicator base-class for EnOcean.
+    Not to be used directly, only serves as base class for AsyncioSerialCommunicator etc.
+
+    Received packets are iterated with `async for packet in communicator`,
+    or passed to the callback, which is called in the event loop.
+    The module answers every sent packet with a RESPONSE, in the order the packets were sent,
+    so send() returns a future, which resolves to the matching RESPONSE -packet.
+    Create the communicator in the event loop it's used in.
+
+    The receive queue is unbounded by default, `receive_size` limits the number of packets queued.
+    When the queue is full, the oldest packet is dropped (OVERFLOW.DROP_OLDEST),
+    the new packet is dropped (OVERFLOW.DROP_NEWEST),
+    or reading is paused until a packet is taken from the queue (OVERFLOW.BLOCK).
+    Dropped packets are counted in `receive.dropped`, the largest number of packets queued in `receive.high_water`.
+    With `dedupe_window` set, radio telegrams received again within the window are dropped, as in Communicator.
+    With `registry` set, telegrams of known devices are decoded and teach-ins are registered, as in Communicator.
+    '''
+    logger = logging.getLogger('enocean.communicators.AsyncioCommunicator')
+
+    # Seconds to wait for the RESPONSE to a packet, the module should respond within 500 ms.
+    response_timeout = 1.0
+
+    def __init__(self, callback=None, teach_in=True, receive_size=0, receive_overflow=OVERFLOW.DROP_OLDEST,
+                 dedupe_window=0, registry=None):
+        self._loop = None
+        self._transport = None
+        # Input buffer
+        self._buffer = PacketFramer()
+        # Received packets, None marks the end of the stream.
+        self.receive = AsyncioBoundedQueue(receive_size, receive_overflow,
+                                           on_drop=self._receive_dropped, on_space=self._resume)
+        # Duplicate filter, None if disabled
+        self.dedupe = DuplicateFilter(dedupe_window) if dedupe_window else None
+        # Device registry, None if disabled
+        self.registry = registry
+        # Is reading paused, because the receive queue is full?
+        self._paused = False
+        # Has the connection been lost, and has the end of the stream been queued?
+        self._eof = False
+        self._eof_queued = False
+        # Futures waiting for a RESPONSE, in the order the packets were sent, as (future, deadline) -tuples.
+        # Deadlines are in the (monotonic) time of the event loop, as the expiry is scheduled by it.
+        self._responses = deque()
+        # Running tasks responding to UTE teach-in, referenced until they're done.
+        self._tasks = set()
+        # Set the callback method
+        self.__callback = callback
+        # Internal variable for the Base ID of the module.
+        self._base_id = None
+        self._base_id_request = None
+        # Should new messages be learned automatically? Defaults to True.
+        self.teach_in = teach_in
+
+    async def open(self):
+        ''' Open the connection to the module '''
+        raise NotImplementedError
+
+    def close(self):
+        if self._transport is not None:
+            self._transport.close()
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        self.close()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._eof and not self._paused and self.receive.empty():
+            raise StopAsyncIteration
+        packet = await self.receive.get()
+        if packet is None:
+            # Keep the marker in the queue, so all iterators stop.
+            self.receive.put_nowait(None)
+            raise StopAsyncIteration
+        return packet
+
+    def _resume(self):
+        ''' Continue parsing, and reading, after space has been made in the receive queue '''
+        if not self._paused:
+            return
+        self._paused = False
+        self.parse()
+        if not self._paused:
+            if self._transport is not None:
+                self._transport.resume_reading()
+            self._end_of_stream()
+
+    def _end_of_stream(self):
+        ''' Queue the end of stream marker, after the packets received before losing the connection '''
+        if self._eof and not self._eof_queued and not self._paused and not self.receive.full():
+            self._eof_queued = True
+            self.receive.put_nowait(None)
+
+    def _receive_dropped(self, packet):
+        # Log only the first drop of each overflow, to avoid flooding the log.
+        if self.receive.dropped == 1 or self.receive.qsize() < self.receive.maxsize:
+            self.logger.warning('Receive queue full, packets dropped (%d in total).', self.receive.dropped)
+
+    def connection_made(self, transport):
+        self._loop = asyncio.get_event_loop()
+        self._transport = transport
+
+    def connection_lost(self, exc):
+        if exc is not None:
+            self.logger.error('Connection lost: %s', exc)
+        self._transport = None
+        while self._responses:
+            self._responses.popleft()[0].cancel()
+        self._eof = True
+        self._end_of_stream()
+
+    def data_received(self, data):
+        self._buffer.extend(data)
+        self.parse()
+
+    def send(self, packet):
+        '''
+        Write the packet to the module.
+        Returns a future, which resolves to the RESPONSE -packet sent by the module.
+        If no response is received in response_timeout seconds, the future fails with asyncio.TimeoutError.
+        Awaiting the future is optional.
+        '''
+        if not isinstance(packet, Packet):
+            raise TypeError('Object to send must be an instance of Packet')
+        if self._transport is None:
+            raise ConnectionError('Not connected')
+        self.logger.info('Sending packet')
+        self.logger.debug(packet)
+        response = self._loop.create_future()
+        self._responses.append((response, self._loop.time() + self.response_timeout))
+        self._loop.call_later(self.response_timeout, self._expire_responses)
+        self._transport.write(bytes(bytearray(packet.build())))
+        return response
+
+    def send_group(self, packets):
+        '''
+        Write the radio packets (for example from RadioPacket.create_group()).
+        Returns an OrderedDict of destination ID (int) -> future, resolving to the RESPONSE to that packet.
+        '''
+        return OrderedDict((packet.destination_int, self.send(packet)) for packet in packets)
+
+    def parse(self):
+        ''' Parses messages and puts them to receive queue '''
+        # Loop while we get new messages
+        while True:
+            if self.__callback is None and self.receive.overflow == OVERFLOW.BLOCK and self.receive.full():
+                # Leave the rest in the buffer, until there's space in the queue.
+                if not self._paused:
+                    self._paused = True
+                    if self._transport is not None:
+                        self._transport.pause_reading()
+                return PARSE_RESULT.INCOMPLETE
+            status, packet = self._buffer.parse()
+            # If message is incomplete -> break the loop
+            if status == PARSE_RESULT.INCOMPLETE:
+                return status
+
+            # If message is OK, add it to receive queue or send to the callback method
+            if status == PARSE_RESULT.OK and packet:
+                if self.dedupe is not None and self.dedupe.is_duplicate(packet):
+                    self.logger.debug('Duplicate packet dropped')
+                    continue
+                packet.received = datetime.datetime.now()
+
+                if packet.packet_type == PACKET.RESPONSE:
+                    self._resolve_response(packet)
+
+                if isinstance(packet, UTETeachInPacket) and self.teach_in:
+                    self._respond_to_teach_in(packet)
+
+                if self.registry is not None:
+                    if self.teach_in:
+                        self.registry.learn(packet)
+                    self.registry.decode(packet)
+
+                if self.__callback is None:
+                    self.receive.put_nowait(packet)
+                else:
+                    self.__callback(packet)
+                self.logger.debug(packet)
+
+    def _resolve_response(self, packet):
+        self._expire_responses()
+        if not self._responses:
+            self.logger.warning('Received unexpected RESPONSE')
+            return
+        # Futures cancelled by the caller (for example by asyncio.wait_for()) still consume their response.
+        response, _ = self._responses.popleft()
+        if not response.done():
+            response.set_result(packet)
+
+    def _expire_responses(self):
+        ''' Fail requests, whose RESPONSE hasn't been received in time '''
+        if not self._responses:
+            return
+        now = self._loop.time()
+        while self._responses and self._responses[0][1] <= now:
+            response, _ = self._responses.popleft()
+            if not response.done():
+                response.set_exception(asyncio.TimeoutError('No RESPONSE received in time'))
+
+    def _respond_to_teach_in(self, packet):
+        task = asyncio.ensure_future(self._teach_in_response(packet))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _teach_in_response(self, packet):
+        try:
+            base_id = await self.get_base_id()
+        except (asyncio.TimeoutError, asyncio.CancelledError, ConnectionError):
+            base_id = None
+        if base_id is None:
+            self.logger.error('Base ID not available, not responding to UTE teach-in.')
+            return
+        if self._transport is None:
+            return
+        self.logger.info('Sending response to UTE teach-in.')
+        self.send(packet.create_response_packet(base_id))
+
+    async def get_base_id(self):
+        '''
+        Fetches Base ID from the transmitter, if required. Otherwise returns the currently set Base ID.
+        Raises asyncio.TimeoutError, if the module doesn't respond.
+        '''
+        if self._base_id is not None:
+            return self._base_id
+
+        # Concurrent callers share a single CO_RD_IDBASE request.
+        if self._base_id_request is None:
+            self._base_id_request = self.send(Packet(PACKET.COMMON_COMMAND, data=[0x08]))
+        request = self._base_id_request
+        try:
+            packet = await asyncio.shield(request)
+        finally:
+            if self._base_id_request is request:
+                self._base_id_request = None
+        if self._base_id is None and packet.response == RETURN_CODE.OK and len(packet.response_data) == 4:
+            self._base_id = packet.response_data
+        # Return the current Base ID (might be None).
+        return self._base_id
+
+    @property
+    def base_id(self):
+        ''' Returns the currently known Base ID, use get_base_id() to fetch it from the module. '''
+        return self._base_id
+
+    @base_id.setter
+    def base_id(self, base_id):
+        ''' Sets the Base ID manually, only for testing purposes. '''
+        self._base_id = base_id
+
+
+class _SerialTransport(asyncio.Transport):
+    '''
+    Minimal non-blocking transport for a serial port, using the readiness callbacks of the event loop.
+    Only supported on POSIX, where the serial port has a selectable file descriptor.
+    '''
+    logger = logging.getLogger('enocean.communicators.AsyncioSerialCommunicator')
+
+    # Maximum number of bytes read at once.
+    read_size = 1024
+
+    def __init__(self, loop, serial_port, protocol):
+        super(_SerialTransport, self).__init__()
+        self._loop = loop
+        self._serial = serial_port
+        self._fd = serial_port.fileno()
+        self._protocol = protocol
+        self._write_buffer = bytearray()
+        self._closing = False
+        self._loop.add_reader(self._fd, self._read_ready)
+        self._loop.call_soon(self._protocol.connection_made, self)
+
+    def _read_ready(self):
+        try:
+            data = os.read(self._fd, self.read_size)
+        except OSError as exc:
+            if exc.errno in (errno.EAGAIN, errno.EINTR):
+                return
+            self._close(exc)
+            return
+        if not data:
+            # Device disconnected
+            self._close(serial.SerialException('Serial port returned no data (device disconnected?)'))
+            return
+        self._protocol.data_received(data)
+
+    def pause_reading(self):
+        if not self._closing:
+            self._loop.remove_reader(self._fd)
+
+    def resume_reading(self):
+        if not self._closing:
+            self._loop.add_reader(self._fd, self._read_ready)
+
+    def write(self, data):
+        if self._closing:
+            return
+        if not self._write_buffer:
+            # Try writing right away, buffer only what didn't fit.
+            try:
+                written = os.write(self._fd, data)
+            except OSError as exc:
+                if exc.errno not in (errno.EAGAIN, errno.EINTR):
+                    self._close(exc)
+                    return
+                written = 0
+            data = data[written:]
+            if not data:
+                return
+            self._loop.add_writer(self._fd, self._write_ready)
+        self._write_buffer.extend(data)
+
+    def _write_ready(self):
+        try:
+            written = os.write(self._fd, self._write_buffer)
+        except OSError as exc:
+            if exc.errno in (errno.EAGAIN, errno.EINTR):
+                return
+            self._close(exc)
+            return
+        del self._write_buffer[:written]
+        if not self._write_buffer:
+            self._loop.remove_writer(self._fd)
+
+    def get_write_buffer_size(self):
+        return len(self._write_buffer)
+
+    def is_closing(self):
+        return self._closing
+
+    def close(self):
+        self._close(None)
+
+    def _close(self, exc):
+        if self._closing:
+            return
+        self._closing = True
+        self._loop.remove_reader(self._fd)
+        self._loop.remove_writer(self._fd)
+        self._serial.close()
+        self._loop.call_soon(self._protocol.connection_lost, exc)
+
+
+class AsyncioSerialCommunicator(AsyncioCommunicator):
+    '''
+    asyncio serial port communicator class for EnOcean radio, POSIX only.
+    Other keyword arguments (queue size etc.) are passed to AsyncioCommunicator.
+    '''
+    logger = logging.getLogger('enocean.communicators.AsyncioSerialCommunicator')
+
+    def __init__(self, port='/dev/ttyAMA0', callback=None, teach_in=True, baudrate=57600, read_size=1024, **kwargs):
+        super(AsyncioSerialCommunicator, self).__init__(callback, teach_in, **kwargs)
+        self.port = port
+        self.baudrate = baudrate
+        self.read_size = read_size
+
+    async def open(self):
+        loop = asyncio.get_event_loop()
+        serial_port = serial.Serial(self.port, self.baudrate, timeout=0)
+        transport = _SerialTransport(loop, serial_port, self)
+        transport.read_size = self.read_size
+        # Wait for connection_made(), scheduled by the transport.
+        await asyncio.sleep(0)
+        self.logger.info('AsyncioSerialCommunicator started')
+
+
+class AsyncioTCPCommunicator(AsyncioCommunicator):
+    '''
+    asyncio socket communicator class for EnOcean radio.
+
+    Unlike TCPCommunicator, which is a server receiving packets forwarded by clients,
+    this is a client: it connects to a TCP-to-serial bridge (for example ser2net) exposing the module,
+    and both sends and receives through the connection.
+    Other keyword arguments (queue size etc.) are passed to AsyncioCommunicator.
+    '''
+    logger = logging.getLogger('enocean.communicators.AsyncioTCPCommunicator')
+
+    def __init__(self, host='localhost', port=9637, callback=None, teach_in=True, **kwargs):
+        super(AsyncioTCPCommunicator, self).__init__(callback, teach_in, **kwargs)
+        self.host = host
+        self.port = port
+
+    async def open(self):
+        loop = asyncio.get_event_loop()
+        await loop.create_connection(lambda: self, self.host, self.port)
+        self.logger.info('AsyncioTCPCommunicator started')
@@ -1,37 +1,102 @@
 # -*- encoding: utf-8 -*-
 from __future__ import print_function, unicode_literals, division, absolute_import
+import time
 import logging
 import datetime
 
 import threading
+from collections import deque, OrderedDict
+from concurrent.futures import Future, TimeoutError
 try:
     import queue
 except ImportError:
     import Queue as queue
 from enocean.protocol.packet import Packet, UTETeachInPacket
-from enocean.protocol.constants import PACKET, PARSE_RESULT, RETURN_CODE
+from enocean.protocol.framer import PacketFramer
+from enocean.protocol.constants import PACKET, PARSE_RESULT, RETURN_CODE, OVERFLOW
+from enocean.communicators.queues import BoundedQueue
+from enocean.communicators.dedupe import DuplicateFilter
+from enocean.communicators.scheduler import TransmitScheduler
+
+
+class _Request(object):
+    ''' Transmit queue entry of a packet sent with send_command(), waiting for the RESPONSE '''
+    __slots__ = ('packet', 'future', 'timeout', 'deadline', 'written')
+
+    def __init__(self, packet, timeout):
+        self.packet = packet
+        self.future = Future()
+        self.future.set_running_or_notify_cancel()
+        self.timeout = timeout
+        # Time, by which the RESPONSE should be received. Set when the packet is written.
+        self.deadline = None
+        self.written = threading.Event()
 
 
 class Communicator(threading.Thread):
     '''
     Communicator base-class for EnOcean.
     Not to be used directly, only serves as base class for SerialCommunicator etc.
+
+    The receive and transmit queues are unbounded by default.
+    `receive_size` and `transmit_size` limit the number of packets queued,
+    `receive_overflow` and `transmit_overflow` select what happens, when a queue is full (see BoundedQueue).
+    By default the oldest received packet is dropped, and sending waits for space
+    (sending from the communicator thread, for example from a callback, fails instead of waiting).
+    Dropped packets are counted in `receive.dropped` and `transmit.dropped`,
+    the largest number of packets queued in `receive.high_water` and `transmit.high_water`.
+
+    A TransmitScheduler given as `scheduler` replaces the transmit queue (transmit_size and transmit_overflow
+    are ignored), adding priorities and pacing.
+
+    With `dedupe_window` (seconds) set, radio telegrams received again within the window
+    (sub-telegrams, repeated telegrams) are dropped, see DuplicateFilter.
+    The number of duplicates dropped is kept in `dedupe.suppressed`.
+
+    With a DeviceRegistry given as `registry`, radio telegrams of known devices are decoded
+    (Packet.parsed set) before they're passed on, and teach-in telegrams add devices to the registry,
+    if `teach_in` is enabled.
     '''
     logger = logging.getLogger('enocean.communicators.Communicator')
 
-    def __init__(self, callback=None, teach_in=True):
+    # Seconds to wait for the RESPONSE to a command, the module should respond within 500 ms.
+    response_timeout = 1.0
+    # Seconds a command may wait in the transmit queue of a running communicator, before it's given up.
+    transmit_timeout = 5.0
+    # Does the communicator write packets to a module? TCPCommunicator only receives them.
+    transmits = True
+
+    def __init__(self, callback=None, teach_in=True,
+                 receive_size=0, receive_overflow=OVERFLOW.DROP_OLDEST,
+                 transmit_size=0, transmit_overflow=OVERFLOW.BLOCK, dedupe_window=0, scheduler=None,
+                 registry=None):
         super(Communicator, self).__init__()
         # Create an event to stop the thread
         self._stop_flag = threading.Event()
         # Input buffer
-        self._buffer = []
+        self._buffer = PacketFramer()
         # Setup packet queues
-        self.transmit = queue.Queue()
-        self.receive = queue.Queue()
+        if scheduler is None:
+            self.transmit = BoundedQueue(transmit_size, transmit_overflow, on_drop=self._transmit_dropped)
+        else:
+            self.transmit = scheduler
+        self.receive = BoundedQueue(receive_size, receive_overflow, on_drop=self._receive_dropped)
+        # Duplicate filter, None if disabled
+        self.dedupe = DuplicateFilter(dedupe_window) if dedupe_window else None
+        # Device registry, None if disabled
+        self.registry = registry
         # Set the callback method
         self.__callback = callback
         # Internal variable for the Base ID of the module.
         self._base_id = None
+        # Written packets waiting for a RESPONSE, in the order they were written, as (future, deadline) -tuples.
+        # The future is None, if the packet wasn't sent with send_command().
+        self._responses = deque()
+        self._requests_lock = threading.Lock()
+        # Cached results of commands (Base ID, version),
+        # and the requests in progress as (future of the result, _Request) -tuples.
+        self._cache = {}
+        self._cache_requests = {}
         # Should new messages be learned automatically? Defaults to True.
         # TODO: Not sure if we should use CO_WR_LEARNMODE??
         self.teach_in = teach_in
@@ -40,40 +105,135 @@ class Communicator(threading.Thread):
         ''' Get message from send queue, if one exists '''
         try:
             packet = self.transmit.get(block=False)
-            self.logger.info('Sending packet')
-            self.logger.debug(packet)
-            return packet
         except queue.Empty:
-            pass
-        return None
+            return None
 
-    def send(self, packet):
+        request = None
+        if isinstance(packet, _Request):
+            request, packet = packet, packet.packet
+        self.logger.info('Sending packet')
+        self.logger.debug(packet)
+        # The module responds to every packet, in the order they're written.
+        with self._requests_lock:
+            if request is None:
+                self._responses.append((None, time.time() + self.response_timeout))
+            else:
+                request.deadline = time.time() + request.timeout
+                self._responses.append((request.future, request.deadline))
+        if request is not None:
+            request.written.set()
+        return packet
+
+    def send(self, packet, priority=None):
+        '''
+        Queue the packet for sending.
+        `priority` (PRIORITY) is only supported with a TransmitScheduler, ValueError is raised otherwise.
+        Returns False, if the packet isn't valid or the transmit queue is full.
+        '''
         if not isinstance(packet, Packet):
             self.logger.error('Object to send must be an instance of Packet')
             return False
-        self.transmit.put(packet)
-        return True
+        return self._put_to_send_queue(packet, priority)
+
+    def send_command(self, packet, timeout=None, priority=None):
+        '''
+        Send the packet (usually COMMON_COMMAND, SMART_ACK_COMMAND or REMOTE_MAN_COMMAND),
+        returns a concurrent.futures.Future, resolving to the RESPONSE -packet of the module.
+        If no response is received in `timeout` seconds (response_timeout by default) after the packet is written,
+        the future fails with concurrent.futures.TimeoutError.
+        If the packet is dropped from a full transmit queue, the future fails with queue.Full,
+        if the communicator doesn't write packets (TCPCommunicator), with RuntimeError.
+        `priority` is only supported with a TransmitScheduler, as in send().
+        '''
+        if not isinstance(packet, Packet):
+            raise TypeError('Object to send must be an instance of Packet')
+        request = _Request(packet, self.response_timeout if timeout is None else timeout)
+        self._put_to_send_queue(request, priority)
+        return request.future
+
+    def send_group(self, packets, timeout=None, priority=None):
+        '''
+        Send the radio packets (for example from RadioPacket.create_group()) with send_command().
+        Returns an OrderedDict of destination ID (int) -> future, resolving to the RESPONSE of the module to
+        the packet to that destination, to track the completion of each target.
+        With a TransmitScheduler, the packets are paced by it.
+        '''
+        return OrderedDict(
+            (packet.destination_int, self.send_command(packet, timeout, priority))
+            for packet in packets
+        )
+
+    def _put_to_send_queue(self, entry, priority=None):
+        '''
+        Put a packet, or a _Request to send queue, returns False if it was dropped.
+        Requests are queued as such, so the future follows the exact queue entry.
+        '''
+        if priority is not None and not isinstance(self.transmit, TransmitScheduler):
+            raise ValueError('Priority is only supported with a TransmitScheduler')
+        if not self.transmits and isinstance(entry, _Request):
+            # Nothing empties the queue, the RESPONSE would never arrive.
+            entry.future.set_exception(RuntimeError('%s does not transmit packets' % type(self).__name__))
+            return False
+        # The communicator thread empties the queue, so it can't wait for space.
+        block = threading.current_thread() is not self
+        try:
+            if priority is None:
+                return self.transmit.put(entry, block=block)
+            return self.transmit.put(entry, block=block, priority=priority)
+        except queue.Full:
+            self._transmit_dropped(entry)
+            return False
+
+    def _transmit_dropped(self, entry):
+        self.logger.warning('Transmit queue full, packet dropped.')
+        if isinstance(entry, _Request):
+            entry.future.set_exception(queue.Full('Transmit queue full'))
+
+    def _receive_dropped(self, packet):
+        # Log only the first drop of each overflow, to avoid flooding the log.
+        if self.receive.dropped == 1 or self.receive.qsize() < self.receive.maxsize:
+            self.logger.warning('Receive queue full, packets dropped (%d in total).', self.receive.dropped)
+
+    def _send_delay(self):
+        ''' Returns the number of seconds, until the scheduler allows sending the next packet (None, if not waiting) '''
+        delay = getattr(self.transmit, 'delay', None)
+        return None if delay is None else delay()
 
     def stop(self):
         self._stop_flag.set()
 
-    def parse(self):
-        ''' Parses messages and puts them to receive queue '''
+    def parse(self, buffer=None):
+        '''
+        Parses messages and puts them to receive queue.
+        Parses the input buffer by default, communicators with several connections pass their own PacketFramer.
+        '''
+        if buffer is None:
+            buffer = self._buffer
         # Loop while we get new messages
         while True:
-            status, self._buffer, packet = Packet.parse_msg(self._buffer)
+            status, packet = buffer.parse()
             # If message is incomplete -> break the loop
             if status == PARSE_RESULT.INCOMPLETE:
+                self._expire_responses()
                 return status
 
             # If message is OK, add it to receive queue or send to the callback method
             if status == PARSE_RESULT.OK and packet:
+                if self.dedupe is not None and self.dedupe.is_duplicate(packet):
+                    self.logger.debug('Duplicate packet dropped')
+                    continue
                 packet.received = datetime.datetime.now()
 
+                if packet.packet_type == PACKET.RESPONSE:
+                    self._resolve_response(packet)
+
                 if isinstance(packet, UTETeachInPacket) and self.teach_in:
-                    response_packet = packet.create_response_packet(self.base_id)
-                    self.logger.info('Sending response to UTE teach-in.')
-                    self.send(response_packet)
+                    self._respond_to_teach_in(packet)
+
+                if self.registry is not None:
+                    if self.teach_in:
+                        self.registry.learn(packet)
+                    self.registry.decode(packet)
 
                 if self.__callback is None:
                     self.receive.put(packet)
@@ -81,6 +241,152 @@ class Communicator(threading.Thread):
                     self.__callback(packet)
                 self.logger.debug(packet)
 
+    def _respond_to_teach_in(self, packet):
+        '''
+        Queue the response to UTE teach-in, without blocking the parsing.
+        If the Base ID isn't known yet, the response is sent when the Base ID is received.
+        '''
+        def respond(future):
+            base_id = future.result()
+            if base_id is None:
+                self.logger.error('Base ID not available, not responding to UTE teach-in.')
+                return
+            self.logger.info('Sending response to UTE teach-in.')
+            self.send(packet.create_response_packet(base_id))
+
+        self.fetch_base_id().add_done_callback(respond)
+
+    def _resolve_response(self, packet):
+        ''' Pass the RESPONSE to the oldest written packet, waiting for one '''
+        self._expire_responses()
+        with self._requests_lock:
+            if not self._responses:
+                self.logger.warning('Received unexpected RESPONSE')
+                return
+            future, _ = self._responses.popleft()
+        # Cancelled futures still consume their response, to keep the order.
+        if future is not None and not future.done():
+            future.set_result(packet)
+
+    def _expire_responses(self):
+        ''' Fail requests, whose RESPONSE hasn't been received in time '''
+        now = time.time()
+        expired = []
+        with self._requests_lock:
+            while self._responses and self._responses[0][1] < now:
+                expired.append(self._responses.popleft()[0])
+        for future in expired:
+            if future is not None and not future.done():
+                future.set_exception(TimeoutError('No RESPONSE received in time'))
+
+    def _cached_command_future(self, name, packet, parse, timeout=None):
+        '''
+        Returns the cached result of a command as a future, and the _Request (None, if the result is cached).
+        `parse` converts the RESPONSE to the result, returning None if the response isn't valid.
+        The future resolves to None, if no valid response was received.
+        '''
+        with self._requests_lock:
+            if name in self._cache:
+                future = Future()
+                future.set_result(self._cache[name])
+                return future, None
+            # Concurrent callers share a single request.
+            if name in self._cache_requests:
+                return self._cache_requests[name]
+            future = Future()
+            future.set_running_or_notify_cancel()
+            request = _Request(packet, self.response_timeout if timeout is None else timeout)
+            self._cache_requests[name] = (future, request)
+
+        def done(response):
+            result = None
+            try:
+                result = parse(response.result())
+            except TimeoutError:
+                self.logger.warning('No response to %s request', name)
+            except queue.Full:
+                self.logger.warning('%s request was dropped from the transmit queue', name)
+            finally:
+                # The result is cached, even if the caller has stopped waiting for it.
+                with self._requests_lock:
+                    if result is not None:
+                        result = self._cache.setdefault(name, result)
+                    if self._cache_requests.get(name, (None, None))[1] is request:
+                        del self._cache_requests[name]
+                future.set_result(result)
+
+        request.future.add_done_callback(done)
+        self._put_to_send_queue(request)
+        return future, request
+
+    def _cached_command(self, name, packet, parse, timeout=None):
+        '''
+        Returns the cached result of a command, sending the command and waiting for the response if required.
+        Returns None, if no valid response was received.
+        '''
+        future, request = self._cached_command_future(name, packet, parse, timeout)
+        if request is not None and not self._wait_written(request):
+            # Packet wasn't written, as the communicator isn't running, or the transmit queue is full.
+            # Stop sharing the request, so the next caller sends a new one.
+            self.logger.warning('%s request was not sent', name)
+            with self._requests_lock:
+                if self._cache_requests.get(name, (None, None))[1] is request:
+                    del self._cache_requests[name]
+            return None
+        try:
+            # The deadline is counted from writing the packet, as for send_command().
+            return future.result(None if request is None else max(0, request.deadline - time.time()))
+        except TimeoutError:
+            self.logger.warning('No response to %s request', name)
+            return None
+
+    def _wait_written(self, request):
+        '''
+        Wait until the packet of the request is written, returns False if it isn't.
+        While the communicator is running, waits for the packet to go through the transmit queue,
+        up to transmit_timeout seconds more than the timeout of the request.
+        Otherwise (the queue is processed manually), waits for the timeout of the request.
+        '''
+        deadline = time.time() + request.timeout + self.transmit_timeout
+        while not request.written.is_set():
+            if request.future.done():
+                # Dropped from the transmit queue
+                return False
+            if not self.is_alive():
+                return request.written.wait(request.timeout)
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return False
+            request.written.wait(min(0.1, remaining))
+        return True
+
+    @staticmethod
+    def _parse_base_id(packet):
+        # Base ID is set in the response data.
+        if packet.response == RETURN_CODE.OK and len(packet.response_data) == 4:
+            return packet.response_data
+        return None
+
+    def fetch_base_id(self):
+        '''
+        Fetches Base ID from the transmitter without blocking, if required.
+        Returns a concurrent.futures.Future, resolving to the Base ID (or None, if the module didn't respond).
+        '''
+        if self._base_id is not None:
+            future = Future()
+            future.set_result(self._base_id)
+            return future
+
+        # Send COMMON_COMMAND 0x08, CO_RD_IDBASE request to the module
+        future, _ = self._cached_command_future(
+            'base_id', Packet(PACKET.COMMON_COMMAND, data=[0x08]), self._parse_base_id)
+        future.add_done_callback(self._set_base_id)
+        return future
+
+    def _set_base_id(self, future):
+        if self._base_id is None:
+            self._base_id = future.result()
+
     @property
     def base_id(self):
         ''' Fetches Base ID from the transmitter, if required. Otherwise returns the currently set Base ID. '''
@@ -89,27 +395,34 @@ class Communicator(threading.Thread):
             return self._base_id
 
         # Send COMMON_COMMAND 0x08, CO_RD_IDBASE request to the module
-        self.send(Packet(PACKET.COMMON_COMMAND, data=[0x08]))
-        # Loop over 10 times, to make sure we catch the response.
-        # Thanks to timeout, shouldn't take more than a second.
-        # Unfortunately, all other messages received during this time are ignored.
-        for i in range(0, 10):
-            try:
-                packet = self.receive.get(block=True, timeout=0.1)
-                # We're only interested in responses to the request in question.
-                if packet.packet_type == PACKET.RESPONSE and packet.response == RETURN_CODE.OK and len(packet.response_data) == 4:  # noqa: E501
-                    # Base ID is set in the response data.
-                    self._base_id = packet.response_data
-                    # Put packet back to the Queue, so the user can also react to it if required...
-                    self.receive.put(packet)
-                    break
-                # Put other packets back to the Queue.
-                self.receive.put(packet)
-            except queue.Empty:
-                continue
+        base_id = self._cached_command('base_id', Packet(PACKET.COMMON_COMMAND, data=[0x08]), self._parse_base_id)
+        if self._base_id is None:
+            self._base_id = base_id
         # Return the current Base ID (might be None).
         return self._base_id
 
+    @property
+    def version(self):
+        '''
+        Fetches version information from the transmitter, if required.
+        Returns a dict of the application and API versions, chip ID, chip version and application description,
+        or None if the module doesn't respond.
+        '''
+        def parse(packet):
+            data = packet.response_data
+            if packet.response != RETURN_CODE.OK or len(data) < 32:
+                return None
+            return {
+                'app_version': data[0:4],
+                'api_version': data[4:8],
+                'chip_id': data[8:12],
+                'chip_version': data[12:16],
+                'app_description': bytearray(data[16:32]).split(b'\x00')[0].decode('ascii', 'replace'),
+            }
+
+        # Send COMMON_COMMAND 0x03, CO_RD_VERSION request to the module
+        return self._cached_command('version', Packet(PACKET.COMMON_COMMAND, data=[0x03]), parse)
+
     @base_id.setter
     def base_id(self, base_id):
         ''' Sets the Base ID manually, only for testing purposes. '''
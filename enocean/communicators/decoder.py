@@ -0,0 +1,161 @@
+# -*- encoding: utf-8 -*-
+from __future__ import print_function, unicode_literals, division, absolute_import
+import os
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+from enocean.protocol.packet import Packet, RadioPacket
+from enocean.protocol.eep import LazyValues
+
+
+def _decode_batch(frames):
+    '''
+    Decode a batch of (packet type, data, optional data, profile) -tuples in a worker process.
+    Each worker process loads its own EEP (Packet.eep) on import.
+    Returns the decoded values of each frame, as OrderedDicts.
+    '''
+    results = []
+    for packet_type, data, optional, profile in frames:
+        if profile is None:
+            results.append(None)
+            continue
+        packet = Packet.from_frame(packet_type, data, optional)
+        packet.parse_eep(*profile)
+        results.append(packet.parsed.to_dict())
+    return results
+
+
+class ProcessPoolDecoder(object):
+    '''
+    Decodes EEP values of received packets in a pool of worker processes,
+    so decoding isn't limited to a single core by the GIL.
+
+    The decoder is passed to a communicator as the callback, so the communicator thread only frames the packets:
+        decoder = ProcessPoolDecoder(handle_packet, profiles={0x0181B744: (0x02, 0x05)})
+        communicator = SerialCommunicator(callback=decoder)
+
+    `profiles` maps sender IDs (RadioPacket.sender_int) to (FUNC, TYPE[, direction[, command]]) -tuples,
+    or is a function returning the tuple for a packet (or None).
+    Packets are sent to the workers in batches of up to `batch_size` packets, or after `batch_time` seconds.
+    The callback is called in a thread of the decoder, with the decoded values set in Packet.parsed,
+    in the order the packets were received.
+    Packets without a profile are passed on undecoded, in order.
+    When `max_batches` are being decoded, the communicator waits (backpressure).
+    '''
+    logger = logging.getLogger('enocean.communicators.ProcessPoolDecoder')
+
+    def __init__(self, callback, profiles=None, workers=None, batch_size=64, batch_time=0.01, max_batches=None):
+        self.callback = callback
+        self.profiles = profiles
+        self.batch_size = batch_size
+        self.batch_time = batch_time
+        workers = workers or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(workers)
+        self.max_batches = max_batches or 2 * workers
+        # Counters
+        self.decoded = 0
+        self.errors = 0
+
+        self._condition = threading.Condition()
+        # Packets waiting to be sent to the workers, and the time the first one was added.
+        self._batch = []
+        self._batch_started = None
+        # Batches being decoded as (future, packets) -tuples, in the order they were sent.
+        self._batches = deque()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name='enocean-decoder')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _profile(self, packet):
+        if self.profiles is None or not isinstance(packet, RadioPacket):
+            return None
+        if callable(self.profiles):
+            return self.profiles(packet)
+        return self.profiles.get(packet.sender_int)
+
+    def __call__(self, packet):
+        ''' Queue the packet for decoding '''
+        profile = self._profile(packet)
+        with self._condition:
+            if self._stopped:
+                raise RuntimeError('Decoder is stopped')
+            if not self._batch:
+                self._batch_started = time.time()
+                # Wake up the thread, to send the batch in time.
+                self._condition.notify_all()
+            self._batch.append((packet, profile))
+            if len(self._batch) >= self.batch_size:
+                while len(self._batches) >= self.max_batches and not self._stopped:
+                    self._condition.wait()
+                self._submit()
+
+    def _submit(self):
+        ''' Send the current batch to the workers, call with the condition held '''
+        batch, self._batch = self._batch, []
+        frames = [
+            (packet.packet_type, bytes(bytearray(packet.data)), bytes(bytearray(packet.optional)), profile)
+            for packet, profile in batch
+        ]
+        if any(profile is not None for _, profile in batch):
+            future = self._executor.submit(_decode_batch, frames)
+        else:
+            future = None
+        self._batches.append((future, batch))
+        self._condition.notify_all()
+
+    def _deliver(self, batch, results):
+        for index, (packet, profile) in enumerate(batch):
+            if results is not None and results[index] is not None:
+                packet.rorg_func, packet.rorg_type = profile[0], profile[1]
+                packet.parsed = LazyValues(results[index])
+                self.decoded += 1
+            try:
+                self.callback(packet)
+            except Exception:
+                self.logger.exception('Exception in callback')
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._batches and not self._batch and not self._stopped:
+                    self._condition.wait()
+                if self._batch and (self._stopped or time.time() - self._batch_started >= self.batch_time):
+                    self._submit()
+                if not self._batches:
+                    if self._stopped:
+                        return
+                    # Wait for the batch to fill up, or the time to pass.
+                    self._condition.wait(max(0, self._batch_started + self.batch_time - time.time()))
+                    continue
+                future, batch = self._batches[0]
+                timeout = None
+                if self._batch:
+                    timeout = max(0, self._batch_started + self.batch_time - time.time())
+
+            results = None
+            if future is not None:
+                try:
+                    results = future.result(timeout)
+                except TimeoutError:
+                    # Send the batch waiting, and keep waiting for this one.
+                    continue
+                except Exception:
+                    self.logger.exception('Decoding failed, passing the packets on undecoded')
+                    self.errors += 1
+
+            with self._condition:
+                self._batches.popleft()
+                self._condition.notify_all()
+            self._deliver(batch, results)
+
+    def stop(self, timeout=None):
+        ''' Decode and pass on the packets received, and stop the worker processes '''
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+        self._executor.shutdown()
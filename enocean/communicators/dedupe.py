@@ -0,0 +1,69 @@
+# -*- encoding: utf-8 -*-
+from __future__ import print_function, unicode_literals, division, absolute_import
+import time
+from collections import OrderedDict
+
+from enocean.protocol.constants import PACKET, RORG
+
+# RORGs with the repeater count in the low nibble of the status
+REPEATED_RORGS = (RORG.RPS, RORG.BS1, RORG.BS4)
+
+
+def telegram_key(packet):
+    '''
+    Returns the key identifying the telegram of a packet: packet type and data.
+    For radio packets, the data contains the RORG, the payload, the sender and the status.
+    Unlike Packet.__eq__ / __hash__, the optional data (dBm, destination etc.) is left out,
+    and the repeater count in the status of RPS, 1BS and 4BS telegrams is masked,
+    so the same telegram repeated, forwarded by a repeater, or received by another module, has the same key.
+    '''
+    data = bytearray(packet.data)
+    if packet.packet_type == PACKET.RADIO_ERP1 and data and data[0] in REPEATED_RORGS:
+        data[-1] &= 0xF0
+    return (packet.packet_type, bytes(data))
+
+
+class DuplicateFilter(object):
+    '''
+    Detects radio telegrams received more than once within `window` seconds:
+    sub-telegrams, and telegrams forwarded by repeaters.
+
+    Up to `size` keys are kept, in a dict ordered by the time they were first seen,
+    so memory use is fixed, regardless of the traffic.
+    Only radio packets are filtered, RESPONSEs and other packets are never duplicates.
+    The number of duplicates found is kept in `suppressed`.
+    '''
+    # Packet types, which are filtered
+    packet_types = (PACKET.RADIO_ERP1, PACKET.RADIO_ERP2, PACKET.RADIO_SUB_TEL)
+
+    def __init__(self, window=0.5, size=1024):
+        self.window = window
+        self.size = size
+        self.suppressed = 0
+        # Keys, and the time they were first seen, oldest first.
+        self._seen = OrderedDict()
+
+    def __len__(self):
+        return len(self._seen)
+
+    def is_duplicate(self, packet, now=None):
+        ''' Returns True, if the telegram has been seen within the window, and remembers it otherwise '''
+        if packet.packet_type not in self.packet_types:
+            return False
+        now = time.time() if now is None else now
+        # Forget telegrams seen before the window.
+        limit = now - self.window
+        while self._seen:
+            key, seen = next(iter(self._seen.items()))
+            if seen > limit:
+                break
+            del self._seen[key]
+
+        key = telegram_key(packet)
+        if key in self._seen:
+            self.suppressed += 1
+            return True
+        if len(self._seen) >= self.size:
+            self._seen.popitem(last=False)
+        self._seen[key] = now
+        return False
@@ -0,0 +1,171 @@
+# -*- encoding: utf-8 -*-
+from __future__ import print_function, unicode_literals, division, absolute_import
+import logging
+import threading
+from collections import deque
+
+from enocean.protocol.packet import RadioPacket
+from enocean.protocol.constants import OVERFLOW
+
+
+class CallbackDispatcher(object):
+    '''
+    Runs a callback for received packets on a pool of worker threads,
+    so slow callbacks don't stall reading the module.
+
+    The dispatcher is passed to a communicator as the callback:
+        communicator = SerialCommunicator(callback=CallbackDispatcher(handle_packet, workers=4))
+
+    Packets from the same sender are always handled by the same worker, in the order they were received.
+    Other packets (RESPONSE, EVENT etc.) are grouped by packet type.
+    At most `backlog` packets wait to be handled; when the backlog is full,
+    `overflow` (OVERFLOW.BLOCK, OVERFLOW.DROP_OLDEST or OVERFLOW.DROP_NEWEST) decides what happens.
+    Use a dropping policy to keep the reader real-time, regardless of the callback.
+    '''
+    logger = logging.getLogger('enocean.communicators.CallbackDispatcher')
+
+    def __init__(self, callback, workers=4, backlog=1000, overflow=OVERFLOW.BLOCK):
+        if workers < 1:
+            raise ValueError('At least one worker is required.')
+        if backlog < 1:
+            raise ValueError('Backlog must be at least one packet.')
+        self.callback = callback
+        self.backlog = backlog
+        self.overflow = OVERFLOW(overflow)
+
+        # Counters
+        # Packets accepted to the backlog
+        self.dispatched = 0
+        # Packets passed to the callback
+        self.handled = 0
+        # Packets dropped, because the backlog was full
+        self.dropped = 0
+        # Exceptions raised by the callback
+        self.errors = 0
+        # Largest number of packets waiting
+        self.high_water = 0
+
+        self._lock = threading.Lock()
+        # Signalled when there's space in the backlog
+        self._space = threading.Condition(self._lock)
+        # Signalled when all the packets are handled
+        self._idle = threading.Condition(self._lock)
+        self._pending = 0
+        # Packets waiting, or being handled
+        self._unfinished = 0
+        # Increasing sequence number of dispatched packets, to find the oldest one when dropping.
+        self._sequence = 0
+        self._stopped = False
+        # Queue of (sequence, packet) -tuples, condition and thread of each worker
+        self._queues = [deque() for i in range(workers)]
+        self._conditions = [threading.Condition(self._lock) for i in range(workers)]
+        self._workers = [
+            threading.Thread(target=self._work, args=(index, ), name='enocean-dispatcher-%d' % index)
+            for index in range(workers)
+        ]
+        for worker in self._workers:
+            worker.daemon = True
+            worker.start()
+
+    @property
+    def pending(self):
+        ''' Number of packets waiting to be handled '''
+        return self._pending
+
+    def stats(self):
+        ''' Returns the counters as a dict '''
+        with self._lock:
+            return {
+                'dispatched': self.dispatched,
+                'handled': self.handled,
+                'dropped': self.dropped,
+                'errors': self.errors,
+                'pending': self._pending,
+                'high_water': self.high_water,
+            }
+
+    @staticmethod
+    def _key(packet):
+        if isinstance(packet, RadioPacket):
+            return packet.sender_int
+        return -1 - int(packet.packet_type)
+
+    def __call__(self, packet):
+        '''
+        Dispatch packet to the worker of its sender.
+        Returns True, if the packet was accepted, and False if it was dropped.
+        '''
+        index = self._key(packet) % len(self._queues)
+        with self._lock:
+            if self._stopped:
+                raise RuntimeError('Dispatcher is stopped')
+            while self._pending >= self.backlog:
+                if self.overflow == OVERFLOW.DROP_NEWEST:
+                    self._drop()
+                    return False
+                if self.overflow == OVERFLOW.DROP_OLDEST:
+                    # Drop from the queue, where the oldest packet is waiting.
+                    oldest = min((queue for queue in self._queues if queue), key=lambda queue: queue[0][0])
+                    oldest.popleft()
+                    self._pending -= 1
+                    self._unfinished -= 1
+                    self._drop()
+                    break
+                self._space.wait()
+                if self._stopped:
+                    raise RuntimeError('Dispatcher is stopped')
+
+            self._sequence += 1
+            self._queues[index].append((self._sequence, packet))
+            self._pending += 1
+            self._unfinished += 1
+            self.dispatched += 1
+            self.high_water = max(self.high_water, self._pending)
+            self._conditions[index].notify()
+        return True
+
+    def _drop(self):
+        self.dropped += 1
+        # Log the first drop of each burst, to avoid flooding the log.
+        if self.dropped == 1 or self._pending < self.backlog - 1:
+            self.logger.warning('Callback backlog full, dropping packets (%d dropped in total).', self.dropped)
+
+    def _work(self, index):
+        queue = self._queues[index]
+        condition = self._conditions[index]
+        while True:
+            with self._lock:
+                while not queue and not self._stopped:
+                    condition.wait()
+                if not queue:
+                    return
+                _, packet = queue.popleft()
+                self._pending -= 1
+                self._space.notify()
+
+            try:
+                self.callback(packet)
+            except Exception:
+                self.logger.exception('Exception in callback')
+                with self._lock:
+                    self.errors += 1
+            with self._lock:
+                self.handled += 1
+                self._unfinished -= 1
+                if not self._unfinished:
+                    self._idle.notify_all()
+
+    def join(self, timeout=None):
+        ''' Wait until all the packets are handled, returns False if timeout occurred '''
+        with self._lock:
+            return self._idle.wait_for(lambda: not self._unfinished, timeout)
+
+    def stop(self, timeout=None):
+        ''' Stop the workers, after handling the packets already dispatched '''
+        with self._lock:
+            self._stopped = True
+            for condition in self._conditions:
+                condition.notify_all()
+            self._space.notify_all()
+        for worker in self._workers:
+            worker.join(timeout)
@@ -0,0 +1,158 @@
+# -*- encoding: utf-8 -*-
+from __future__ import print_function, unicode_literals, division, absolute_import
+import time
+import select
+import socket
+import logging
+import threading
+from collections import deque
+
+
+class TCPForwarder(threading.Thread):
+    '''
+    Forwards packets to a TCPCommunicator (or any ESP3 TCP server) over a persistent connection.
+
+    send() queues the packet and returns right away. The thread writes all the queued frames at once,
+    and reconnects with exponential backoff (from `backoff` up to `max_backoff` seconds), if the connection fails.
+    While disconnected, up to `buffer_size` frames are kept for up to `buffer_time` seconds,
+    older frames are dropped and counted in `dropped`.
+    Frames being written, when the connection fails, are sent again after reconnecting.
+    '''
+    logger = logging.getLogger('enocean.communicators.TCPForwarder')
+
+    def __init__(self, host='localhost', port=9637, buffer_size=1000, buffer_time=60.0,
+                 backoff=0.5, max_backoff=30.0, timeout=5.0):
+        super(TCPForwarder, self).__init__()
+        self.daemon = True
+        self.host = host
+        self.port = port
+        self.buffer_size = buffer_size
+        self.buffer_time = buffer_time
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        # Counters
+        self.sent = 0
+        self.dropped = 0
+        self.connects = 0
+        # Queued frames as (time queued, bytes) -tuples
+        self._frames = deque()
+        self._condition = threading.Condition()
+        self._stop_flag = threading.Event()
+        self._socket = None
+
+    @property
+    def connected(self):
+        return self._socket is not None
+
+    def send(self, packet):
+        '''
+        Queue the packet for forwarding, returns False if the oldest frame had to be dropped.
+        Can be used as the callback of a communicator.
+        '''
+        frame = bytes(bytearray(packet.build()))
+        with self._condition:
+            self._frames.append((time.time(), frame))
+            overflow = len(self._frames) > self.buffer_size
+            if overflow:
+                self._frames.popleft()
+                self.dropped += 1
+            self._condition.notify()
+        if overflow:
+            self.logger.warning('Forwarding buffer full, dropped the oldest packet.')
+        return not overflow
+
+    __call__ = send
+
+    def stop(self):
+        ''' Stop the thread, after writing the frames queued, if connected '''
+        self._stop_flag.set()
+        with self._condition:
+            self._condition.notify()
+
+    def _expire(self):
+        ''' Drop frames kept for more than buffer_time, call with the condition held '''
+        limit = time.time() - self.buffer_time
+        expired = 0
+        while self._frames and self._frames[0][0] < limit:
+            self._frames.popleft()
+            expired += 1
+        if expired:
+            self.dropped += expired
+            self.logger.warning('Dropped %d packets, not forwarded in %.1f seconds.', expired, self.buffer_time)
+
+    def _connect(self):
+        try:
+            sock = socket.create_connection((self.host, self.port), self.timeout)
+        except OSError as exc:
+            self.logger.warning('Connecting to %s:%d failed: %s', self.host, self.port, exc)
+            return False
+        # Frames are coalesced here, don't delay them further.
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._socket = sock
+        self.connects += 1
+        self.logger.info('Connected to %s:%d', self.host, self.port)
+        return True
+
+    def _disconnect(self):
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+    def _closed_by_peer(self):
+        ''' Check if the server has closed the idle connection, before writing to it '''
+        readable, _, _ = select.select([self._socket], [], [], 0)
+        if not readable:
+            return False
+        try:
+            # The server isn't expected to send anything.
+            return not self._socket.recv(512)
+        except OSError:
+            return True
+
+    def _write(self):
+        ''' Write all queued frames in a single call, returns False if the connection failed '''
+        with self._condition:
+            frames = list(self._frames)
+            self._frames.clear()
+        if not frames:
+            return True
+        try:
+            self._socket.sendall(b''.join(frame for _, frame in frames))
+        except OSError as exc:
+            self.logger.warning('Forwarding to %s:%d failed: %s', self.host, self.port, exc)
+            self._disconnect()
+            # Send the frames again, after reconnecting.
+            with self._condition:
+                self._frames.extendleft(reversed(frames))
+                while len(self._frames) > self.buffer_size:
+                    self._frames.popleft()
+                    self.dropped += 1
+            return False
+        self.sent += len(frames)
+        return True
+
+    def run(self):
+        self.logger.info('TCPForwarder started')
+        backoff = self.backoff
+        while True:
+            with self._condition:
+                self._expire()
+                while not self._frames and not self._stop_flag.is_set():
+                    self._condition.wait()
+                if not self._frames:
+                    break
+            if self._socket is not None and self._closed_by_peer():
+                self.logger.info('Connection closed by %s:%d', self.host, self.port)
+                self._disconnect()
+            if self._socket is None and not self._connect():
+                if self._stop_flag.is_set():
+                    break
+                # Wait before reconnecting, unless stopped.
+                self._stop_flag.wait(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+                continue
+            backoff = self.backoff
+            self._write()
+        self._disconnect()
+        self.logger.info('TCPForwarder stopped')
@@ -0,0 +1,103 @@
+# -*- encoding: utf-8 -*-
+from __future__ import print_function, unicode_literals, division, absolute_import
+import asyncio
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from enocean.protocol.constants import OVERFLOW
+
+
+class BoundedQueue(queue.Queue):
+    '''
+    queue.Queue, which handles overflow according to `overflow`, when `maxsize` (> 0) items are queued:
+    - OVERFLOW.BLOCK: put() waits for space, like queue.Queue (raises queue.Full, if not blocking).
+    - OVERFLOW.DROP_OLDEST: the oldest item is discarded, to make space for the new one.
+    - OVERFLOW.DROP_NEWEST: the new item is discarded.
+    Discarded items are counted in `dropped`, and passed to `on_drop`, if given.
+    The largest number of items queued is kept in `high_water`.
+    '''
+    def __init__(self, maxsize=0, overflow=OVERFLOW.BLOCK, on_drop=None):
+        queue.Queue.__init__(self, maxsize)
+        self.overflow = OVERFLOW(overflow)
+        self.on_drop = on_drop
+        self.dropped = 0
+        self.high_water = 0
+
+    def put(self, item, block=True, timeout=None):
+        '''
+        Put item to the queue.
+        Returns True, if the item was queued, False if it was discarded.
+        '''
+        if self.maxsize <= 0 or self.overflow == OVERFLOW.BLOCK:
+            queue.Queue.put(self, item, block, timeout)
+            return True
+
+        dropped = item
+        with self.not_full:
+            if self._qsize() < self.maxsize:
+                dropped = None
+            elif self.overflow == OVERFLOW.DROP_OLDEST:
+                # Replace the oldest item, unfinished_tasks stays the same.
+                dropped = self._get()
+                self._put(item)
+                self.not_empty.notify()
+            if dropped is None:
+                self._put(item)
+                self.unfinished_tasks += 1
+                self.not_empty.notify()
+            else:
+                self.dropped += 1
+        if dropped is not None and self.on_drop is not None:
+            self.on_drop(dropped)
+        return dropped is not item
+
+    def _put(self, item):
+        queue.Queue._put(self, item)
+        self.high_water = max(self.high_water, self._qsize())
+
+
+class AsyncioBoundedQueue(asyncio.Queue):
+    '''
+    asyncio.Queue with the overflow handling of BoundedQueue.
+    With OVERFLOW.BLOCK, put_nowait() raises asyncio.QueueFull, when the queue is full,
+    and `on_space` is called, when an item is taken from the queue.
+    '''
+    def __init__(self, maxsize=0, overflow=OVERFLOW.BLOCK, on_drop=None, on_space=None):
+        super(AsyncioBoundedQueue, self).__init__(maxsize)
+        self.overflow = OVERFLOW(overflow)
+        self.on_drop = on_drop
+        self.on_space = on_space
+        self.dropped = 0
+        self.high_water = 0
+
+    def put_nowait(self, item):
+        '''
+        Put item to the queue without blocking.
+        Returns True, if the item was queued, False if it was discarded.
+        '''
+        if not self.full() or self.overflow == OVERFLOW.BLOCK:
+            super(AsyncioBoundedQueue, self).put_nowait(item)
+            return True
+
+        dropped = item
+        if self.overflow == OVERFLOW.DROP_OLDEST:
+            dropped = self._get()
+            # Keep the count of unfinished tasks, the dropped item is replaced.
+            self._unfinished_tasks -= 1
+            super(AsyncioBoundedQueue, self).put_nowait(item)
+        self.dropped += 1
+        if self.on_drop is not None:
+            self.on_drop(dropped)
+        return dropped is not item
+
+    def get_nowait(self):
+        item = super(AsyncioBoundedQueue, self).get_nowait()
+        if self.on_space is not None:
+            self.on_space()
+        return item
+
+    def _put(self, item):
+        super(AsyncioBoundedQueue, self)._put(item)
+        self.high_water = max(self.high_water, self.qsize())
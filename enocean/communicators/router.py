@@ -0,0 +1,113 @@
+# -*- encoding: utf-8 -*-
+from __future__ import print_function, unicode_literals, division, absolute_import
+import logging
+import threading
+from collections import namedtuple
+
+import enocean.utils
+from enocean.protocol.packet import RadioPacket
+
+Subscription = namedtuple('Subscription', ['handler', 'sender', 'rorg', 'packet_type'])
+
+
+class PacketRouter(object):
+    '''
+    Routes packets to handlers subscribed by sender ID, RORG or packet type.
+
+    Subscriptions are indexed by the most specific key given (sender, then RORG, then packet type),
+    so routing a packet takes a few dict lookups, regardless of the number of subscriptions.
+    The router is called with the packet, and can be passed to a communicator as the callback
+    (or to CallbackDispatcher, to run the handlers on worker threads):
+        router = PacketRouter()
+        router.subscribe(handle_switch, sender=[0x01, 0x94, 0xE3, 0xB9])
+        router.subscribe(handle_teach_in, rorg=RORG.UTE)
+        communicator = SerialCommunicator(callback=router)
+    '''
+    logger = logging.getLogger('enocean.communicators.PacketRouter')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Tuples of subscriptions, replaced on change, so routing doesn't need the lock.
+        self._senders = {}
+        self._rorgs = {}
+        self._packet_types = {}
+        self._all = ()
+
+    @staticmethod
+    def _sender_int(sender):
+        if sender is None or isinstance(sender, int):
+            return sender
+        sender = list(bytearray(sender))
+        if len(sender) != 4:
+            raise ValueError('Sender must contain 4 (numeric) values.')
+        return enocean.utils.combine_hex(sender)
+
+    def _index(self, subscription):
+        ''' Returns the index and key of the subscription '''
+        if subscription.sender is not None:
+            return self._senders, subscription.sender
+        if subscription.rorg is not None:
+            return self._rorgs, subscription.rorg
+        if subscription.packet_type is not None:
+            return self._packet_types, subscription.packet_type
+        return None, None
+
+    def subscribe(self, handler, sender=None, rorg=None, packet_type=None):
+        '''
+        Call handler(packet) for the packets matching all of the given keys.
+        `sender` is the sender ID, as an int (see RadioPacket.sender_int) or a list of 4 bytes.
+        Without keys, the handler is called for all packets.
+        Returns the subscription, to be passed to unsubscribe().
+        '''
+        subscription = Subscription(handler, self._sender_int(sender), rorg, packet_type)
+        index, key = self._index(subscription)
+        with self._lock:
+            if index is None:
+                self._all = self._all + (subscription, )
+            else:
+                index[key] = index.get(key, ()) + (subscription, )
+        return subscription
+
+    def unsubscribe(self, subscription):
+        ''' Remove the subscription, returns False if it wasn't found '''
+        index, key = self._index(subscription)
+        with self._lock:
+            subscriptions = self._all if index is None else index.get(key, ())
+            if subscription not in subscriptions:
+                return False
+            subscriptions = tuple(s for s in subscriptions if s is not subscription)
+            if index is None:
+                self._all = subscriptions
+            elif subscriptions:
+                index[key] = subscriptions
+            else:
+                del index[key]
+        return True
+
+    def subscriptions(self, packet):
+        ''' Returns the subscriptions matching the packet '''
+        is_radio = isinstance(packet, RadioPacket)
+        candidates = self._all + self._packet_types.get(packet.packet_type, ())
+        if is_radio:
+            candidates = self._senders.get(packet.sender_int, ()) + self._rorgs.get(packet.rorg, ()) + candidates
+        matching = []
+        for subscription in candidates:
+            # The indexed key matches, check the rest.
+            if subscription.packet_type is not None and subscription.packet_type != packet.packet_type:
+                continue
+            if subscription.rorg is not None and (not is_radio or subscription.rorg != packet.rorg):
+                continue
+            if subscription.sender is not None and (not is_radio or subscription.sender != packet.sender_int):
+                continue
+            matching.append(subscription)
+        return matching
+
+    def __call__(self, packet):
+        ''' Route the packet to the matching handlers, returns the number of handlers called '''
+        subscriptions = self.subscriptions(packet)
+        for subscription in subscriptions:
+            try:
+                subscription.handler(packet)
+            except Exception:
+                self.logger.exception('Exception in packet handler')
+        return len(subscriptions)
@@ -0,0 +1,246 @@
+# -*- encoding: utf-8 -*-
+from __future__ import print_function, unicode_literals, division, absolute_import
+import time
+import logging
+import threading
+from collections import deque
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from enocean.protocol.packet import RadioPacket
+from enocean.protocol.constants import PRIORITY
+
+
+class TokenBucket(object):
+    ''' Token bucket, allowing `rate` events per second on average, and bursts of up to `burst` events '''
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate, burst=1, now=None):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.time() if now is None else now
+
+    def delay(self, now):
+        ''' Returns the number of seconds until a token is available '''
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+
+class TransmitScheduler(object):
+    '''
+    Transmit queue of a Communicator, deciding which packet is sent next:
+        scheduler = TransmitScheduler(rate=10, burst=5, destination_rate=2)
+        communicator = SerialCommunicator(scheduler=scheduler)
+        communicator.send(packet, priority=PRIORITY.HIGH)
+
+    - Packets are sent in the order of their priority class (PRIORITY.HIGH first), and in the order they were
+      queued within a class. The class is given to Communicator.send(), or decided by `classify(packet)`,
+      which by default gives commands to the module (non-radio packets) PRIORITY.HIGH, and radio packets
+      PRIORITY.NORMAL.
+    - Radio packets are paced by token buckets: at most `rate` telegrams per second in total (bursts of `burst`),
+      and `destination_rate` telegrams per second to each destination (bursts of `destination_burst`),
+      to keep within duty-cycle limits. None disables the limit.
+      Packets waiting for the bucket of their destination don't hold up packets to other destinations.
+      Commands to the module aren't limited.
+    - The time each packet waited in the queue is passed to `on_sent(packet, wait, priority)`,
+      and summarized by wait_stats().
+
+    - With `coalesce`, a radio packet queued replaces the packet waiting with the same destination,
+      RORG, FUNC, TYPE, direction, command and priority, keeping its place in the queue.
+      Only the latest set-point is sent to an actuator. Packets are found through a dict index,
+      replaced packets are counted in `coalesced`. Packets sent with send_command() are never replaced.
+
+    Up to `maxsize` (> 0) packets are queued, put() waits for space, or raises queue.Full if not blocking.
+    '''
+    logger = logging.getLogger('enocean.communicators.TransmitScheduler')
+
+    # Number of destination buckets kept, before removing the full ones.
+    max_destinations = 1024
+
+    def __init__(self, rate=None, burst=1, destination_rate=None, destination_burst=1, maxsize=0,
+                 classify=None, on_sent=None, coalesce=False):
+        self.rate = rate
+        self.destination_rate = destination_rate
+        self.destination_burst = destination_burst
+        self.maxsize = maxsize
+        self.classify = classify or self._classify
+        self.on_sent = on_sent
+        self.coalesce = coalesce
+        self.coalesced = 0
+        self.dropped = 0
+        self.high_water = 0
+        self._bucket = None if rate is None else TokenBucket(rate, burst)
+        # Token buckets of the destinations, by destination ID
+        self._destinations = {}
+        # Queue of each priority class, as [time queued, entry, coalescing key] -lists
+        self._queues = [deque() for priority in PRIORITY]
+        # Queued packets, which can be replaced, by coalescing key
+        self._pending = {}
+        self._size = 0
+        # Number of packets sent, total and maximum wait time of each priority class
+        self._stats = [[0, 0.0, 0.0] for priority in PRIORITY]
+        self._lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+        self._not_empty = threading.Condition(self._lock)
+
+    @staticmethod
+    def _classify(packet):
+        return PRIORITY.NORMAL if isinstance(packet, RadioPacket) else PRIORITY.HIGH
+
+    @staticmethod
+    def coalescing_key(packet, priority):
+        ''' Returns the key of packets replacing each other, None if the packet can't be replaced '''
+        if not isinstance(packet, RadioPacket) or packet.rorg_func is None:
+            return None
+        profile = packet.profile
+        return (
+            priority, packet.destination_int, packet.rorg, packet.rorg_func, packet.rorg_type,
+            None if profile is None else profile.direction, None if profile is None else profile.command,
+        )
+
+    @staticmethod
+    def _packet(entry):
+        # Entries of Communicator.send_command() wrap the packet.
+        return getattr(entry, 'packet', entry)
+
+    def qsize(self):
+        return self._size
+
+    def empty(self):
+        return self._size == 0
+
+    def full(self):
+        return 0 < self.maxsize <= self._size
+
+    def put(self, entry, block=True, timeout=None, priority=None):
+        ''' Queue the entry (Packet or request of Communicator.send_command()), returns True '''
+        packet = self._packet(entry)
+        if priority is None:
+            priority = self.classify(packet)
+        key = None
+        if self.coalesce and packet is entry:
+            key = self.coalescing_key(packet, priority)
+        with self._not_full:
+            slot = self._pending.get(key) if key is not None else None
+            if slot is not None:
+                # Replace the packet waiting.
+                slot[1] = entry
+                self.coalesced += 1
+                return True
+            if self.full():
+                if not block or not self._not_full.wait_for(lambda: not self.full(), timeout):
+                    raise queue.Full
+            slot = [time.time(), entry, key]
+            self._queues[priority].append(slot)
+            if key is not None:
+                self._pending[key] = slot
+            self._size += 1
+            self.high_water = max(self.high_water, self._size)
+            self._not_empty.notify()
+        return True
+
+    def _destination_bucket(self, packet, now):
+        if self.destination_rate is None:
+            return None
+        destination = packet.destination_int
+        bucket = self._destinations.get(destination)
+        if bucket is None:
+            bucket = self._destinations[destination] = TokenBucket(self.destination_rate, self.destination_burst, now)
+        return bucket
+
+    def _next(self, now):
+        '''
+        Find the next entry to send, call with the lock held.
+        Returns (priority, index, buckets), or None and the number of seconds until one can be sent.
+        '''
+        delay = None
+        for priority, entries in enumerate(self._queues):
+            # Destinations found waiting for their bucket
+            waiting = set()
+            for index, (_, entry, _) in enumerate(entries):
+                packet = self._packet(entry)
+                if not isinstance(packet, RadioPacket):
+                    return (priority, index, ()), 0
+                destination = packet.destination_int
+                if destination in waiting:
+                    continue
+                buckets = [b for b in (self._bucket, self._destination_bucket(packet, now)) if b is not None]
+                wait = max([bucket.delay(now) for bucket in buckets] or [0])
+                if wait <= 0:
+                    return (priority, index, buckets), 0
+                waiting.add(destination)
+                delay = wait if delay is None else min(delay, wait)
+        return None, delay
+
+    def delay(self):
+        ''' Returns the number of seconds until the next packet can be sent, None if the queue is empty '''
+        with self._lock:
+            if not self._size:
+                return None
+            return self._next(time.time())[1]
+
+    def get(self, block=True, timeout=None):
+        ''' Remove and return the next entry to send, raises queue.Empty if none can be sent (in time) '''
+        deadline = None if timeout is None else time.time() + timeout
+        with self._not_empty:
+            while True:
+                now = time.time()
+                found, delay = self._next(now)
+                if found is not None:
+                    break
+                remaining = None if deadline is None else deadline - now
+                if not block or (remaining is not None and remaining <= 0):
+                    raise queue.Empty
+                if delay is not None and (remaining is None or delay < remaining):
+                    remaining = delay
+                self._not_empty.wait(remaining)
+
+            priority, index, buckets = found
+            entries = self._queues[priority]
+            queued, entry, key = entries[index]
+            del entries[index]
+            if key is not None:
+                del self._pending[key]
+            self._size -= 1
+            for bucket in buckets:
+                bucket.take()
+            if len(self._destinations) > self.max_destinations:
+                # Forget full buckets, they're the same as new ones.
+                for destination, bucket in list(self._destinations.items()):
+                    bucket.delay(now)
+                    if bucket.tokens >= bucket.burst:
+                        del self._destinations[destination]
+            wait = now - queued
+            stats = self._stats[priority]
+            stats[0] += 1
+            stats[1] += wait
+            stats[2] = max(stats[2], wait)
+            self._not_full.notify()
+
+        self.logger.debug('Packet waited %.03f seconds in the transmit queue.', wait)
+        if self.on_sent is not None:
+            self.on_sent(self._packet(entry), wait, PRIORITY(priority))
+        return entry
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def wait_stats(self):
+        '''
+        Returns the wait times of each priority class, as a dict of
+        PRIORITY -> {'sent': number of packets, 'average': average wait, 'max': maximum wait (seconds)}.
+        '''
+        with self._lock:
+            return dict(
+                (PRIORITY(priority), {'sent': sent, 'average': total / sent if sent else 0.0, 'max': longest})
+                for priority, (sent, total, longest) in enumerate(self._stats)
+            )
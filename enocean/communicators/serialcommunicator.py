@@ -1,43 +1,118 @@
 # -*- encoding: utf-8 -*-
 from __future__ import print_function, unicode_literals, division, absolute_import
+import os
 import logging
+import select
+import threading
 import serial
-import time
 
 from enocean.communicators.communicator import Communicator
 
 
 class SerialCommunicator(Communicator):
-    ''' Serial port communicator class for EnOcean radio '''
+    '''
+    Serial port communicator class for EnOcean radio
+
+    On POSIX, the thread sleeps in select() on the port until data is received,
+    or a packet is sent, and reads everything available (up to read_size bytes) in one call.
+    Elsewhere, the port is read with a timeout of `timeout` seconds.
+    Other keyword arguments (queue sizes etc.) are passed to Communicator.
+    '''
     logger = logging.getLogger('enocean.communicators.SerialCommunicator')
 
-    def __init__(self, port='/dev/ttyAMA0', callback=None):
-        super(SerialCommunicator, self).__init__(callback)
+    def __init__(self, port='/dev/ttyAMA0', callback=None, baudrate=57600, read_size=1024, timeout=0.1, **kwargs):
+        super(SerialCommunicator, self).__init__(callback, **kwargs)
+        self.read_size = read_size
+        self.timeout = timeout
         # Initialize serial port
-        self.__ser = serial.Serial(port, 57600, timeout=0.1)
+        self.__ser = serial.Serial(port, baudrate, timeout=timeout)
+        try:
+            self.__fileno = self.__ser.fileno()
+        except (AttributeError, NotImplementedError):
+            # No file descriptor to wait on (Windows), fall back to blocking reads with timeout.
+            self.__fileno = None
+        self.__wakeup = None
+        # Guards writing to the wakeup pipe against closing it, as the file descriptors might get reused.
+        self.__wakeup_lock = threading.Lock()
+        if self.__fileno is not None:
+            self.__ser.timeout = 0
+            # Pipe for waking up the thread, when there's something to send or the thread should stop.
+            self.__wakeup = os.pipe()
+            for fd in self.__wakeup:
+                os.set_blocking(fd, False)
+
+    def _wakeup(self):
+        with self.__wakeup_lock:
+            if self.__wakeup is None:
+                return
+            try:
+                os.write(self.__wakeup[1], b'\x00')
+            except BlockingIOError:
+                # Pipe is full, the thread is woken up anyway.
+                pass
+
+    def _put_to_send_queue(self, entry, priority=None):
+        queued = super(SerialCommunicator, self)._put_to_send_queue(entry, priority)
+        self._wakeup()
+        return queued
+
+    def stop(self):
+        super(SerialCommunicator, self).stop()
+        self._wakeup()
+
+    def _read(self):
+        ''' Wait for data from the serial port, returns the bytes read (might be empty) '''
+        if self.__fileno is None:
+            return self.__ser.read(max(1, min(self.__ser.in_waiting, self.read_size)))
+
+        timeout = self.timeout
+        delay = self._send_delay()
+        if delay is not None:
+            # Wake up, when the next packet can be sent.
+            timeout = min(timeout, delay)
+        readable, _, _ = select.select([self.__fileno, self.__wakeup[0]], [], [], timeout)
+        if self.__wakeup[0] in readable:
+            os.read(self.__wakeup[0], 512)
+        if self.__fileno not in readable:
+            return b''
+        data = self.__ser.read(self.read_size)
+        if not data:
+            # select() reports the port readable, but there's nothing to read.
+            raise serial.SerialException('Serial port returned no data (device disconnected?)')
+        return data
 
     def run(self):
         self.logger.info('SerialCommunicator started')
+        if self.teach_in:
+            # Prefetch Base ID, so responses to UTE teach-in can be sent right away.
+            self.fetch_base_id()
         while not self._stop_flag.is_set():
             # If there's messages in transmit queue
-            # send them
+            # send them, in a single write
+            frames = bytearray()
             while True:
                 packet = self._get_from_send_queue()
                 if not packet:
                     break
+                frames.extend(packet.build())
+            if frames:
                 try:
-                    self.__ser.write(bytearray(packet.build()))
+                    self.__ser.write(frames)
                 except serial.SerialException:
                     self.stop()
 
             # Read chars from serial port as hex numbers
             try:
-                self._buffer.extend(bytearray(self.__ser.read(16)))
-            except serial.SerialException:
+                self._buffer.extend(self._read())
+            except (serial.SerialException, OSError):
                 self.logger.error('Serial port exception! (device disconnected or multiple access on port?)')
                 self.stop()
             self.parse()
-            time.sleep(0)
 
         self.__ser.close()
+        with self.__wakeup_lock:
+            if self.__wakeup is not None:
+                for fd in self.__wakeup:
+                    os.close(fd)
+                self.__wakeup = None
         self.logger.info('SerialCommunicator stopped')
@@ -2,43 +2,98 @@
 from __future__ import print_function, unicode_literals, division, absolute_import
 import logging
 import socket
+import selectors
 
+from enocean.protocol.framer import PacketFramer
 from enocean.communicators.communicator import Communicator
 
 
 class TCPCommunicator(Communicator):
-    ''' Socket communicator class for EnOcean radio '''
+    '''
+    Socket communicator class for EnOcean radio.
+
+    A TCP server, receiving packets forwarded by clients (see examples/serial_to_tcp.py).
+    Any number of clients can be connected at the same time, each with its own PacketFramer,
+    and packets are parsed as soon as they're received.
+    Keyword arguments (queue sizes etc.) are passed to Communicator.
+    Packets aren't sent anywhere, so commands (send_command(), base_id etc.) fail right away.
+    '''
     logger = logging.getLogger('enocean.communicators.TCPCommunicator')
 
-    def __init__(self, host='', port=9637):
-        super(TCPCommunicator, self).__init__()
+    transmits = False
+
+    def __init__(self, host='', port=9637, callback=None, read_size=4096, **kwargs):
+        super(TCPCommunicator, self).__init__(callback, **kwargs)
         self.host = host
         self.port = port
+        self.read_size = read_size
+        # Address the server is listening on, set when the server is started.
+        self.address = None
+        # Socket pair for waking up the thread, when it should stop.
+        self.__wakeup = socket.socketpair()
+        for sock in self.__wakeup:
+            sock.setblocking(False)
+
+    def stop(self):
+        super(TCPCommunicator, self).stop()
+        try:
+            self.__wakeup[1].send(b'\x00')
+        except (BlockingIOError, OSError):
+            # Already woken up, or closed.
+            pass
+
+    def _accept(self, selector, server):
+        try:
+            client, address = server.accept()
+        except BlockingIOError:
+            return
+        client.setblocking(False)
+        selector.register(client, selectors.EVENT_READ, (PacketFramer(), address))
+        self.logger.debug('Client "%s" connected', address)
+
+    def _receive(self, selector, client, buffer, address):
+        try:
+            data = client.recv(self.read_size)
+        except BlockingIOError:
+            return
+        except OSError as exc:
+            self.logger.warning('Client "%s" connection failed: %s', address, exc)
+            data = b''
+        if not data:
+            selector.unregister(client)
+            client.close()
+            self.logger.debug('Client "%s" disconnected', address)
+            return
+        buffer.extend(data)
+        self.parse(buffer)
 
     def run(self):
         self.logger.info('TCPCommunicator started')
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.bind((self.host, self.port))
-        sock.listen(5)
-        sock.settimeout(0.5)
-
-        while not self._stop_flag.is_set():
-            try:
-                (client, addr) = sock.accept()
-            except socket.timeout:
-                continue
-            self.logger.debug('Client "%s" connected' % (addr))
-            client.settimeout(0.5)
-            while True and not self._stop_flag.is_set():
-                try:
-                    data = client.recv(2048)
-                except socket.timeout:
-                    break
-                if not data:
-                    break
-                self._buffer.extend(bytearray(data))
-            self.parse()
-            client.close()
-            self.logger.debug('Client disconnected')
-        sock.close()
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind((self.host, self.port))
+        server.listen(5)
+        server.setblocking(False)
+        self.address = server.getsockname()
+
+        selector = selectors.DefaultSelector()
+        selector.register(server, selectors.EVENT_READ)
+        selector.register(self.__wakeup[0], selectors.EVENT_READ)
+        try:
+            while not self._stop_flag.is_set():
+                for key, _ in selector.select():
+                    if key.fileobj is server:
+                        self._accept(selector, server)
+                    elif key.fileobj is self.__wakeup[0]:
+                        self.__wakeup[0].recv(512)
+                    else:
+                        buffer, address = key.data
+                        self._receive(selector, key.fileobj, buffer, address)
+        finally:
+            for key in list(selector.get_map().values()):
+                if key.fileobj not in self.__wakeup:
+                    key.fileobj.close()
+            selector.close()
+            for sock in self.__wakeup:
+                sock.close()
         self.logger.info('TCPCommunicator stopped')
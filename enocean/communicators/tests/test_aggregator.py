@@ -0,0 +1,70 @@
+# -*- encoding: utf-8 -*-
+from __future__ import print_function, unicode_literals, division, absolute_import
+import time
+
+from enocean.communicators.aggregator import Aggregator
+from enocean.protocol.packet import Packet, RadioPacket
+from enocean.protocol.constants import PACKET, RORG
+
+
+def radio(dBm, value=20, sender=0xEF, repeated=0):
+    packet = RadioPacket.create(RORG.BS4, 0x02, 0x05, sender=[0xDE, 0xAD, 0xBE, sender], TMP=value)
+    # Repeater count in the status
+    packet.data[-1] = (packet.data[-1] & 0xF0) | repeated
+    packet.optional = [0x03, 0xFF, 0xFF, 0xFF, 0xFF, -dBm, 0x00]
+    packet.parse()
+    return packet
+
+
+def test_merge():
+    aggregator = Aggregator(window=0.05)
+    aggregator.start()
+    try:
+        aggregator.add('usb0', radio(-80))
+        aggregator.add('usb1', radio(-60))
+        # Heard through a repeater
+        aggregator.add('usb2', radio(-70, repeated=1))
+        # Repeated by a repeater, received by the same gateway.
+        aggregator.add('usb0', radio(-75, repeated=1))
+        # Different telegrams
+        aggregator.add('usb0', radio(-80, value=21))
+        aggregator.add('usb1', radio(-80, sender=0xEE))
+        aggregator.add('usb1', Packet(PACKET.RESPONSE, [0x00]))
+
+        # Other packets are passed on right away.
+        reception = aggregator.receive.get(timeout=0.01)
+        assert reception.packet.packet_type == PACKET.RESPONSE
+        assert list(reception.gateways) == ['usb1']
+
+        reception = aggregator.receive.get(timeout=1)
+        # Best reception is kept.
+        assert reception.packet.dBm == -60
+        assert dict(reception.gateways) == {'usb0': -75, 'usb1': -60, 'usb2': -70}
+        assert list(reception.gateways) == ['usb0', 'usb1', 'usb2']
+        assert len(aggregator.receive.get(timeout=1).gateways) == 1
+        assert len(aggregator.receive.get(timeout=1).gateways) == 1
+        assert aggregator.received == 6
+        assert aggregator.duplicates == 3
+
+        # Same telegram after the window is passed on again.
+        time.sleep(0.06)
+        aggregator.add('usb0', radio(-80))
+        assert aggregator.receive.get(timeout=1).packet.dBm == -80
+    finally:
+        aggregator.stop()
+        aggregator.join(1)
+    assert not aggregator.is_alive()
+
+
+def test_callback():
+    receptions = []
+    aggregator = Aggregator(callback=receptions.append, window=10)
+    aggregator.start()
+    receiver = aggregator.receiver('usb0')
+    receiver(radio(-80))
+    receiver(radio(-80))
+    # Telegrams waiting are passed on, when stopped.
+    aggregator.stop()
+    aggregator.join(1)
+    assert len(receptions) == 1
+    assert receptions[0].gateways == {'usb0': -80}
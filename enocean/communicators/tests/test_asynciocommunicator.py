@@ -0,0 +1,370 @@
+# -*- encoding: utf-8 -*-
+from __future__ import print_function, unicode_literals, division, absolute_import
+import os
+import time
+import asyncio
+
+from nose.tools import raises
+
+from enocean.communicators.asynciocommunicator import AsyncioCommunicator, AsyncioSerialCommunicator, AsyncioTCPCommunicator  # noqa: E501
+from enocean.protocol.packet import Packet, RadioPacket
+from enocean.protocol.registry import DeviceRegistry
+from enocean.protocol.constants import PACKET, RORG, RETURN_CODE, OVERFLOW
+
+RADIO_DATA = bytes(bytearray([
+    0x55,
+    0x00, 0x0A, 0x07, 0x01,
+    0xEB,
+    0xA5, 0x00, 0x00, 0x55, 0x08, 0x01, 0x81, 0xB7, 0x44, 0x00,
+    0x01, 0xFF, 0xFF, 0xFF, 0xFF, 0x2D, 0x00,
+    0x75
+]))
+
+BASE_ID_RESPONSE = bytes(bytearray([
+    0x55,
+    0x00, 0x05, 0x00, 0x02,
+    0xCE,
+    0x00, 0xFF, 0x87, 0xCA, 0x00,
+    0xA3
+]))
+
+TEACH_IN_DATA = bytes(bytearray([
+    0x55,
+    0x00, 0x0D, 0x07, 0x01,
+    0xFD,
+    0xD4, 0xA0, 0xFF, 0x3E, 0x00, 0x01, 0x01, 0xD2, 0x01, 0x94, 0xE3, 0xB9, 0x00,
+    0x01, 0xFF, 0xFF, 0xFF, 0xFF, 0x40, 0x00,
+    0xAB
+]))
+
+
+class FakeTransport(asyncio.Transport):
+    def __init__(self, protocol):
+        super(FakeTransport, self).__init__()
+        self.protocol = protocol
+        self.written = []
+        self.reading = True
+
+    def write(self, data):
+        self.written.append(data)
+
+    def pause_reading(self):
+        self.reading = False
+
+    def resume_reading(self):
+        self.reading = True
+
+    def close(self):
+        asyncio.get_event_loop().call_soon(self.protocol.connection_lost, None)
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+        asyncio.set_event_loop(None)
+
+
+def connect():
+    com = AsyncioCommunicator()
+    com.connection_made(FakeTransport(com))
+    return com
+
+
+def test_iterate():
+    async def main():
+        com = connect()
+        com.data_received(RADIO_DATA[0:5])
+        assert com.receive.qsize() == 0
+        com.data_received(RADIO_DATA[5:])
+        assert com.receive.qsize() == 1
+        com.data_received(RADIO_DATA + RADIO_DATA)
+        com.close()
+
+        packets = []
+        async for packet in com:
+            packets.append(packet)
+        assert len(packets) == 3
+        assert all(isinstance(packet, RadioPacket) for packet in packets)
+
+    run(main())
+
+
+def test_send():
+    async def main():
+        com = connect()
+        first = com.send(Packet(PACKET.COMMON_COMMAND, [0x08]))
+        second = com.send(Packet(PACKET.COMMON_COMMAND, [0x03]))
+        assert com._transport.written == [
+            bytes(bytearray(Packet(PACKET.COMMON_COMMAND, [0x08]).build())),
+            bytes(bytearray(Packet(PACKET.COMMON_COMMAND, [0x03]).build())),
+        ]
+        # Responses are matched in order, other packets don't resolve them.
+        com.data_received(RADIO_DATA + BASE_ID_RESPONSE)
+        response = await first
+        assert response.response == RETURN_CODE.OK
+        assert response.response_data == [0xFF, 0x87, 0xCA, 0x00]
+        assert not second.done()
+
+        # Pending responses are cancelled, when the connection is lost.
+        com.close()
+        await asyncio.sleep(0)
+        assert second.cancelled()
+
+    run(main())
+
+
+@raises(TypeError)
+def test_send_fails():
+    async def main():
+        connect().send('AJSNDJASNDJANSD')
+
+    run(main())
+
+
+def test_response_timeout():
+    async def main():
+        com = connect()
+        try:
+            await asyncio.wait_for(com.send(Packet(PACKET.COMMON_COMMAND, [0x03])), 0.01)
+            assert False
+        except asyncio.TimeoutError:
+            pass
+        # Late response for the timed out request is consumed, and not matched to the next request.
+        response = com.send(Packet(PACKET.COMMON_COMMAND, [0x08]))
+        com.data_received(BASE_ID_RESPONSE)
+        assert not response.done()
+        com.data_received(BASE_ID_RESPONSE)
+        assert (await response).response_data == [0xFF, 0x87, 0xCA, 0x00]
+
+    run(main())
+
+
+def test_base_id():
+    async def main():
+        com = connect()
+        assert com.base_id is None
+        requests = [asyncio.ensure_future(com.get_base_id()) for i in range(3)]
+        await asyncio.sleep(0)
+        # Concurrent requests share a single CO_RD_IDBASE
+        assert len(com._transport.written) == 1
+        com.data_received(RADIO_DATA + BASE_ID_RESPONSE)
+        assert await asyncio.gather(*requests) == [[0xFF, 0x87, 0xCA, 0x00]] * 3
+        assert com.base_id == [0xFF, 0x87, 0xCA, 0x00]
+        assert await com.get_base_id() == [0xFF, 0x87, 0xCA, 0x00]
+        assert len(com._transport.written) == 1
+        assert com.receive.qsize() == 2
+
+    run(main())
+
+
+def test_teach_in():
+    async def main():
+        com = connect()
+        com.base_id = [0xDE, 0xAD, 0xBE, 0xEF]
+        com.data_received(TEACH_IN_DATA)
+        await asyncio.sleep(0)
+        assert len(com._transport.written) == 1
+        response = bytearray(com._transport.written[0])
+        # Sent from the Base ID, to the teach-in sender
+        assert response[6] == 0xD4
+        assert list(response[14:18]) == [0xDE, 0xAD, 0xBE, 0xEF]
+
+    run(main())
+
+
+def test_callback():
+    received = []
+
+    async def main():
+        com = AsyncioCommunicator(callback=received.append)
+        com.connection_made(FakeTransport(com))
+        com.data_received(RADIO_DATA)
+        assert com.receive.qsize() == 0
+
+    run(main())
+    assert len(received) == 1
+
+
+def test_serial():
+    master, slave = os.openpty()
+
+    async def main():
+        com = AsyncioSerialCommunicator(port=os.ttyname(slave))
+        await com.open()
+        response = com.send(Packet(PACKET.COMMON_COMMAND, [0x08]))
+        await asyncio.sleep(0.01)
+        assert bytearray(os.read(master, 1024)) == bytearray(Packet(PACKET.COMMON_COMMAND, [0x08]).build())
+        os.write(master, RADIO_DATA + BASE_ID_RESPONSE)
+        assert (await asyncio.wait_for(response, 1)).response_data == [0xFF, 0x87, 0xCA, 0x00]
+        packet = await asyncio.wait_for(com.__anext__(), 1)
+        assert isinstance(packet, RadioPacket)
+        com.close()
+
+    try:
+        run(main())
+    finally:
+        os.close(master)
+        os.close(slave)
+
+
+def test_tcp():
+    async def main():
+        written = []
+
+        async def handle(reader, writer):
+            written.append(await reader.readexactly(8))
+            writer.write(RADIO_DATA + BASE_ID_RESPONSE)
+            await writer.drain()
+            writer.close()
+
+        server = await asyncio.start_server(handle, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        packets = []
+        async with AsyncioTCPCommunicator('127.0.0.1', port) as com:
+            response = com.send(Packet(PACKET.COMMON_COMMAND, [0x08]))
+            assert (await asyncio.wait_for(response, 1)).response_data == [0xFF, 0x87, 0xCA, 0x00]
+            # Iteration stops, when the server closes the connection.
+            async for packet in com:
+                packets.append(packet)
+        server.close()
+        await server.wait_closed()
+        assert bytearray(written[0]) == bytearray(Packet(PACKET.COMMON_COMMAND, [0x08]).build())
+        assert [packet.packet_type for packet in packets] == [PACKET.RADIO_ERP1, PACKET.RESPONSE]
+
+    run(main())
+
+
+def test_expire_response():
+    async def main():
+        com = connect()
+        com.response_timeout = 0.01
+        # Bridge doesn't forward RESPONSE -packets.
+        try:
+            await asyncio.wait_for(com.get_base_id(), 1)
+            assert False
+        except asyncio.TimeoutError:
+            pass
+        assert not com._responses
+        assert com.base_id is None
+
+    run(main())
+
+
+def test_expire_clock_step():
+    ''' Responses expire, even if the wall clock is stepped backwards '''
+    wall_clock = time.time
+
+    async def main():
+        com = connect()
+        com.response_timeout = 0.01
+        response = com.send(Packet(PACKET.COMMON_COMMAND, [0x08]))
+        time.time = lambda: wall_clock() - 3600
+        await asyncio.sleep(0.05)
+        assert isinstance(response.exception(), asyncio.TimeoutError)
+        assert not com._responses
+
+    try:
+        run(main())
+    finally:
+        time.time = wall_clock
+
+
+def test_teach_in_error():
+    error_response = bytes(bytearray(Packet(PACKET.RESPONSE, [RETURN_CODE.ERROR]).build()))
+
+    async def main():
+        com = connect()
+        com.data_received(TEACH_IN_DATA)
+        # Task is referenced, until it's done.
+        assert len(com._tasks) == 1
+        task = next(iter(com._tasks))
+        await asyncio.sleep(0)
+        # Module responds to CO_RD_IDBASE with an error, teach-in isn't responded.
+        com.data_received(error_response)
+        await task
+        await asyncio.sleep(0)
+        assert task.exception() is None
+        assert not com._tasks
+        assert len(com._transport.written) == 1
+
+    run(main())
+
+
+def test_receive_drop():
+    async def main():
+        com = AsyncioCommunicator(receive_size=2)
+        com.connection_made(FakeTransport(com))
+        com.data_received(RADIO_DATA * 3 + BASE_ID_RESPONSE)
+        assert com.receive.qsize() == 2
+        assert com.receive.dropped == 2
+        # Oldest packets were dropped.
+        assert (await com.receive.get()).packet_type == PACKET.RADIO_ERP1
+        assert (await com.receive.get()).packet_type == PACKET.RESPONSE
+
+    run(main())
+
+
+def test_receive_block():
+    async def main():
+        com = AsyncioCommunicator(receive_size=2, receive_overflow=OVERFLOW.BLOCK)
+        com.connection_made(FakeTransport(com))
+        transport = com._transport
+        com.data_received(RADIO_DATA * 3)
+        # Reading is paused while the queue is full, the rest stays in the buffer.
+        assert com.receive.qsize() == 2
+        assert not transport.reading
+        await com.receive.get()
+        assert com.receive.qsize() == 2
+        assert not transport.reading
+        await com.receive.get()
+        assert transport.reading
+
+        # Packets received before losing the connection are iterated, before stopping.
+        com.data_received(RADIO_DATA * 4)
+        com.close()
+        await asyncio.sleep(0)
+        packets = []
+        async for packet in com:
+            packets.append(packet)
+        assert len(packets) == 5
+        assert com.receive.dropped == 0
+
+    run(main())
+
+
+def test_send_group():
+    async def main():
+        com = connect()
+        packets = RadioPacket.create_group(RORG.VLD, 0x01, 0x01, [0x01020304, 0x01020305], command=1, OV=100)
+        futures = com.send_group(packets)
+        assert len(com._transport.written) == 2
+        com.data_received(BASE_ID_RESPONSE * 2)
+        assert list(futures) == [0x01020304, 0x01020305]
+        await asyncio.gather(*futures.values())
+
+    run(main())
+
+
+def test_registry():
+    registry = DeviceRegistry()
+
+    async def main():
+        com = AsyncioCommunicator(registry=registry)
+        com.connection_made(FakeTransport(com))
+        com.base_id = [0xDE, 0xAD, 0xBE, 0xEF]
+        com.data_received(TEACH_IN_DATA)
+        status = RadioPacket.create(RORG.VLD, 0x01, 0x01, sender=[0x01, 0x94, 0xE3, 0xB9], command=4, OV=100)
+        com.data_received(bytes(bytearray(status.build())))
+        await com.receive.get()
+        packet = await com.receive.get()
+        assert packet.parsed['OV']['raw_value'] == 100
+
+    try:
+        run(main())
+        assert registry.get(0x0194E3B9).rorg == RORG.VLD
+    finally:
+        registry.close()
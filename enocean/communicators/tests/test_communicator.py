@@ -1,9 +1,19 @@
 # -*- encoding: utf-8 -*-
 from __future__ import print_function, unicode_literals, division, absolute_import
+import time
+import threading
+from concurrent.futures import TimeoutError
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from nose.tools import raises
 
 from enocean.communicators.communicator import Communicator
 from enocean.protocol.packet import Packet, RadioPacket
-from enocean.protocol.constants import PACKET
+from enocean.protocol.registry import DeviceRegistry
+from enocean.protocol.constants import PACKET, RORG, RETURN_CODE, OVERFLOW
 from enocean.decorators import timing
 
 
@@ -64,29 +74,267 @@ def test_callback():
     assert com.receive.qsize() == 0
 
 
+OTHER_DATA = bytearray([
+    0x55,
+    0x00, 0x0A, 0x07, 0x01,
+    0xEB,
+    0xA5, 0x00, 0x00, 0x55, 0x08, 0x01, 0x81, 0xB7, 0x44, 0x00,
+    0x01, 0xFF, 0xFF, 0xFF, 0xFF, 0x2D, 0x00,
+    0x75
+])
+
+BASE_ID_RESPONSE = bytearray([
+    0x55,
+    0x00, 0x05, 0x00, 0x02,
+    0xCE,
+    0x00, 0xFF, 0x87, 0xCA, 0x00,
+    0xA3
+])
+
+
+class FakeModule(threading.Thread):
+    ''' Writes the response, when a packet is taken from the transmit queue '''
+    def __init__(self, com, responses):
+        super(FakeModule, self).__init__()
+        self.com = com
+        self.responses = list(responses)
+        self.written = []
+
+    def run(self):
+        while self.responses:
+            packet = self.com._get_from_send_queue()
+            if packet is None:
+                time.sleep(0.001)
+                continue
+            self.written.append(packet)
+            self.com._buffer.extend(self.responses.pop(0))
+            self.com.parse()
+
+
 def test_base_id():
     com = Communicator()
+    com.response_timeout = 1
+    module = FakeModule(com, [OTHER_DATA + BASE_ID_RESPONSE])
+    module.start()
+    assert com.base_id == [0xFF, 0x87, 0xCA, 0x00]
+    module.join()
+    assert len(module.written) == 1
+    # User traffic isn't reordered, and the response is passed to the user as well.
+    assert com.receive.qsize() == 2
+    assert com.receive.get().packet_type == PACKET.RADIO_ERP1
+    assert com.receive.get().packet_type == PACKET.RESPONSE
+    # Base ID is cached.
+    assert com.base_id == [0xFF, 0x87, 0xCA, 0x00]
+    assert com.transmit.qsize() == 0
+
+
+def test_base_id_late_response():
+    com = Communicator()
+    com.response_timeout = 0.01
+    # Request isn't written, as the communicator isn't running.
     assert com.base_id is None
+    assert com.transmit.qsize() == 1
+
+    # Request is written later, and a response received.
+    # Base ID is cached from the late response, without sending another request.
+    com.response_timeout = 1
+    assert com._get_from_send_queue().data == [0x08]
+    com._buffer.extend(BASE_ID_RESPONSE)
+    com.parse()
+    assert com.base_id == [0xFF, 0x87, 0xCA, 0x00]
+    assert com.transmit.qsize() == 0
+
+
+def test_base_id_queued():
+    ''' Time spent in the transmit queue isn't counted to the timeout '''
+    com = Communicator()
+    com.response_timeout = 0.05
+    for i in range(5):
+        com.send(Packet(PACKET.COMMON_COMMAND, [0x03]))
+
+    class SlowModule(FakeModule):
+        def run(self):
+            time.sleep(0.1)
+            super(SlowModule, self).run()
+
+    # Module is alive, while the packets are written.
+    com.is_alive = lambda: True
+    module = SlowModule(com, [BASE_ID_RESPONSE] * 6)
+    module.start()
+    assert com.base_id == [0xFF, 0x87, 0xCA, 0x00]
+    module.join()
+    assert module.written[-1].data == [0x08]
+
+
+def test_base_id_not_written():
+    ''' Running communicator, which doesn't empty the transmit queue, isn't waited for forever '''
+    com = Communicator()
+    com.response_timeout = 0.05
+    com.transmit_timeout = 0.05
+    com.is_alive = lambda: True
+    start = time.time()
+    assert com.base_id is None
+    assert time.time() - start < 0.5
+    assert not com._cache_requests
 
-    other_data = bytearray([
-        0x55,
-        0x00, 0x0A, 0x07, 0x01,
-        0xEB,
-        0xA5, 0x00, 0x00, 0x55, 0x08, 0x01, 0x81, 0xB7, 0x44, 0x00,
-        0x01, 0xFF, 0xFF, 0xFF, 0xFF, 0x2D, 0x00,
-        0x75
-    ])
 
-    response_data = bytearray([
+def test_send_command():
+    com = Communicator()
+    assert com._get_from_send_queue() is None
+    radio = Packet.parse_msg(OTHER_DATA)[2]
+    # Same packet object sent as plain packet, doesn't take the future of the command.
+    com.send(radio)
+    first = com.send_command(radio)
+    com.send(radio)
+    second = com.send_command(Packet(PACKET.COMMON_COMMAND, [0x03]), timeout=0)
+    third = com.send_command(Packet(PACKET.COMMON_COMMAND, [0x08]))
+    for i in range(5):
+        assert com._get_from_send_queue() is not None
+
+    # Second command times out, before the responses are received.
+    time.sleep(0.001)
+    com._buffer.extend(BASE_ID_RESPONSE + BASE_ID_RESPONSE + OTHER_DATA + BASE_ID_RESPONSE)
+    com.parse()
+    assert first.result(0).response_data == [0xFF, 0x87, 0xCA, 0x00]
+    assert isinstance(second.exception(0), TimeoutError)
+    # Response to the radio packet wasn't given to the third command.
+    assert not third.done()
+    com._buffer.extend(BASE_ID_RESPONSE)
+    com.parse()
+    assert third.result(0).response_data == [0xFF, 0x87, 0xCA, 0x00]
+    assert com.receive.qsize() == 5
+
+
+@raises(TypeError)
+def test_send_command_fails():
+    Communicator().send_command('AJSNDJASNDJANSD')
+
+
+def test_version():
+    com = Communicator()
+    response = Packet(PACKET.RESPONSE, [RETURN_CODE.OK] + [
+        0x02, 0x0B, 0x01, 0x00,
+        0x02, 0x06, 0x03, 0x00,
+        0x01, 0x8A, 0x7B, 0x1E,
+        0x45, 0x4F, 0x00, 0x03,
+    ] + list(bytearray(b'GATEWAYCTRL')) + [0x00] * 5)
+    module = FakeModule(com, [bytearray(response.build())])
+    module.start()
+    version = com.version
+    module.join()
+    assert module.written[0].data == [0x03]
+    assert version['app_version'] == [0x02, 0x0B, 0x01, 0x00]
+    assert version['api_version'] == [0x02, 0x06, 0x03, 0x00]
+    assert version['chip_id'] == [0x01, 0x8A, 0x7B, 0x1E]
+    assert version['chip_version'] == [0x45, 0x4F, 0x00, 0x03]
+    assert version['app_description'] == 'GATEWAYCTRL'
+    assert com.version is version
+
+
+def test_teach_in_storm():
+    ''' Parsing isn't blocked by UTE teach-in, while the Base ID is fetched '''
+    teach_in = bytearray([
         0x55,
-        0x00, 0x05, 0x00, 0x02,
-        0xCE,
-        0x00, 0xFF, 0x87, 0xCA, 0x00,
-        0xA3
+        0x00, 0x0D, 0x07, 0x01,
+        0xFD,
+        0xD4, 0xA0, 0xFF, 0x3E, 0x00, 0x01, 0x01, 0xD2, 0x01, 0x94, 0xE3, 0xB9, 0x00,
+        0x01, 0xFF, 0xFF, 0xFF, 0xFF, 0x40, 0x00,
+        0xAB
     ])
+    com = Communicator()
+    start = time.time()
+    for i in range(50):
+        com._buffer.extend(teach_in + OTHER_DATA)
+        com.parse()
+    # Not waiting for the Base ID
+    assert time.time() - start < 0.5
+    assert com.receive.qsize() == 100
 
-    com._buffer.extend(other_data)
-    com._buffer.extend(response_data)
+    # A single CO_RD_IDBASE is sent, and the responses are sent once it's answered.
+    assert com.transmit.qsize() == 1
+    assert com._get_from_send_queue().data == [0x08]
+    com._buffer.extend(BASE_ID_RESPONSE)
     com.parse()
     assert com.base_id == [0xFF, 0x87, 0xCA, 0x00]
+    assert com.transmit.qsize() == 50
+    response = com._get_from_send_queue()
+    assert response.rorg == 0xD4
+    assert response.sender == [0xFF, 0x87, 0xCA, 0x00]
+
+    # Once the Base ID is known, responses are sent right away.
+    com._buffer.extend(teach_in)
+    com.parse()
+    assert com.transmit.qsize() == 50
+
+
+def test_bounded_receive():
+    com = Communicator(receive_size=2)
+    for i in range(5):
+        com._buffer.extend(OTHER_DATA)
+    com.parse()
     assert com.receive.qsize() == 2
+    assert com.receive.dropped == 3
+    assert com.receive.high_water == 2
+
+
+def test_bounded_transmit():
+    com = Communicator(transmit_size=1, transmit_overflow=OVERFLOW.DROP_OLDEST)
+    future = com.send_command(Packet(PACKET.COMMON_COMMAND, [0x08]))
+    assert com.send(Packet(PACKET.COMMON_COMMAND, [0x03]))
+    # Dropped request fails right away.
+    assert isinstance(future.exception(0), queue.Full)
+    assert com.transmit.dropped == 1
+
+    com = Communicator(transmit_size=1, transmit_overflow=OVERFLOW.DROP_NEWEST)
+    assert com.send(Packet(PACKET.COMMON_COMMAND, [0x08]))
+    assert not com.send(Packet(PACKET.COMMON_COMMAND, [0x03]))
+    assert com.transmit.qsize() == 1
+
+
+def test_bounded_base_id():
+    ''' Base ID request dropped from the transmit queue isn't waited for '''
+    com = Communicator(transmit_size=1, transmit_overflow=OVERFLOW.DROP_NEWEST)
+    com.send(Packet(PACKET.COMMON_COMMAND, [0x03]))
+    assert com.base_id is None
+    assert not com._cache_requests
+
+
+def test_send_group():
+    com = Communicator()
+    packets = RadioPacket.create_group(RORG.VLD, 0x01, 0x01, [0x01020304, 0x01020305], command=1,
+                                       sender=[0x01, 0x94, 0xE3, 0xB9], OV=100)
+    futures = com.send_group(packets)
+    assert list(futures) == [0x01020304, 0x01020305]
+    assert com.transmit.qsize() == 2
+    assert com._get_from_send_queue().destination_int == 0x01020304
+    assert com._get_from_send_queue().destination_int == 0x01020305
+    response = Packet(PACKET.RESPONSE, [RETURN_CODE.OK])
+    com._buffer.extend(bytearray(response.build()) * 2)
+    com.parse()
+    assert all(future.result(0).response == RETURN_CODE.OK for future in futures.values())
+
+
+def test_registry():
+    ''' Teach-in adds the device to the registry, and its telegrams are decoded '''
+    registry = DeviceRegistry()
+    com = Communicator(registry=registry)
+    # 4BS teach-in of A5-02-05, with the EEP
+    teach_in = Packet(PACKET.RADIO_ERP1, [0xA5, 0x08, 0x2F, 0xFF, 0x80, 0x01, 0x81, 0xB7, 0x44, 0x00],
+                      [0x01, 0xFF, 0xFF, 0xFF, 0xFF, 0x2D, 0x00])
+    temperature = RadioPacket.create(RORG.BS4, 0x02, 0x05, sender=[0x01, 0x81, 0xB7, 0x44], TMP=20)
+    com._buffer.extend(bytearray(teach_in.build()) + bytearray(temperature.build()))
+    com.parse()
+    assert registry.get(0x0181B744).rorg_func == 0x02
+    com.receive.get_nowait()
+    packet = com.receive.get_nowait()
+    assert packet.profile is not None
+    assert round(packet.parsed['TMP']['value']) == 20
+    registry.close()
+
+    # Teach-in is ignored, when disabled.
+    registry = DeviceRegistry()
+    com = Communicator(teach_in=False, registry=registry)
+    com._buffer.extend(bytearray(teach_in.build()))
+    com.parse()
+    assert len(registry) == 0
+    registry.close()
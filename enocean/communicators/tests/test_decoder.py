@@ -0,0 +1,64 @@
+# -*- encoding: utf-8 -*-
+from __future__ import print_function, unicode_literals, division, absolute_import
+import threading
+
+from enocean.communicators.decoder import ProcessPoolDecoder
+from enocean.protocol.packet import Packet, RadioPacket
+from enocean.protocol.constants import PACKET, RORG
+
+
+def radio(sender, value):
+    ''' Returns the packet, as received '''
+    packet = RadioPacket.create(RORG.BS4, 0x02, 0x05, sender=[0xDE, 0xAD, 0xBE, sender], TMP=value)
+    return Packet.from_frame(PACKET.RADIO_ERP1, packet.data, packet.optional)
+
+
+def test_decode():
+    packets = []
+    done = threading.Event()
+
+    def callback(packet):
+        packets.append(packet)
+        if len(packets) == 121:
+            done.set()
+
+    decoder = ProcessPoolDecoder(callback, profiles={0xDEADBE00: (0x02, 0x05), 0xDEADBE01: (0x02, 0x05)},
+                                 workers=2, batch_size=16)
+    try:
+        for value in range(40):
+            for sender in range(3):
+                decoder(radio(sender, value))
+        decoder(Packet(PACKET.RESPONSE, [0x00]))
+        assert done.wait(10)
+    finally:
+        decoder.stop()
+
+    # Packets are passed on in the order they were received.
+    assert [packet.sender_int & 0xFF for packet in packets[:-1]] == [0, 1, 2] * 40
+    assert packets[-1].packet_type == PACKET.RESPONSE
+    for sender in (0, 1):
+        values = [packet.parsed['TMP']['value'] for packet in packets[:-1] if packet.sender_int & 0xFF == sender]
+        assert [int(round(value)) for value in values] == list(range(40))
+        assert all(packet.rorg_func == 0x02 for packet in packets[sender:-1:3])
+    # Packets without a profile are passed on undecoded.
+    assert all(not packet.parsed and packet.rorg_func is None for packet in packets[2:-1:3])
+    assert decoder.decoded == 80
+    assert decoder.errors == 0
+
+
+def test_batch_time():
+    ''' Partial batches are sent after batch_time '''
+    packets = []
+    done = threading.Event()
+
+    def callback(packet):
+        packets.append(packet)
+        done.set()
+
+    decoder = ProcessPoolDecoder(callback, profiles=lambda packet: (0x02, 0x05), workers=1, batch_time=0.01)
+    try:
+        decoder(radio(0, 21))
+        assert done.wait(10)
+    finally:
+        decoder.stop()
+    assert int(round(packets[0].parsed['TMP']['value'])) == 21
@@ -0,0 +1,63 @@
+# -*- encoding: utf-8 -*-
+from __future__ import print_function, unicode_literals, division, absolute_import
+from enocean.communicators.dedupe import DuplicateFilter
+from enocean.communicators.communicator import Communicator
+from enocean.protocol.packet import Packet, RadioPacket
+from enocean.protocol.constants import PACKET, RORG
+
+
+def radio(value=20, dBm=-60):
+    packet = RadioPacket.create(RORG.BS4, 0x02, 0x05, sender=[0xDE, 0xAD, 0xBE, 0xEF], TMP=value)
+    packet.optional = [0x03, 0xFF, 0xFF, 0xFF, 0xFF, -dBm, 0x00]
+    return packet
+
+
+def test_window():
+    dedupe = DuplicateFilter(window=1)
+    assert not dedupe.is_duplicate(radio(), now=10)
+    # Repeated telegram is received with different signal strength.
+    assert dedupe.is_duplicate(radio(dBm=-80), now=10.01)
+    assert dedupe.is_duplicate(radio(), now=10.5)
+    assert not dedupe.is_duplicate(radio(value=21), now=10.5)
+    # Window is counted from the first reception.
+    assert not dedupe.is_duplicate(radio(), now=11.01)
+    assert dedupe.suppressed == 2
+
+
+def test_repeated():
+    ''' Copy forwarded by a repeater has a different repeater count in the status '''
+    dedupe = DuplicateFilter(window=1)
+    original = radio()
+    repeated = radio(dBm=-80)
+    repeated.data[-1] = (repeated.data[-1] & 0xF0) | 0x01
+    assert repeated.data != original.data
+    assert not dedupe.is_duplicate(original, now=10)
+    assert dedupe.is_duplicate(repeated, now=10.01)
+    assert dedupe.suppressed == 1
+
+
+def test_other_packets():
+    dedupe = DuplicateFilter()
+    for i in range(3):
+        assert not dedupe.is_duplicate(Packet(PACKET.RESPONSE, [0x00]))
+    assert len(dedupe) == 0
+
+
+def test_size():
+    dedupe = DuplicateFilter(window=10, size=3)
+    for value in range(5):
+        assert not dedupe.is_duplicate(radio(value), now=0)
+    # Memory is limited, the oldest telegrams are forgotten.
+    assert len(dedupe) == 3
+    assert not dedupe.is_duplicate(radio(0), now=0)
+    assert dedupe.is_duplicate(radio(4), now=0)
+
+
+def test_communicator():
+    com = Communicator(dedupe_window=1)
+    frame = bytearray(radio().build())
+    com._buffer.extend(frame * 3)
+    com.parse()
+    assert com.receive.qsize() == 1
+    assert com.dedupe.suppressed == 2
+    assert Communicator().dedupe is None
@@ -0,0 +1,124 @@
+# -*- encoding: utf-8 -*-
+from __future__ import print_function, unicode_literals, division, absolute_import
+import threading
+
+from nose.tools import raises
+
+from enocean.communicators.dispatcher import CallbackDispatcher
+from enocean.protocol.packet import Packet, RadioPacket
+from enocean.protocol.constants import PACKET, RORG, OVERFLOW
+
+
+def radio(sender, value):
+    return RadioPacket.create(RORG.BS4, 0x02, 0x05, sender=[0xDE, 0xAD, 0xBE, sender], TMP=value)
+
+
+def values(packets):
+    return [int(round(packet.parsed['TMP']['value'])) for packet in packets]
+
+
+def test_order():
+    handled = {}
+    lock = threading.Lock()
+
+    def callback(packet):
+        if packet.packet_type != PACKET.RADIO_ERP1:
+            return
+        with lock:
+            handled.setdefault(packet.sender_int, []).append(packet)
+
+    dispatcher = CallbackDispatcher(callback, workers=3)
+    for value in range(40):
+        for sender in range(5):
+            assert dispatcher(radio(sender, value))
+    dispatcher(Packet(PACKET.RESPONSE, [0x00]))
+    assert dispatcher.join(1)
+    dispatcher.stop()
+
+    # Packets from each sender are handled in the order they were received.
+    assert len(handled) == 5
+    for packets in handled.values():
+        assert values(packets) == list(range(40))
+    stats = dispatcher.stats()
+    assert stats['dispatched'] == stats['handled'] == 201
+    assert stats['dropped'] == stats['errors'] == stats['pending'] == 0
+
+
+def blocked(overflow):
+    ''' Returns a dispatcher, whose single worker is blocked until the returned event is set '''
+    release = threading.Event()
+    started = threading.Event()
+    handled = []
+
+    def callback(packet):
+        started.set()
+        release.wait(1)
+        handled.append(packet)
+
+    dispatcher = CallbackDispatcher(callback, workers=1, backlog=2, overflow=overflow)
+    dispatcher(radio(0, 0))
+    assert started.wait(1)
+    return dispatcher, release, handled
+
+
+def test_drop_newest():
+    dispatcher, release, handled = blocked(OVERFLOW.DROP_NEWEST)
+    assert dispatcher(radio(0, 1))
+    assert dispatcher(radio(0, 2))
+    assert not dispatcher(radio(0, 3))
+    assert dispatcher.pending == 2
+    release.set()
+    assert dispatcher.join(1)
+    dispatcher.stop()
+    assert values(handled) == [0, 1, 2]
+    assert dispatcher.dropped == 1
+    assert dispatcher.high_water == 2
+
+
+def test_drop_oldest():
+    dispatcher, release, handled = blocked(OVERFLOW.DROP_OLDEST)
+    for value in range(1, 5):
+        assert dispatcher(radio(0, value))
+    release.set()
+    assert dispatcher.join(1)
+    dispatcher.stop()
+    assert values(handled) == [0, 3, 4]
+    assert dispatcher.dropped == 2
+
+
+def test_block():
+    dispatcher, release, handled = blocked(OVERFLOW.BLOCK)
+    dispatcher(radio(0, 1))
+    dispatcher(radio(0, 2))
+    producer = threading.Thread(target=dispatcher, args=(radio(0, 3), ))
+    producer.start()
+    producer.join(0.05)
+    # Waits for space in the backlog.
+    assert producer.is_alive()
+    release.set()
+    producer.join(1)
+    assert dispatcher.join(1)
+    dispatcher.stop()
+    assert values(handled) == [0, 1, 2, 3]
+    assert dispatcher.dropped == 0
+
+
+def test_errors():
+    def callback(packet):
+        raise ValueError('Broken callback')
+
+    dispatcher = CallbackDispatcher(callback, workers=2)
+    dispatcher(radio(0, 0))
+    dispatcher(radio(1, 0))
+    assert dispatcher.join(1)
+    dispatcher.stop()
+    # Workers keep running after an exception.
+    assert dispatcher.errors == 2
+    assert dispatcher.handled == 2
+
+
+@raises(RuntimeError)
+def test_stopped():
+    dispatcher = CallbackDispatcher(lambda packet: None, workers=1)
+    dispatcher.stop()
+    dispatcher(radio(0, 0))
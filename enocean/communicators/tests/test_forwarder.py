@@ -0,0 +1,123 @@
+# -*- encoding: utf-8 -*-
+from __future__ import print_function, unicode_literals, division, absolute_import
+import time
+import socket
+
+from enocean.communicators.forwarder import TCPForwarder
+from enocean.communicators.tcpcommunicator import TCPCommunicator
+from enocean.communicators.utils import send_to_tcp_socket
+from enocean.protocol.packet import RadioPacket
+from enocean.protocol.constants import RORG
+
+
+def radio(value):
+    return RadioPacket.create(RORG.BS4, 0x02, 0x05, sender=[0xDE, 0xAD, 0xBE, 0xEF], TMP=value)
+
+
+def value(packet):
+    packet.parse_eep(0x02, 0x05)
+    return int(round(packet.parsed['TMP']['value']))
+
+
+def free_port():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def start_server(port):
+    com = TCPCommunicator(host='127.0.0.1', port=port)
+    com.start()
+    for i in range(100):
+        if com.address is not None:
+            break
+        time.sleep(0.01)
+    return com
+
+
+def receive(com, count):
+    return [com.receive.get(timeout=1) for i in range(count)]
+
+
+def test_forward():
+    server = start_server(0)
+    forwarder = TCPForwarder(*server.address)
+    forwarder.start()
+    try:
+        for i in range(20):
+            forwarder.send(radio(i))
+        packets = receive(server, 20)
+        assert [value(packet) for packet in packets] == list(range(20))
+        # Counted after sendall() returns, which may be after the server has received the packets.
+        for i in range(100):
+            if forwarder.sent == 20:
+                break
+            time.sleep(0.01)
+        # Single, persistent connection.
+        assert forwarder.connects == 1
+        assert forwarder.sent == 20
+    finally:
+        forwarder.stop()
+        forwarder.join(1)
+        server.stop()
+        server.join(1)
+    assert not forwarder.is_alive()
+
+
+def test_reconnect():
+    port = free_port()
+    forwarder = TCPForwarder('127.0.0.1', port, buffer_size=5, backoff=0.01, max_backoff=0.05)
+    forwarder.start()
+    server = None
+    try:
+        # Buffered while the server isn't running, the oldest packets are dropped.
+        for i in range(8):
+            forwarder.send(radio(i))
+        time.sleep(0.05)
+        assert not forwarder.connected
+        assert forwarder.dropped == 3
+        server = start_server(port)
+        packets = receive(server, 5)
+        assert [value(packet) for packet in packets] == [3, 4, 5, 6, 7]
+
+        # Reconnects, after the server has been restarted.
+        server.stop()
+        server.join(1)
+        server = start_server(port)
+        time.sleep(0.01)
+        forwarder.send(radio(8))
+        assert value(receive(server, 1)[0]) == 8
+        assert forwarder.connects == 2
+    finally:
+        forwarder.stop()
+        forwarder.join(1)
+        if server is not None:
+            server.stop()
+            server.join(1)
+
+
+def test_expire():
+    forwarder = TCPForwarder('127.0.0.1', free_port(), buffer_time=0.01, backoff=0.01)
+    forwarder.start()
+    try:
+        forwarder.send(radio(0))
+        time.sleep(0.05)
+        forwarder.send(radio(1))
+        time.sleep(0.02)
+        assert forwarder.dropped >= 1
+    finally:
+        forwarder.stop()
+        forwarder.join(1)
+    assert not forwarder.is_alive()
+
+
+def test_send_to_tcp_socket():
+    server = start_server(0)
+    try:
+        send_to_tcp_socket(server.address[0], server.address[1], radio(21))
+        assert value(receive(server, 1)[0]) == 21
+    finally:
+        server.stop()
+        server.join(1)
@@ -0,0 +1,90 @@
+# -*- encoding: utf-8 -*-
+from __future__ import print_function, unicode_literals, division, absolute_import
+import asyncio
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from nose.tools import raises
+
+from enocean.communicators.queues import BoundedQueue, AsyncioBoundedQueue
+from enocean.protocol.constants import OVERFLOW
+
+
+def drain(q):
+    items = []
+    while not q.empty():
+        items.append(q.get_nowait())
+    return items
+
+
+def test_unbounded():
+    q = BoundedQueue()
+    for i in range(100):
+        assert q.put(i)
+    assert q.high_water == 100
+    assert q.dropped == 0
+
+
+def test_drop_oldest():
+    dropped = []
+    q = BoundedQueue(3, OVERFLOW.DROP_OLDEST, on_drop=dropped.append)
+    for i in range(5):
+        assert q.put(i)
+    assert drain(q) == [2, 3, 4]
+    assert dropped == [0, 1]
+    assert q.dropped == 2
+    assert q.high_water == 3
+    # task_done() is called once for each item taken from the queue.
+    for i in range(3):
+        q.task_done()
+    q.join()
+
+
+def test_drop_newest():
+    q = BoundedQueue(3, OVERFLOW.DROP_NEWEST)
+    assert all(q.put(i) for i in range(3))
+    assert not q.put(3)
+    assert drain(q) == [0, 1, 2]
+    assert q.dropped == 1
+
+
+@raises(queue.Full)
+def test_block():
+    q = BoundedQueue(1, OVERFLOW.BLOCK)
+    q.put(0)
+    q.put(1, timeout=0.01)
+
+
+def test_asyncio():
+    async def main():
+        dropped = []
+        q = AsyncioBoundedQueue(2, OVERFLOW.DROP_OLDEST, on_drop=dropped.append)
+        for i in range(4):
+            assert q.put_nowait(i)
+        assert [await q.get(), await q.get()] == [2, 3]
+        assert dropped == [0, 1]
+        assert q.high_water == 2
+
+        q = AsyncioBoundedQueue(2, OVERFLOW.DROP_NEWEST)
+        assert q.put_nowait(0) and q.put_nowait(1)
+        assert not q.put_nowait(2)
+        assert q.dropped == 1
+
+        space = []
+        q = AsyncioBoundedQueue(1, OVERFLOW.BLOCK, on_space=lambda: space.append(True))
+        q.put_nowait(0)
+        try:
+            q.put_nowait(1)
+            assert False
+        except asyncio.QueueFull:
+            pass
+        assert await q.get() == 0
+        assert space == [True]
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(main())
+    finally:
+        loop.close()
@@ -0,0 +1,86 @@
+# -*- encoding: utf-8 -*-
+from __future__ import print_function, unicode_literals, division, absolute_import
+from nose.tools import raises
+
+from enocean.communicators.router import PacketRouter
+from enocean.protocol.packet import Packet, RadioPacket
+from enocean.protocol.constants import PACKET, RORG
+from enocean.decorators import timing
+
+
+def radio(sender, rorg=RORG.BS4):
+    if rorg == RORG.RPS:
+        return RadioPacket.create(RORG.RPS, 0x02, 0x02, sender=sender, R1=0)
+    return RadioPacket.create(RORG.BS4, 0x02, 0x05, sender=sender, TMP=20)
+
+
+def test_route():
+    router = PacketRouter()
+    received = {}
+
+    def handler(name):
+        return lambda packet: received.setdefault(name, []).append(packet)
+
+    router.subscribe(handler('sender'), sender=[0x01, 0x94, 0xE3, 0xB9])
+    router.subscribe(handler('sender_int'), sender=0x0194E3B9)
+    router.subscribe(handler('sender_rps'), sender=0x0194E3B9, rorg=RORG.RPS)
+    router.subscribe(handler('bs4'), rorg=RORG.BS4)
+    router.subscribe(handler('response'), packet_type=PACKET.RESPONSE)
+    router.subscribe(handler('all'))
+
+    assert router(radio([0x01, 0x94, 0xE3, 0xB9])) == 4
+    assert router(radio([0x01, 0x94, 0xE3, 0xB9], RORG.RPS)) == 4
+    assert router(radio([0x01, 0x02, 0x03, 0x04])) == 2
+    assert router(Packet(PACKET.RESPONSE, [0x00])) == 2
+    assert router(Packet(PACKET.EVENT, [0x01])) == 1
+
+    assert len(received['sender']) == len(received['sender_int']) == 2
+    assert len(received['sender_rps']) == 1
+    assert len(received['bs4']) == 2
+    assert len(received['response']) == 1
+    assert len(received['all']) == 5
+
+
+def test_unsubscribe():
+    router = PacketRouter()
+    received = []
+    subscription = router.subscribe(received.append, sender=[0x01, 0x94, 0xE3, 0xB9])
+    assert router(radio([0x01, 0x94, 0xE3, 0xB9])) == 1
+    assert router.unsubscribe(subscription)
+    assert not router.unsubscribe(subscription)
+    assert router(radio([0x01, 0x94, 0xE3, 0xB9])) == 0
+    assert len(received) == 1
+    assert not router._senders
+
+
+def test_handler_error():
+    router = PacketRouter()
+    received = []
+
+    def broken(packet):
+        raise ValueError('Broken handler')
+
+    router.subscribe(broken)
+    router.subscribe(received.append)
+    # Other handlers are called, even if one fails.
+    assert router(radio([0x01, 0x02, 0x03, 0x04])) == 2
+    assert len(received) == 1
+
+
+@raises(ValueError)
+def test_invalid_sender():
+    PacketRouter().subscribe(print, sender=[0x01, 0x02])
+
+
+MANY = PacketRouter()
+for sender in range(10000):
+    MANY.subscribe(print, sender=sender)
+MANY_RECEIVED = []
+MANY.subscribe(MANY_RECEIVED.append, sender=0xFFFFFFF0)
+MANY_PACKET = radio([0xFF, 0xFF, 0xFF, 0xF0])
+
+
+@timing(rounds=1000, limit=0.5)
+def test_many_subscriptions():
+    ''' Routing doesn't depend on the number of subscriptions '''
+    assert MANY(MANY_PACKET) == 1
@@ -0,0 +1,194 @@
+# -*- encoding: utf-8 -*-
+from __future__ import print_function, unicode_literals, division, absolute_import
+import os
+import time
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from nose.tools import raises
+
+from enocean.communicators.scheduler import TransmitScheduler, TokenBucket
+from enocean.communicators.communicator import Communicator
+from enocean.communicators.serialcommunicator import SerialCommunicator
+from enocean.protocol.packet import Packet, RadioPacket
+from enocean.protocol.constants import PACKET, RORG, PRIORITY
+
+
+def radio(destination, value=0):
+    return RadioPacket.create(RORG.VLD, 0x01, 0x01, destination=[0xDE, 0xAD, 0xBE, destination],
+                              sender=[0x01, 0x02, 0x03, 0x04], command=1, OV=value)
+
+
+def drain(scheduler):
+    entries = []
+    while True:
+        try:
+            entries.append(scheduler.get(block=False))
+        except queue.Empty:
+            return entries
+
+
+def test_token_bucket():
+    bucket = TokenBucket(10, burst=2, now=0)
+    assert bucket.delay(0) == 0
+    bucket.take()
+    bucket.take()
+    assert abs(bucket.delay(0) - 0.1) < 1e-9
+    assert abs(bucket.delay(0.05) - 0.05) < 1e-9
+    assert bucket.delay(1) == 0
+    # Tokens don't exceed the burst.
+    assert bucket.tokens == 2
+
+
+def test_priority():
+    sent = []
+    scheduler = TransmitScheduler(on_sent=lambda packet, wait, priority: sent.append(priority))
+    bulk = radio(1)
+    normal = radio(2)
+    command = Packet(PACKET.COMMON_COMMAND, [0x08])
+    urgent = radio(3)
+    scheduler.put(bulk, priority=PRIORITY.LOW)
+    scheduler.put(normal)
+    scheduler.put(command)
+    scheduler.put(urgent, priority=PRIORITY.HIGH)
+    assert scheduler.qsize() == 4
+    assert drain(scheduler) == [command, urgent, normal, bulk]
+    assert sent == [PRIORITY.HIGH, PRIORITY.HIGH, PRIORITY.NORMAL, PRIORITY.LOW]
+    stats = scheduler.wait_stats()
+    assert stats[PRIORITY.HIGH]['sent'] == 2
+    assert stats[PRIORITY.LOW]['max'] >= 0
+
+
+def test_rate():
+    scheduler = TransmitScheduler(rate=100, burst=2)
+    for i in range(4):
+        scheduler.put(radio(i))
+    # Commands to the module aren't limited.
+    scheduler.put(Packet(PACKET.COMMON_COMMAND, [0x08]))
+    assert len(drain(scheduler)) == 3
+    assert 0 < scheduler.delay() <= 0.01
+    start = time.time()
+    scheduler.get(timeout=1)
+    assert time.time() - start < 0.05
+    assert scheduler.delay() > 0
+    scheduler.get(timeout=1)
+    assert scheduler.delay() is None
+
+
+def test_destination_rate():
+    ''' Packets waiting for their destination don't hold up others '''
+    scheduler = TransmitScheduler(destination_rate=1)
+    first, second, third = radio(1, 0), radio(1, 1), radio(2, 0)
+    for packet in (first, second, third):
+        scheduler.put(packet)
+    assert drain(scheduler) == [first, third]
+    assert scheduler.qsize() == 1
+    assert 0.9 < scheduler.delay() <= 1
+
+
+@raises(queue.Full)
+def test_maxsize():
+    scheduler = TransmitScheduler(maxsize=1)
+    scheduler.put(radio(1))
+    scheduler.put(radio(2), block=False)
+
+
+def test_communicator():
+    scheduler = TransmitScheduler()
+    com = Communicator(scheduler=scheduler)
+    assert com.transmit is scheduler
+    com.send(radio(1))
+    future = com.send_command(Packet(PACKET.COMMON_COMMAND, [0x08]))
+    com.send(radio(2), priority=PRIORITY.HIGH)
+    assert com._get_from_send_queue().packet_type == PACKET.COMMON_COMMAND
+    assert com._get_from_send_queue().destination_int == 0xDEADBE02
+    assert com._get_from_send_queue().destination_int == 0xDEADBE01
+    assert not future.done()
+
+
+@raises(ValueError)
+def test_priority_without_scheduler():
+    Communicator().send(radio(1), priority=PRIORITY.HIGH)
+
+
+def test_priority_without_scheduler_command():
+    com = Communicator()
+    for send in (com.send_command, lambda packet, priority: com.send_group([packet], priority=priority)):
+        try:
+            send(radio(1), priority=PRIORITY.LOW)
+            assert False
+        except ValueError:
+            pass
+    assert com.transmit.empty()
+    # Default priority is fine.
+    assert com.send(radio(1))
+
+
+def test_serial_batch():
+    ''' Packets queued are written at once, paced packets are written when allowed '''
+    master, slave = os.openpty()
+    scheduler = TransmitScheduler(destination_rate=20)
+    com = SerialCommunicator(port=os.ttyname(slave), scheduler=scheduler, timeout=10)
+    com.teach_in = False
+    try:
+        for i in range(3):
+            com.send(radio(i))
+        com.send(radio(0, 1))
+        com.start()
+        time.sleep(0.01)
+        expected = b''.join(bytes(bytearray(radio(i).build())) for i in range(3))
+        assert os.read(master, 1024) == expected
+        time.sleep(0.06)
+        assert os.read(master, 1024) == bytes(bytearray(radio(0, 1).build()))
+    finally:
+        com.stop()
+        com.join(1)
+        os.close(master)
+        os.close(slave)
+    assert not com.is_alive()
+
+
+def test_coalesce():
+    scheduler = TransmitScheduler(coalesce=True)
+    first = radio(1, 10)
+    other = radio(2, 10)
+    scheduler.put(first)
+    scheduler.put(other)
+    scheduler.put(Packet(PACKET.COMMON_COMMAND, [0x08]))
+    # Set-points to the same actuator replace the one waiting, in its place.
+    for value in range(20, 100, 10):
+        scheduler.put(radio(1, value))
+    latest = radio(1, 100)
+    scheduler.put(latest)
+    # Different priority, or command
+    urgent = radio(1, 0)
+    scheduler.put(urgent, priority=PRIORITY.HIGH)
+    query = RadioPacket.create(RORG.VLD, 0x01, 0x01, destination=[0xDE, 0xAD, 0xBE, 0x01],
+                               sender=[0x01, 0x02, 0x03, 0x04], command=4)
+    scheduler.put(query)
+
+    assert scheduler.qsize() == 5
+    assert scheduler.coalesced == 9
+    entries = drain(scheduler)
+    assert entries[1:] == [urgent, latest, other, query]
+    assert entries[2].parsed['OV']['raw_value'] == 100
+    assert not scheduler._pending
+
+    # Packets sent are no longer replaced.
+    scheduler.put(radio(1, 10))
+    assert scheduler.qsize() == 1
+
+
+def test_coalesce_requests():
+    ''' Packets sent with send_command() aren't replaced, nor replace others '''
+    com = Communicator(scheduler=TransmitScheduler(coalesce=True))
+    com.send(radio(1, 10))
+    future = com.send_command(radio(1, 20))
+    com.send(radio(1, 30))
+    assert com.transmit.qsize() == 2
+    assert com.transmit.coalesced == 1
+    assert com._get_from_send_queue().parsed['OV']['raw_value'] == 30
+    assert com._get_from_send_queue().parsed['OV']['raw_value'] == 20
+    assert not future.done()
@@ -0,0 +1,116 @@
+# -*- encoding: utf-8 -*-
+from __future__ import print_function, unicode_literals, division, absolute_import
+import os
+import time
+import select
+import threading
+
+from enocean.communicators.serialcommunicator import SerialCommunicator
+from enocean.protocol.packet import Packet, RadioPacket
+from enocean.protocol.constants import PACKET
+
+RADIO_DATA = bytearray([
+    0x55,
+    0x00, 0x0A, 0x07, 0x01,
+    0xEB,
+    0xA5, 0x00, 0x00, 0x55, 0x08, 0x01, 0x81, 0xB7, 0x44, 0x00,
+    0x01, 0xFF, 0xFF, 0xFF, 0xFF, 0x2D, 0x00,
+    0x75
+])
+
+# Maximum median latency (in milliseconds) from writing a frame to the pty, to the callback.
+# The polling reader used to add up to the 100 ms read timeout.
+LATENCY_BUDGET = 20
+ROUNDS = 20
+
+
+class PTY(object):
+    ''' Pseudo-terminal standing in for the serial port '''
+    def __enter__(self):
+        self.master, self.slave = os.openpty()
+        return self
+
+    def __exit__(self, *args):
+        os.close(self.master)
+        os.close(self.slave)
+
+    @property
+    def port(self):
+        return os.ttyname(self.slave)
+
+
+def test_latency():
+    with PTY() as pty:
+        received = threading.Event()
+        packets = []
+
+        def callback(packet):
+            packets.append(packet)
+            received.set()
+
+        com = SerialCommunicator(port=pty.port, callback=callback, baudrate=115200)
+        com.start()
+        try:
+            latencies = []
+            for i in range(ROUNDS):
+                received.clear()
+                # Let the thread go back to waiting on the port.
+                time.sleep(0.005)
+                start = time.time()
+                os.write(pty.master, bytes(RADIO_DATA))
+                assert received.wait(1)
+                latencies.append((time.time() - start) * 1e3)
+        finally:
+            com.stop()
+            com.join(1)
+        assert not com.is_alive()
+
+    latencies.sort()
+    median = latencies[len(latencies) // 2]
+    print('Serial receive latency: median %.03f ms, max %.03f ms.' % (median, latencies[-1]))
+    assert median < LATENCY_BUDGET, 'Latency too high: %.03f > %.03f' % (median, LATENCY_BUDGET)
+    assert len(packets) == ROUNDS
+    assert all(isinstance(packet, RadioPacket) for packet in packets)
+
+
+def test_burst():
+    ''' Frames received in a burst are read in a single call, and all parsed '''
+    with PTY() as pty:
+        packets = []
+        com = SerialCommunicator(port=pty.port, callback=packets.append, read_size=4096)
+        com.start()
+        try:
+            os.write(pty.master, bytes(RADIO_DATA * 50))
+            for i in range(100):
+                if len(packets) == 50:
+                    break
+                time.sleep(0.01)
+        finally:
+            com.stop()
+            com.join(1)
+    assert len(packets) == 50
+
+
+def test_send_wakes_up():
+    ''' Sending doesn't wait for the read timeout '''
+    with PTY() as pty:
+        com = SerialCommunicator(port=pty.port, timeout=10)
+        com.start()
+        try:
+            time.sleep(0.01)
+            # Base ID is requested, when the communicator starts.
+            assert bytearray(os.read(pty.master, 1024)) == bytearray(Packet(PACKET.COMMON_COMMAND, [0x08]).build())
+            start = time.time()
+            com.send(Packet(PACKET.COMMON_COMMAND, [0x03]))
+            readable, _, _ = select.select([pty.master], [], [], 1)
+            duration = (time.time() - start) * 1e3
+            assert readable
+            assert bytearray(os.read(pty.master, 1024)) == bytearray(Packet(PACKET.COMMON_COMMAND, [0x03]).build())
+            assert duration < LATENCY_BUDGET, 'Latency too high: %.03f > %.03f' % (duration, LATENCY_BUDGET)
+        finally:
+            start = time.time()
+            com.stop()
+            com.join(1)
+        # Stopping doesn't wait for the read timeout either.
+        assert not com.is_alive()
+        assert time.time() - start < 1
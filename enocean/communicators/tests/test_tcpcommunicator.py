@@ -0,0 +1,89 @@
+# -*- encoding: utf-8 -*-
+from __future__ import print_function, unicode_literals, division, absolute_import
+import time
+import socket
+
+from enocean.communicators.tcpcommunicator import TCPCommunicator
+from enocean.protocol.packet import Packet, RadioPacket
+from enocean.protocol.constants import PACKET
+
+RADIO_DATA = bytes(bytearray([
+    0x55,
+    0x00, 0x0A, 0x07, 0x01,
+    0xEB,
+    0xA5, 0x00, 0x00, 0x55, 0x08, 0x01, 0x81, 0xB7, 0x44, 0x00,
+    0x01, 0xFF, 0xFF, 0xFF, 0xFF, 0x2D, 0x00,
+    0x75
+]))
+
+
+def start():
+    com = TCPCommunicator(host='127.0.0.1', port=0)
+    com.start()
+    for i in range(100):
+        if com.address is not None:
+            break
+        time.sleep(0.01)
+    return com
+
+
+def connect(com):
+    return socket.create_connection(com.address, 1)
+
+
+def test_concurrent_clients():
+    ''' Clients are served at the same time, packets are parsed as soon as they're received '''
+    com = start()
+    clients = [connect(com) for i in range(3)]
+    try:
+        # Split frames of different clients don't mix.
+        for client in clients:
+            client.sendall(RADIO_DATA[:7])
+        time.sleep(0.01)
+        for client in clients:
+            client.sendall(RADIO_DATA[7:])
+            # Parsed, while the client is still connected.
+            packet = com.receive.get(timeout=1)
+            assert isinstance(packet, RadioPacket)
+            assert packet.sender_hex == '01:81:B7:44'
+        assert com.receive.empty()
+    finally:
+        for client in clients:
+            client.close()
+        com.stop()
+        com.join(1)
+    assert not com.is_alive()
+
+
+def test_disconnect():
+    com = start()
+    try:
+        client = connect(com)
+        client.sendall(RADIO_DATA * 2)
+        client.close()
+        assert isinstance(com.receive.get(timeout=1), RadioPacket)
+        assert isinstance(com.receive.get(timeout=1), RadioPacket)
+        # Server keeps accepting new clients.
+        client = connect(com)
+        client.sendall(RADIO_DATA)
+        assert isinstance(com.receive.get(timeout=1), RadioPacket)
+        client.close()
+    finally:
+        com.stop()
+        com.join(1)
+    assert not com.is_alive()
+
+
+def test_base_id():
+    ''' Packets aren't written, so commands fail right away '''
+    com = start()
+    try:
+        started = time.time()
+        assert com.base_id is None
+        assert time.time() - started < 0.5
+        future = com.send_command(Packet(PACKET.COMMON_COMMAND, [0x08]))
+        assert isinstance(future.exception(0), RuntimeError)
+    finally:
+        com.stop()
+        com.join(1)
+    assert not com.is_alive()
@@ -0,0 +1,123 @@
+# -*- encoding: utf-8 -*-
+from __future__ import print_function, unicode_literals, division, absolute_import
+import time
+from concurrent.futures import TimeoutError
+
+from nose.tools import raises
+
+from enocean.communicators.tracker import ReplyTracker, TimerWheel
+from enocean.communicators.communicator import Communicator
+from enocean.protocol.packet import Packet, RadioPacket
+from enocean.protocol.constants import PACKET, RORG
+from enocean.decorators import timing
+
+
+def command(actuator, cmd=1, **kwargs):
+    return RadioPacket.create(RORG.VLD, 0x01, 0x01, destination=[0xDE, 0xAD, 0xBE, actuator],
+                              sender=[0x01, 0x02, 0x03, 0x04], command=cmd, **kwargs)
+
+
+def status(actuator, value):
+    ''' Status Response of the actuator, as received '''
+    created = RadioPacket.create(RORG.VLD, 0x01, 0x01, sender=[0xDE, 0xAD, 0xBE, actuator], command=4, OV=value)
+    return Packet.from_frame(created.packet_type, created.data, created.optional)
+
+
+def sent(communicator):
+    packets = []
+    while not communicator.transmit.empty():
+        packets.append(communicator.transmit.get_nowait())
+    return packets
+
+
+def test_timer_wheel():
+    wheel = TimerWheel(tick=0.1, size=8, now=0)
+    wheel.schedule(0.25, 'a', now=0)
+    cancelled = wheel.schedule(0.35, 'b', now=0)
+    # Beyond one round of the wheel
+    wheel.schedule(1.55, 'c', now=0)
+    assert len(wheel) == 3
+    assert wheel.advance(0.15) == []
+    assert wheel.advance(0.3) == ['a']
+    wheel.cancel(cancelled)
+    wheel.cancel(cancelled)
+    assert len(wheel) == 1
+    assert wheel.advance(1.0) == []
+    assert wheel.advance(10.0) == ['c']
+    assert len(wheel) == 0
+    # Timers in the past expire on the next tick.
+    wheel.schedule(-1, 'd', now=10.0)
+    assert wheel.advance(10.15) == ['d']
+
+
+def test_reply():
+    com = Communicator()
+    tracker = ReplyTracker(com)
+    results = []
+    future = tracker.send(command(0x01, OV=100), callback=results.append)
+    other = tracker.send(command(0x02, OV=50))
+    assert len(sent(com)) == 2
+    assert len(tracker) == 2
+
+    # Other senders and commands don't match.
+    tracker(status(0x03, 100))
+    query = command(0x01)
+    tracker(Packet.from_frame(query.packet_type, query.data, query.optional))
+    tracker(Packet(PACKET.RESPONSE, [0x00]))
+    assert not future.done()
+
+    reply = status(0x01, 100)
+    tracker(reply)
+    assert future.result(0) is reply
+    assert results == [future]
+    assert reply.parsed['OV']['raw_value'] == 100
+    assert not other.done()
+    assert len(tracker) == 1
+    assert tracker.replies == 1
+
+
+def test_retries():
+    com = Communicator()
+    tracker = ReplyTracker(com, timeout=0.05, retries=2, backoff=1.5, tick=0.01)
+    tracker.start()
+    try:
+        packet = command(0x01, OV=100)
+        future = tracker.send(packet)
+        answered = tracker.send(command(0x02, OV=0))
+        time.sleep(0.1)
+        tracker(status(0x02, 0))
+        try:
+            future.result(1)
+            assert False
+        except TimeoutError:
+            pass
+        assert answered.result(0).sender_int == 0xDEADBE02
+        # Sent, and sent again twice
+        assert [p for p in sent(com) if p.destination_int == 0xDEADBE01] == [packet] * 3
+        assert tracker.resent >= 3
+        assert tracker.timeouts == 1
+        assert len(tracker) == 0
+        assert not tracker._expected
+    finally:
+        tracker.stop()
+        tracker.join(1)
+
+
+@raises(ValueError)
+def test_unknown_reply():
+    # Status Response isn't a command to the actuator.
+    ReplyTracker(Communicator()).send(command(0x01, cmd=4))
+
+
+@timing(1)
+def test_outstanding():
+    ''' Many commands waiting for replies are cheap to track '''
+    com = Communicator(transmit_size=20000)
+    tracker = ReplyTracker(com, timeout=60)
+    futures = [tracker.send(command(i % 256, OV=i % 100)) for i in range(10000)]
+    assert len(tracker) == 10000
+    assert tracker._wheel.advance() == []
+    for i in range(256):
+        tracker(status(i, 0))
+    assert all(future.done() for future in futures)
+    assert len(tracker) == 0
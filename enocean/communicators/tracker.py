@@ -0,0 +1,249 @@
+# -*- encoding: utf-8 -*-
+from __future__ import print_function, unicode_literals, division, absolute_import
+import time
+import logging
+import threading
+from concurrent.futures import Future, TimeoutError
+
+from enocean.protocol.packet import Packet, RadioPacket
+from enocean.protocol.constants import RORG
+
+
+class TimerWheel(object):
+    '''
+    Hashed timer wheel: timers are kept in `size` slots of `tick` seconds each,
+    so scheduling and cancelling are O(1), and advancing only looks at the slots passed,
+    regardless of the number of timers.
+    '''
+    def __init__(self, tick=0.05, size=512, now=None):
+        self.tick = tick
+        self.size = size
+        self._slots = [[] for i in range(size)]
+        self._current = self._ticks(time.time() if now is None else now)
+        self._count = 0
+
+    def _ticks(self, now):
+        return int(now / self.tick)
+
+    def __len__(self):
+        return self._count
+
+    def schedule(self, delay, item, now=None):
+        ''' Schedule item to expire in `delay` seconds, returns the timer to be passed to cancel() '''
+        now = time.time() if now is None else now
+        deadline = max(self._ticks(now + delay), self._current + 1)
+        # [deadline tick, item, active]
+        timer = [deadline, item, True]
+        self._slots[deadline % self.size].append(timer)
+        self._count += 1
+        return timer
+
+    def cancel(self, timer):
+        ''' Cancel the timer, it's removed from its slot, when the slot is passed '''
+        if timer[2]:
+            timer[2] = False
+            self._count -= 1
+
+    def advance(self, now=None):
+        ''' Returns the items of the timers expired by now '''
+        target = self._ticks(time.time() if now is None else now)
+        expired = []
+        # Each slot is visited at most once, even if more than a round has passed.
+        for tick in range(self._current + 1, min(target, self._current + self.size) + 1):
+            slot = self._slots[tick % self.size]
+            remaining = []
+            for timer in slot:
+                if not timer[2]:
+                    continue
+                if timer[0] <= target:
+                    timer[2] = False
+                    self._count -= 1
+                    expired.append(timer[1])
+                else:
+                    remaining.append(timer)
+            slot[:] = remaining
+        self._current = max(self._current, target)
+        return expired
+
+
+class _Expectation(object):
+    ''' Packet sent by ReplyTracker, waiting for a reply '''
+    __slots__ = ('packet', 'future', 'sender', 'rorg_func', 'rorg_type', 'command', 'field',
+                 'timeout', 'retries', 'attempt', 'timer')
+
+    def __init__(self, packet, command, field, timeout, retries):
+        self.packet = packet
+        self.future = Future()
+        self.future.set_running_or_notify_cancel()
+        # Reply is sent by the destination of the packet.
+        self.sender = packet.destination_int
+        self.rorg_func = packet.rorg_func
+        self.rorg_type = packet.rorg_type
+        self.command = command
+        self.field = field
+        self.timeout = timeout
+        self.retries = retries
+        self.attempt = 0
+        self.timer = None
+
+
+class ReplyTracker(threading.Thread):
+    '''
+    Tracks the replies of bidirectional VLD actuators (D2-01, D2-05 etc.) to the commands sent to them.
+
+    send() sends the command through the communicator, and returns a concurrent.futures.Future,
+    resolving to the reply (with the values parsed), when a telegram with the expected reply command
+    is received from the destination. The tracker has to receive the packets, as the callback of the
+    communicator, or for example through a PacketRouter:
+        tracker = ReplyTracker(communicator)
+        router.subscribe(tracker, rorg=RORG.VLD)
+        tracker.start()
+        reply = tracker.send(RadioPacket.create(RORG.VLD, 0x01, 0x01, destination=..., command=1, ...)).result()
+
+    If no reply is received in `timeout` seconds, the command is sent again, up to `retries` times,
+    multiplying the timeout by `backoff` after each attempt. After the last attempt, the future fails
+    with concurrent.futures.TimeoutError.
+    Timeouts are kept in a TimerWheel, so a large number of commands waiting for replies is cheap to track.
+    '''
+    logger = logging.getLogger('enocean.communicators.ReplyTracker')
+
+    # Reply command, expected to commands of each FUNC.
+    REPLIES = {
+        # Electronic switches and dimmers: Actuator Set Output, Status Query -> Status Response,
+        # Actuator Measurement Query -> Measurement Response.
+        0x01: {0x01: 0x04, 0x03: 0x04, 0x06: 0x07},
+        # Blinds control: Go to Position and Angle, Stop, Query -> Reply Position and Angle.
+        0x05: {0x01: 0x04, 0x02: 0x04, 0x03: 0x04},
+    }
+
+    def __init__(self, communicator, timeout=1.0, retries=2, backoff=2.0, tick=0.05):
+        super(ReplyTracker, self).__init__()
+        self.daemon = True
+        self.communicator = communicator
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        # Counters
+        self.sent = 0
+        self.resent = 0
+        self.replies = 0
+        self.timeouts = 0
+        self._wheel = TimerWheel(tick)
+        # Expectations by the sender of the reply
+        self._expected = {}
+        self._condition = threading.Condition()
+        self._stop_flag = threading.Event()
+
+    def __len__(self):
+        ''' Number of commands waiting for a reply '''
+        return len(self._wheel)
+
+    @staticmethod
+    def _command(packet, field):
+        ''' Returns the command of a VLD packet, None if the data is too short '''
+        payload = packet.data[1:-5]
+        width = len(payload) * 8
+        if field.offset + field.size > width:
+            return None
+        return (int.from_bytes(bytes(bytearray(payload)), 'big') >> (width - field.offset - field.size)) \
+            & ((1 << field.size) - 1)
+
+    def send(self, packet, reply_command=None, timeout=None, retries=None, callback=None):
+        '''
+        Send the VLD command packet, returns a future resolving to the reply.
+        The reply command is looked up from REPLIES, unless given.
+        `callback(future)` is called, when the reply is received or the command times out.
+        '''
+        if not isinstance(packet, RadioPacket) or packet.rorg != RORG.VLD or packet.rorg_func is None:
+            raise ValueError('Packet must be a VLD RadioPacket, created with an EEP')
+        profile = Packet.eep.telegrams[RORG.VLD][packet.rorg_func][packet.rorg_type]
+        if profile.command is None:
+            raise ValueError('EEP doesn\'t define commands, replies can\'t be matched')
+        sent_command = self._command(packet, profile.command)
+        if reply_command is None:
+            reply_command = self.REPLIES.get(packet.rorg_func, {}).get(sent_command)
+            if reply_command is None:
+                raise ValueError('No reply known for command 0x%02X of D2-%02X' % (sent_command, packet.rorg_func))
+
+        expectation = _Expectation(
+            packet, reply_command, profile.command,
+            self.timeout if timeout is None else timeout,
+            self.retries if retries is None else retries)
+        if callback is not None:
+            expectation.future.add_done_callback(callback)
+        with self._condition:
+            self._expected.setdefault(expectation.sender, []).append(expectation)
+            expectation.timer = self._wheel.schedule(expectation.timeout, expectation)
+            self._condition.notify()
+        self.sent += 1
+        self.communicator.send(packet)
+        return expectation.future
+
+    def __call__(self, packet):
+        ''' Match a received packet to the commands waiting for a reply '''
+        if not isinstance(packet, RadioPacket) or packet.rorg != RORG.VLD:
+            return
+        resolved = []
+        with self._condition:
+            expectations = self._expected.get(packet.sender_int)
+            if not expectations:
+                return
+            for expectation in expectations:
+                if self._command(packet, expectation.field) == expectation.command:
+                    self._wheel.cancel(expectation.timer)
+                    resolved.append(expectation)
+            if resolved:
+                resolved_ids = set(id(expectation) for expectation in resolved)
+                remaining = [expectation for expectation in expectations if id(expectation) not in resolved_ids]
+                if remaining:
+                    self._expected[packet.sender_int] = remaining
+                else:
+                    del self._expected[packet.sender_int]
+        if not resolved:
+            return
+        first = resolved[0]
+        packet.parse_eep(first.rorg_func, first.rorg_type, command=first.command)
+        self.replies += len(resolved)
+        for expectation in resolved:
+            expectation.future.set_result(packet)
+
+    def _expired(self, expectation):
+        with self._condition:
+            if expectation.future.done():
+                return
+            if expectation.attempt < expectation.retries:
+                expectation.attempt += 1
+                expectation.timer = self._wheel.schedule(
+                    expectation.timeout * self.backoff ** expectation.attempt, expectation)
+                retry = True
+            else:
+                retry = False
+                expectations = self._expected.get(expectation.sender, [])
+                if expectation in expectations:
+                    expectations.remove(expectation)
+                if not expectations:
+                    self._expected.pop(expectation.sender, None)
+        if retry:
+            self.resent += 1
+            self.logger.info('No reply from %08X, sending again.', expectation.sender)
+            self.communicator.send(expectation.packet)
+            return
+        self.timeouts += 1
+        self.logger.warning('No reply from %08X.', expectation.sender)
+        expectation.future.set_exception(TimeoutError('No reply received'))
+
+    def stop(self):
+        self._stop_flag.set()
+        with self._condition:
+            self._condition.notify()
+
+    def run(self):
+        while not self._stop_flag.is_set():
+            with self._condition:
+                if not len(self._wheel):
+                    self._condition.wait()
+                    continue
+                self._condition.wait(self._wheel.tick)
+                expired = self._wheel.advance()
+            for expectation in expired:
+                self._expired(expectation)
@@ -4,7 +4,12 @@ import socket
 
 
 def send_to_tcp_socket(host, port, packet):
-    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    sock.connect((host, port))
-    sock.send(str(bytearray(packet.build())))
-    sock.close()
+    '''
+    Send a single packet in a new connection.
+    Use TCPForwarder for forwarding a stream of packets over a persistent connection.
+    '''
+    sock = socket.create_connection((host, port))
+    try:
+        sock.sendall(bytes(bytearray(packet.build())))
+    finally:
+        sock.close()
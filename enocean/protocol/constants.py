@@ -69,6 +69,25 @@ class PARSE_RESULT(IntEnum):
     CRC_MISMATCH = 0x03
 
 
+# What to do, when a bounded queue or dispatcher is full
+class OVERFLOW(IntEnum):
+    # Wait until there's space
+    BLOCK = 0x00
+    # Discard the oldest queued packet, to make space for the new one
+    DROP_OLDEST = 0x01
+    # Discard the new packet
+    DROP_NEWEST = 0x02
+
+
+# Transmit priority classes, lower values are sent first
+class PRIORITY(IntEnum):
+    # Time-critical, for example actuator commands
+    HIGH = 0x00
+    NORMAL = 0x01
+    # Bulk transfers, sent when nothing else is waiting
+    LOW = 0x02
+
+
 # Data byte indexing
 # Starts from the end, so works on messages of all length.
 class DB0(object):
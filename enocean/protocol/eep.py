@@ -1,33 +1,112 @@
 # -*- encoding: utf-8 -*-
 from __future__ import print_function, unicode_literals, division, absolute_import
-import os
 import logging
-from sys import version_info
+import threading
 from collections import OrderedDict
-from bs4 import BeautifulSoup
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping
 
 import enocean.utils
+import enocean.protocol.eeptable
 # Left as a helper
 from enocean.protocol.constants import RORG  # noqa: F401
 
 
+class LazyValues(MutableMapping):
+    '''
+    Ordered mapping of values returned by EEP.get_values().
+    Each field is decoded only when it's accessed for the first time.
+
+    This is a Mapping, not a dict. Code requiring an actual dict (for example json.dumps())
+    should use to_dict(), which decodes all the fields.
+    '''
+    __slots__ = ('_values', '_pending')
+
+    def __init__(self, *args, **kwargs):
+        # Decoded values, and None as a placeholder for pending ones, to keep the order.
+        self._values = OrderedDict()
+        # Pending fields, shortcut -> (decoder, bitarray)
+        self._pending = {}
+        self.update(*args, **kwargs)
+
+    def _add(self, shortcut, decode_field, bitarray):
+        ''' Add field, to be decoded from bitarray when accessed '''
+        self._values[shortcut] = None
+        self._pending[shortcut] = (decode_field, bitarray)
+
+    def __getitem__(self, shortcut):
+        pending = self._pending.get(shortcut)
+        if pending is None:
+            return self._values[shortcut]
+        decode_field, bitarray = pending
+        value = decode_field(bitarray)
+        # Store the value before removing the pending field, so concurrent readers never see the placeholder.
+        # Readers racing here decode the same value, unless the field was set in the meantime.
+        if self._pending.get(shortcut) is pending:
+            self._values[shortcut] = value
+            self._pending.pop(shortcut, None)
+        return self._values[shortcut]
+
+    def __setitem__(self, shortcut, value):
+        self._pending.pop(shortcut, None)
+        self._values[shortcut] = value
+
+    def __delitem__(self, shortcut):
+        self._pending.pop(shortcut, None)
+        del self._values[shortcut]
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __contains__(self, shortcut):
+        return shortcut in self._values
+
+    def update(self, *args, **kwargs):
+        ''' Update from another mapping. Pending fields of another LazyValues are kept pending. '''
+        if len(args) == 1 and not kwargs and isinstance(args[0], LazyValues):
+            other = args[0]
+            for shortcut, value in other._values.items():
+                pending = other._pending.get(shortcut)
+                if pending is not None:
+                    self._add(shortcut, *pending)
+                else:
+                    self[shortcut] = value
+            return
+        super(LazyValues, self).update(*args, **kwargs)
+
+    def to_dict(self):
+        ''' Returns all the values decoded, as an OrderedDict '''
+        return OrderedDict((shortcut, self[shortcut]) for shortcut in self)
+
+    def __reduce__(self):
+        # Pickle as decoded values, as the decoders can't be pickled.
+        return (self.__class__, (list(self.items()), ))
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, list(self.items()))
+
+
 class EEP(object):
     logger = logging.getLogger('enocean.protocol.eep')
 
     def __init__(self):
         self.init_ok = False
         self.telegrams = {}
+        # Decoders and encoders, compiled from data descriptions on first use.
+        self._decoders = {}
+        self._encoders = {}
 
-        eep_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'EEP.xml')
         try:
-            if version_info[0] > 2:
-                with open(eep_path, 'r', encoding='UTF-8') as xml_file:
-                    self.soup = BeautifulSoup(xml_file.read(), "html.parser")
-            else:
-                with open(eep_path, 'r') as xml_file:
-                    self.soup = BeautifulSoup(xml_file.read(), "html.parser")
+            table, compiled = enocean.protocol.eeptable.load()
+            if compiled:
+                self.logger.info('Compiled EEP table is stale, EEP.xml parsed instead.')
+            self.telegrams = enocean.protocol.eeptable.to_descriptors(table)
             self.init_ok = True
-            self.__load_xml()
         except IOError:
             # Impossible to test with the current structure?
             # To be honest, as the XML is included with the library,
@@ -35,124 +114,229 @@ class EEP(object):
             self.logger.warn('Cannot load protocol file!')
             self.init_ok = False
 
-    def __load_xml(self):
-        self.telegrams = {
-            enocean.utils.from_hex_string(telegram['rorg']): {
-                enocean.utils.from_hex_string(function['func']): {
-                    enocean.utils.from_hex_string(type['type'], ): type
-                    for type in function.find_all('profile')
-                }
-                for function in telegram.find_all('profiles')
-            }
-            for telegram in self.soup.find_all('telegram')
-        }
+    @staticmethod
+    def _as_bitarray(bitarray):
+        ''' Accept lists of booleans, as returned by enocean.utils.to_bitarray(), in addition to BitArrays '''
+        if isinstance(bitarray, (list, tuple)):
+            return enocean.utils.BitArray.from_bits(bitarray)
+        return bitarray
 
     @staticmethod
     def _get_raw(source, bitarray):
         ''' Get raw data as integer, based on offset and size '''
-        offset = int(source['offset'])
-        size = int(source['size'])
-        return int(''.join(['1' if digit else '0' for digit in bitarray[offset:offset + size]]), 2)
+        return bitarray.get(source.offset, source.size)
 
     @staticmethod
     def _set_raw(target, raw_value, bitarray):
         ''' put value into bit array '''
-        offset = int(target['offset'])
-        size = int(target['size'])
-        for digit in range(size):
-            bitarray[offset+digit] = (raw_value >> (size-digit-1)) & 0x01 != 0
+        bitarray.set(target.offset, target.size, raw_value)
         return bitarray
 
     @staticmethod
     def _get_rangeitem(source, raw_value):
-        for rangeitem in source.find_all('rangeitem'):
-            if raw_value in range(int(rangeitem.get('start', -1)), int(rangeitem.get('end', -1)) + 1):
-                return rangeitem
-
-    def _get_value(self, source, bitarray):
-        ''' Get value, based on the data in XML '''
-        raw_value = self._get_raw(source, bitarray)
-
-        rng = source.find('range')
-        rng_min = float(rng.find('min').text)
-        rng_max = float(rng.find('max').text)
-
-        scl = source.find('scale')
-        scl_min = float(scl.find('min').text)
-        scl_max = float(scl.find('max').text)
-
-        return {
-            source['shortcut']: {
-                'description': source.get('description'),
-                'unit': source['unit'],
-                'value': (scl_max - scl_min) / (rng_max - rng_min) * (raw_value - rng_min) + scl_min,
+        for start, end, description in source.rangeitems:
+            if raw_value in range(start, end + 1):
+                return description
+
+    @classmethod
+    def _compile_value(cls, source):
+        ''' Compile decoder for a value, with scaling coefficients calculated in advance '''
+        rng_min, rng_max = source.range
+        scl_min, scl_max = source.scale
+        multiplier = (scl_max - scl_min) / (rng_max - rng_min)
+        description = source.description
+        unit = source.unit
+
+        def decode(bitarray):
+            raw_value = cls._get_raw(source, bitarray)
+            return {
+                'description': description,
+                'unit': unit,
+                'value': multiplier * (raw_value - rng_min) + scl_min,
                 'raw_value': raw_value,
             }
-        }
-
-    def _get_enum(self, source, bitarray):
-        ''' Get enum value, based on the data in XML '''
-        raw_value = self._get_raw(source, bitarray)
-
-        # Find value description.
-        value_desc = source.find('item', {'value': str(raw_value)}) or self._get_rangeitem(source, raw_value)
-
-        return {
-            source['shortcut']: {
-                'description': source.get('description'),
-                'unit': source.get('unit', ''),
-                'value': value_desc['description'].format(value=raw_value),
+        return decode
+
+    @classmethod
+    def _compile_enum(cls, source):
+        ''' Compile decoder for an enum, with item descriptions looked up from a table '''
+        description = source.description
+        unit = source.unit or ''
+        # Item values are known in advance, so their descriptions can be formatted already.
+        # Range items are formatted on demand.
+        items = {}
+        for value, item_description in source.items:
+            items.setdefault(value, item_description.format(value=value))
+        if source.size <= 8:
+            # For small fields, precalculate a table containing all values.
+            lookup = [items.get(raw_value) for raw_value in range(1 << source.size)]
+            for raw_value in range(1 << source.size):
+                if lookup[raw_value] is None:
+                    value_desc = cls._get_rangeitem(source, raw_value)
+                    if value_desc is not None:
+                        lookup[raw_value] = value_desc.format(value=raw_value)
+            items = tuple(lookup)
+
+        def decode(bitarray):
+            raw_value = cls._get_raw(source, bitarray)
+            try:
+                value = items[raw_value]
+            except LookupError:
+                value = None
+            if value is None:
+                value = cls._get_rangeitem(source, raw_value).format(value=raw_value)
+            return {
+                'description': description,
+                'unit': unit,
+                'value': value,
                 'raw_value': raw_value,
             }
-        }
-
-    def _get_boolean(self, source, bitarray):
-        ''' Get boolean value, based on the data in XML '''
-        raw_value = self._get_raw(source, bitarray)
-        return {
-            source['shortcut']: {
-                'description': source.get('description'),
-                'unit': source.get('unit', ''),
+        return decode
+
+    @classmethod
+    def _compile_boolean(cls, source):
+        ''' Compile decoder for a boolean '''
+        description = source.description
+        unit = source.unit or ''
+
+        def decode(bitarray):
+            raw_value = cls._get_raw(source, bitarray)
+            return {
+                'description': description,
+                'unit': unit,
                 'value': True if raw_value else False,
                 'raw_value': raw_value,
             }
-        }
-
-    def _set_value(self, target, value, bitarray):
-        ''' set given numeric value to target field in bitarray '''
-        # derive raw value
-        rng = target.find('range')
-        rng_min = float(rng.find('min').text)
-        rng_max = float(rng.find('max').text)
-        scl = target.find('scale')
-        scl_min = float(scl.find('min').text)
-        scl_max = float(scl.find('max').text)
-        raw_value = (value - scl_min) * (rng_max - rng_min) / (scl_max - scl_min) + rng_min
-        # store value in bitfield
-        return self._set_raw(target, int(raw_value), bitarray)
-
-    def _set_enum(self, target, value, bitarray):
-        ''' set given enum value (by string or integer value) to target field in bitarray '''
-        # derive raw value
-        if isinstance(value, int):
-            # check whether this value exists
-            if target.find('item', {'value': value}) or self._get_rangeitem(target, value):
-                # set integer values directly
+        return decode
+
+    @classmethod
+    def compile_decoder(cls, profile):
+        '''
+        Compile data description to a function, decoding the fields from bitarray and status.
+        The function returns the same output as get_values().
+        '''
+        # If a shortcut is defined multiple times, the last definition is used, in place of the first.
+        decoders = OrderedDict()
+        for source in profile.fields:
+            if source.kind == 'value':
+                decoders[source.shortcut] = (False, cls._compile_value(source))
+            if source.kind == 'enum':
+                decoders[source.shortcut] = (False, cls._compile_enum(source))
+            if source.kind == 'status':
+                decoders[source.shortcut] = (True, cls._compile_boolean(source))
+
+        def decode(bitarray, status, fields=None):
+            output = LazyValues()
+            for shortcut, (from_status, decode_field) in decoders.items():
+                if fields is not None and shortcut not in fields:
+                    continue
+                output._add(shortcut, decode_field, status if from_status else bitarray)
+            return output.keys(), output
+        return decode
+
+    @staticmethod
+    def _profile_key(profile):
+        return (profile.rorg, profile.func, profile.type, profile.direction, profile.command)
+
+    def _get_decoder(self, profile):
+        ''' Get decoder for the data description, compiling it on first use '''
+        key = self._profile_key(profile)
+        decoder = self._decoders.get(key)
+        if decoder is None:
+            decoder = self._decoders[key] = self.compile_decoder(profile)
+        return decoder
+
+    def _get_encoder(self, profile):
+        ''' Get encoder for the data description, compiling it on first use '''
+        key = self._profile_key(profile)
+        encoder = self._encoders.get(key)
+        if encoder is None:
+            encoder = self._encoders[key] = self.compile_encoder(profile)
+        return encoder
+
+    @classmethod
+    def _compile_set_value(cls, target):
+        ''' Compile encoder for a value '''
+        rng_min, rng_max = target.range
+        scl_min, scl_max = target.scale
+        rng_span = rng_max - rng_min
+        scl_span = scl_max - scl_min
+
+        def encode(value, bitarray):
+            # derive raw value and store it in bitfield
+            raw_value = (value - scl_min) * rng_span / scl_span + rng_min
+            return cls._set_raw(target, int(raw_value), bitarray)
+        return encode
+
+    @classmethod
+    def _compile_set_enum(cls, target):
+        ''' Compile encoder for an enum, accepting either the item description or the integer value '''
+        values = frozenset(value for value, _ in target.items)
+        descriptions = {}
+        for value, description in target.items:
+            descriptions.setdefault(description, value)
+
+        def encode(value, bitarray):
+            if isinstance(value, int):
+                # check whether this value exists, and set integer values directly
+                if value not in values and not cls._get_rangeitem(target, value):
+                    raise ValueError('Enum value "%s" not found in EEP.' % (value))
                 raw_value = value
             else:
-                raise ValueError('Enum value "%s" not found in EEP.' % (value))
-        else:
-            value_item = target.find('item', {'description': value})
-            if value_item is None:
-                raise ValueError('Enum description for value "%s" not found in EEP.' % (value))
-            raw_value = int(value_item['value'])
-        return self._set_raw(target, raw_value, bitarray)
+                raw_value = descriptions.get(value)
+                if raw_value is None:
+                    raise ValueError('Enum description for value "%s" not found in EEP.' % (value))
+            return cls._set_raw(target, raw_value, bitarray)
+        return encode
 
     @staticmethod
-    def _set_boolean(target, data, bitarray):
-        ''' set given value to target bit in bitarray '''
-        bitarray[int(target['offset'])] = data
-        return bitarray
+    def _compile_set_boolean(target):
+        ''' Compile encoder for a boolean '''
+        def encode(value, bitarray):
+            bitarray[target.offset] = value
+            return bitarray
+        return encode
+
+    @classmethod
+    def compile_encoder(cls, profile):
+        '''
+        Compile data description to a function, updating bitarray and status based on properties.
+        The function returns the same output as set_values().
+        '''
+        fields = {}
+        for target in profile.fields:
+            # If a shortcut is defined multiple times, the first one is used.
+            if target.shortcut in fields:
+                continue
+            if target.kind == 'value':
+                fields[target.shortcut] = (False, cls._compile_set_value(target))
+            if target.kind == 'enum':
+                fields[target.shortcut] = (False, cls._compile_set_enum(target))
+            if target.kind == 'status':
+                fields[target.shortcut] = (True, cls._compile_set_boolean(target))
+
+        def encode(data, status, properties):
+            for shortcut, value in properties.items():
+                try:
+                    to_status, encode_field = fields[shortcut]
+                except KeyError:
+                    # TODO: Should we raise an error?
+                    cls.logger.warning('Cannot find data description for shortcut %s', shortcut)
+                    continue
+                if to_status:
+                    status = encode_field(value, status)
+                else:
+                    data = encode_field(value, data)
+            return data, status
+        return encode
+
+    @staticmethod
+    def _first_data(data, **attributes):
+        ''' Find first data description, matching the given attributes '''
+        for description in data:
+            if all(getattr(description, key) == value for key, value in attributes.items()):
+                return description
+        return None
 
     def find_profile(self, bitarray, eep_rorg, rorg_func, rorg_type, direction=None, command=None):
         ''' Find profile and data description, matching RORG, FUNC and TYPE '''
@@ -176,56 +360,50 @@ class EEP(object):
 
         if command:
             # multiple commands can be defined, with the command id always in same location (per RORG-FUNC-TYPE).
-            eep_command = profile.find('command', recursive=False)
             # If commands are not set in EEP, or command is None,
             # get the first data as a "best guess".
-            if not eep_command:
-                return profile.find('data', recursive=False)
+            if profile.command is None:
+                return self._first_data(profile.data)
 
             # If eep_command is defined, so should be data.command
-            return profile.find('data', {'command': str(command)}, recursive=False)
+            return self._first_data(profile.data, command=int(command))
 
         # extract data description
         # the direction tag is optional
         if direction is None:
-            return profile.find('data', recursive=False)
-        return profile.find('data', {'direction': direction}, recursive=False)
-
-    def get_values(self, profile, bitarray, status):
-        ''' Get keys and values from bitarray '''
+            return self._first_data(profile.data)
+        return self._first_data(profile.data, direction=int(direction))
+
+    def get_values(self, profile, bitarray, status, fields=None):
+        '''
+        Get keys and values from bitarray.
+        Values are decoded when accessed. If fields (list of shortcuts) is given, only those fields are included.
+        '''
         if not self.init_ok or profile is None:
             return [], {}
 
-        output = OrderedDict({})
-        for source in profile.contents:
-            if not source.name:
-                continue
-            if source.name == 'value':
-                output.update(self._get_value(source, bitarray))
-            if source.name == 'enum':
-                output.update(self._get_enum(source, bitarray))
-            if source.name == 'status':
-                output.update(self._get_boolean(source, status))
-        return output.keys(), output
+        return self._get_decoder(profile)(self._as_bitarray(bitarray), self._as_bitarray(status), fields)
 
     def set_values(self, profile, data, status, properties):
         ''' Update data based on data contained in properties '''
         if not self.init_ok or profile is None:
             return data, status
 
-        for shortcut, value in properties.items():
-            # find the given property from EEP
-            target = profile.find(shortcut=shortcut)
-            if not target:
-                # TODO: Should we raise an error?
-                self.logger.warning('Cannot find data description for shortcut %s', shortcut)
-                continue
+        return self._get_encoder(profile)(self._as_bitarray(data), self._as_bitarray(status), properties)
+
+
+_shared_eep = None
+_shared_eep_lock = threading.Lock()
+
 
-            # update bit_data
-            if target.name == 'value':
-                data = self._set_value(target, value, data)
-            if target.name == 'enum':
-                data = self._set_enum(target, value, data)
-            if target.name == 'status':
-                status = self._set_boolean(target, value, status)
-        return data, status
+def get_eep():
+    '''
+    Returns the EEP -instance shared by all packets.
+    The instance is created on first use, so importing the module doesn't load the profiles.
+    '''
+    global _shared_eep
+    if _shared_eep is None:
+        with _shared_eep_lock:
+            if _shared_eep is None:
+                _shared_eep = EEP()
+    return _shared_eep
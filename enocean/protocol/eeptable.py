@@ -0,0 +1,201 @@
+# -*- encoding: utf-8 -*-
+'''
+Precompiled representation of EEP.xml.
+
+EEP.xml is compiled into EEP.json, containing only the plain data needed at runtime.
+The compiled table is versioned and carries a digest of the XML it was built from,
+so a stale table can be detected and the XML used instead.
+Run `generate_eep_table.py` to rebuild EEP.json after modifying EEP.xml.
+'''
+from __future__ import print_function, unicode_literals, division, absolute_import
+import io
+import os
+import json
+import hashlib
+from collections import namedtuple
+
+import enocean.utils
+
+# Bump, if the layout of the compiled table changes.
+TABLE_VERSION = 2
+
+XML_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'EEP.xml')
+TABLE_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'EEP.json')
+
+# Single value, enum or status -field of a data description.
+# kind is the name of the XML tag ('value', 'enum' or 'status').
+# range and scale are (min, max) -tuples, only defined for values.
+# items are (value, description) and rangeitems (start, end, description) -tuples, only defined for enums.
+FieldDescriptor = namedtuple('FieldDescriptor', [
+    'kind', 'shortcut', 'description', 'unit', 'offset', 'size', 'range', 'scale', 'items', 'rangeitems'])
+
+# Data description, matching a <data> -tag in EEP.xml.
+# This is what EEP.find_profile() returns.
+DataDescriptor = namedtuple('DataDescriptor', [
+    'rorg', 'func', 'type', 'direction', 'command', 'bits', 'fields'])
+
+# Profile, matching a <profile> -tag in EEP.xml.
+# command is a FieldDescriptor, if the profile defines multiple commands.
+ProfileDescriptor = namedtuple('ProfileDescriptor', [
+    'rorg', 'func', 'type', 'description', 'command', 'data'])
+
+
+def _optional_int(value):
+    if value is None:
+        return None
+    return int(value)
+
+
+def _min_max(tag):
+    if tag is None:
+        return None
+    return [float(tag.find('min').text), float(tag.find('max').text)]
+
+
+def _compile_field(tag):
+    # Items of an enum in document order, [value, description] for items and [start, end, description] for rangeitems.
+    items = None
+    if tag.name == 'enum':
+        items = [
+            [int(item.get('start', -1)), int(item.get('end', -1)), item['description']]
+            if item.name == 'rangeitem' else
+            [int(item['value']), item['description']]
+            for item in tag.find_all(['item', 'rangeitem'])
+        ]
+    return [
+        tag.name,
+        tag['shortcut'],
+        tag.get('description'),
+        tag.get('unit'),
+        int(tag['offset']),
+        int(tag['size']),
+        _min_max(tag.find('range')),
+        _min_max(tag.find('scale')),
+        items,
+    ]
+
+
+def digest(xml_data):
+    ''' Calculate digest of the XML, used to detect a stale table '''
+    return hashlib.sha1(xml_data).hexdigest()
+
+
+def compile_xml(xml_data):
+    '''
+    Compile EEP.xml (as bytes) to a table, containing only JSON-serializable lists and dicts.
+    Requires BeautifulSoup, which is imported only when needed.
+    '''
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(xml_data.decode('utf-8'), 'html.parser')
+
+    telegrams = []
+    for telegram in soup.find_all('telegram'):
+        functions = []
+        for function in telegram.find_all('profiles'):
+            types = []
+            for profile in function.find_all('profile'):
+                command = profile.find('command', recursive=False)
+                data = [
+                    [
+                        _optional_int(data.get('direction')),
+                        _optional_int(data.get('command')),
+                        _optional_int(data.get('bits')),
+                        [_compile_field(tag) for tag in data.find_all(['value', 'enum', 'status'], recursive=False)],
+                    ]
+                    for data in profile.find_all('data', recursive=False)
+                ]
+                types.append([
+                    enocean.utils.from_hex_string(profile['type']),
+                    profile.get('description'),
+                    _compile_field(command) if command else None,
+                    data,
+                ])
+            functions.append([
+                enocean.utils.from_hex_string(function['func']),
+                function.get('description'),
+                types,
+            ])
+        telegrams.append([
+            enocean.utils.from_hex_string(telegram['rorg']),
+            telegram.get('type'),
+            telegram.get('description'),
+            functions,
+        ])
+
+    return {
+        'version': TABLE_VERSION,
+        'digest': digest(xml_data),
+        'eep_version': soup.find('telegrams').get('version'),
+        'telegrams': telegrams,
+    }
+
+
+def write_table(table, path=TABLE_PATH):
+    ''' Write compiled table to file '''
+    with io.open(path, 'w', encoding='utf-8') as table_file:
+        table_file.write(json.dumps(table, separators=(',', ':'), sort_keys=True, ensure_ascii=False))
+        table_file.write('\n')
+
+
+def read_table(path=TABLE_PATH):
+    ''' Read compiled table from file, returns None if the file doesn't exist or can't be read '''
+    try:
+        with io.open(path, 'r', encoding='utf-8') as table_file:
+            return json.load(table_file)
+    except (IOError, ValueError):
+        return None
+
+
+def is_stale(table, xml_data):
+    ''' Check if the table is missing, of the wrong version, or built from another XML '''
+    return table is None \
+        or table.get('version') != TABLE_VERSION \
+        or table.get('digest') != digest(xml_data)
+
+
+def _field(field):
+    if field is None:
+        return None
+    kind, shortcut, description, unit, offset, size, rng, scl, items = field
+    return FieldDescriptor(
+        kind, shortcut, description, unit, offset, size,
+        tuple(rng) if rng is not None else None,
+        tuple(scl) if scl is not None else None,
+        tuple(tuple(item) for item in items if len(item) == 2) if items is not None else None,
+        tuple(tuple(item) for item in items if len(item) == 3) if items is not None else None,
+    )
+
+
+def to_descriptors(table):
+    '''
+    Convert the table to descriptors, indexed by RORG, FUNC and TYPE.
+    Returns {rorg: {func: {type: ProfileDescriptor}}}
+    '''
+    telegrams = {}
+    for rorg, _, _, functions in table['telegrams']:
+        telegrams[rorg] = {}
+        for func, _, types in functions:
+            telegrams[rorg][func] = {}
+            for type_, description, command, data in types:
+                telegrams[rorg][func][type_] = ProfileDescriptor(
+                    rorg, func, type_, description, _field(command),
+                    tuple(
+                        DataDescriptor(rorg, func, type_, direction, data_command, bits,
+                                       tuple(_field(field) for field in fields))
+                        for direction, data_command, bits, fields in data
+                    ))
+    return telegrams
+
+
+def load(xml_path=XML_PATH, table_path=TABLE_PATH):
+    '''
+    Load compiled table, falling back to compiling the XML if the table is stale.
+    Returns the table, and a boolean telling if the XML was compiled.
+    '''
+    with open(xml_path, 'rb') as xml_file:
+        xml_data = xml_file.read()
+
+    table = read_table(table_path)
+    if not is_stale(table, xml_data):
+        return table, False
+    return compile_xml(xml_data), True
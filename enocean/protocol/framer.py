@@ -0,0 +1,112 @@
+# -*- encoding: utf-8 -*-
+from __future__ import print_function, unicode_literals, division, absolute_import
+import logging
+
+from enocean.protocol import crc8
+from enocean.protocol.packet import Packet
+from enocean.protocol.constants import PARSE_RESULT
+
+SYNC_BYTE = 0x55
+# Sync byte, data length (2 bytes), optional length, packet type and header CRC.
+HEADER_LENGTH = 6
+
+
+class PacketFramer(object):
+    '''
+    Incremental framer for ESP3 -streams.
+
+    Received data is appended with extend(), and frames are parsed from a single bytearray
+    with a read cursor, instead of copying the remaining buffer for every frame.
+    A validated header is kept while waiting for the rest of the frame,
+    and the consumed part of the buffer is only discarded when it grows large.
+    On CRC mismatch, parsing resynchronises at the next sync byte (0x55).
+    '''
+    logger = logging.getLogger('enocean.protocol.framer')
+
+    # Discard consumed data from the start of the buffer, when there's more than this many bytes of it.
+    COMPACT_THRESHOLD = 4096
+
+    def __init__(self, data=None):
+        self._buffer = bytearray()
+        self._position = 0
+        # Data length, optional length and packet type of a validated header,
+        # when the rest of the frame hasn't been received yet.
+        self._header = None
+        if data is not None:
+            self.extend(data)
+
+    def __len__(self):
+        ''' Number of received bytes not yet parsed '''
+        return len(self._buffer) - self._position
+
+    def remaining(self):
+        ''' Returns the received bytes not yet parsed, as a list of integers '''
+        return list(self._buffer[self._position:])
+
+    def _compact(self):
+        if self._position == len(self._buffer):
+            del self._buffer[:]
+            self._position = 0
+        elif self._position > self.COMPACT_THRESHOLD:
+            del self._buffer[:self._position]
+            self._position = 0
+
+    def extend(self, data):
+        ''' Append received data (bytes, bytearray or list of integers) to the buffer '''
+        self._compact()
+        self._buffer.extend(bytearray(data))
+
+    def clear(self):
+        del self._buffer[:]
+        self._position = 0
+        self._header = None
+
+    def parse(self):
+        '''
+        Parses the next frame from the buffer.
+        returns:
+            - PARSE_RESULT
+            - Packet -object (if frame was valid, else None)
+        '''
+        buf = self._buffer
+        position = self._position
+
+        if self._header is None:
+            # Skip everything before the start of a frame.
+            position = buf.find(SYNC_BYTE, position)
+            if position < 0:
+                self._position = len(buf)
+                return PARSE_RESULT.INCOMPLETE, None
+            self._position = position
+
+            if len(buf) - position < HEADER_LENGTH:
+                return PARSE_RESULT.INCOMPLETE, None
+
+            if buf[position + 5] != crc8.calc(buf[position + 1:position + 5]):
+                self.logger.error('Header CRC error!')
+                # Look for the next frame, starting after this sync byte.
+                self._position = position + 1
+                return PARSE_RESULT.CRC_MISMATCH, None
+
+            self._header = ((buf[position + 1] << 8) | buf[position + 2], buf[position + 3], buf[position + 4])
+
+        data_len, opt_len, packet_type = self._header
+        # Header: 6 bytes, data, optional data and data checksum
+        data_start = position + HEADER_LENGTH
+        data_end = data_start + data_len
+        opt_end = data_end + opt_len
+        if len(buf) <= opt_end:
+            return PARSE_RESULT.INCOMPLETE, None
+
+        self._header = None
+        if buf[opt_end] != crc8.calc(buf[data_start:opt_end]):
+            self.logger.error('Data CRC error!')
+            # The header might've been corrupted data as well, so look for the next frame
+            # starting after this sync byte, instead of skipping the whole (assumed) frame.
+            self._position = position + 1
+            return PARSE_RESULT.CRC_MISMATCH, None
+
+        self._position = opt_end + 1
+        data = list(buf[data_start:data_end])
+        opt_data = list(buf[data_end:opt_end])
+        return PARSE_RESULT.OK, Packet.from_frame(packet_type, data, opt_data)
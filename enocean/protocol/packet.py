@@ -1,14 +1,89 @@
 # -*- encoding: utf-8 -*-
 from __future__ import print_function, unicode_literals, division, absolute_import
 import logging
-from collections import OrderedDict
 
 import enocean.utils
 from enocean.protocol import crc8
-from enocean.protocol.eep import EEP
+from enocean.protocol.eep import get_eep, LazyValues
 from enocean.protocol.constants import PACKET, RORG, PARSE_RESULT, DB0, DB2, DB3, DB4, DB6
 
 
+class SharedEEP(object):
+    ''' Descriptor, loading the shared EEP -instance on first access '''
+    def __get__(self, instance, owner):
+        return get_eep()
+
+
+class PacketBytes(list):
+    '''
+    List of bytes of a packet (Packet.data, Packet.optional, RadioPacket.sender etc.).
+    The packet stores the bytes compactly, so modifications of the list are written back to the packet.
+    '''
+    __slots__ = ('_packet', '_attribute')
+
+    def __init__(self, packet, attribute, values):
+        super(PacketBytes, self).__init__(values)
+        self._packet = packet
+        self._attribute = attribute
+
+    def _write(self):
+        setattr(self._packet, self._attribute, list(self))
+
+    def __reduce__(self):
+        # Pickle and copy as a plain list.
+        return list, (list(self),)
+
+    def __setitem__(self, index, value):
+        super(PacketBytes, self).__setitem__(index, value)
+        self._write()
+
+    def __delitem__(self, index):
+        super(PacketBytes, self).__delitem__(index)
+        self._write()
+
+    def __iadd__(self, values):
+        super(PacketBytes, self).__iadd__(values)
+        self._write()
+        return self
+
+    def __imul__(self, count):
+        super(PacketBytes, self).__imul__(count)
+        self._write()
+        return self
+
+    def append(self, value):
+        super(PacketBytes, self).append(value)
+        self._write()
+
+    def extend(self, values):
+        super(PacketBytes, self).extend(values)
+        self._write()
+
+    def insert(self, index, value):
+        super(PacketBytes, self).insert(index, value)
+        self._write()
+
+    def pop(self, *args):
+        value = super(PacketBytes, self).pop(*args)
+        self._write()
+        return value
+
+    def remove(self, value):
+        super(PacketBytes, self).remove(value)
+        self._write()
+
+    def reverse(self):
+        super(PacketBytes, self).reverse()
+        self._write()
+
+    def sort(self, *args, **kwargs):
+        super(PacketBytes, self).sort(*args, **kwargs)
+        self._write()
+
+    def clear(self):
+        del self[:]
+
+
 class Packet(object):
     '''
     Base class for Packet.
@@ -16,9 +91,16 @@ class Packet(object):
     Packet.parse_msg(buf) for parsing message.
     parse_msg() returns subclass, if one is defined for the data type.
     '''
-    eep = EEP()
+    eep = SharedEEP()
     logger = logging.getLogger('enocean.protocol.packet')
 
+    # Packets are kept in large numbers, so avoid the per-instance __dict__.
+    # Data and optional data are stored as bytes, and exposed as lists (PacketBytes) through properties.
+    __slots__ = (
+        'packet_type', 'rorg', 'rorg_func', 'rorg_type', 'rorg_manufacturer', 'received',
+        '_data', '_optional', 'status', '_parsed', 'repeater_count', '_profile',
+    )
+
     def __init__(self, packet_type, data=None, optional=None):
         self.packet_type = packet_type
         self.rorg = RORG.UNDEFINED
@@ -28,20 +110,18 @@ class Packet(object):
 
         self.received = None
 
-        if not isinstance(data, list) or data is None:
+        if not isinstance(data, (list, bytes, bytearray)):
             self.logger.warning('Replacing Packet.data with default value.')
-            self.data = []
-        else:
-            self.data = data
+            data = []
+        self.data = data
 
-        if not isinstance(optional, list) or optional is None:
+        if not isinstance(optional, (list, bytes, bytearray)):
             self.logger.warning('Replacing Packet.optional with default value.')
-            self.optional = []
-        else:
-            self.optional = optional
+            optional = []
+        self.optional = optional
 
         self.status = 0
-        self.parsed = OrderedDict({})
+        self._parsed = None
         self.repeater_count = 0
         self._profile = None
 
@@ -58,8 +138,71 @@ class Packet(object):
         return self.__str__()
 
     def __eq__(self, other):
+        if not isinstance(other, Packet):
+            return NotImplemented
         return self.packet_type == other.packet_type and self.rorg == other.rorg \
-            and self.data == other.data and self.optional == other.optional
+            and self._data == other._data and self._optional == other._optional
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    def __hash__(self):
+        # Consistent with __eq__. Modifying the packet changes the hash, so don't modify packets used as keys.
+        return hash((self.packet_type, self.rorg, self._data, self._optional))
+
+    def copy(self):
+        '''
+        Returns a copy of the packet, without parsing or encoding it again.
+        Pending values in Packet.parsed are kept pending in the copy.
+        '''
+        packet = self.__class__.__new__(self.__class__)
+        for cls in self.__class__.__mro__:
+            for slot in getattr(cls, '__slots__', ()):
+                if hasattr(self, slot):
+                    setattr(packet, slot, getattr(self, slot))
+        if self._parsed is not None:
+            packet._parsed = LazyValues(self._parsed)
+        return packet
+
+    @property
+    def data(self):
+        ''' Packet data as a list of integers, modifying the list modifies the packet. '''
+        return PacketBytes(self, 'data', self._data)
+
+    @data.setter
+    def data(self, value):
+        self._data = bytes(bytearray(value))
+
+    @property
+    def optional(self):
+        ''' Optional data as a list of integers, modifying the list modifies the packet. '''
+        return PacketBytes(self, 'optional', self._optional)
+
+    @optional.setter
+    def optional(self, value):
+        self._optional = bytes(bytearray(value))
+
+    @property
+    def parsed(self):
+        '''
+        Values parsed with parse_eep(), created on first access.
+        This is a LazyValues -mapping, use Packet.parsed.to_dict() when an actual dict is required.
+        '''
+        if self._parsed is None:
+            self._parsed = LazyValues()
+        return self._parsed
+
+    @parsed.setter
+    def parsed(self, value):
+        self._parsed = value
+
+    @property
+    def profile(self):
+        ''' Selected EEP data description (DataDescriptor), None if no profile is selected '''
+        return self._profile
 
     @property
     def _bit_data(self):
@@ -69,13 +212,16 @@ class Packet(object):
         # Packet.data would then only have the actual, documented data-bytes.
         # Packet.message would contain the whole message.
         # See discussion in issue #14
-        return enocean.utils.to_bitarray(self.data[1:len(self.data) - 5], (len(self.data) - 6) * 8)
+        return enocean.utils.BitArray.from_bytes(self._data[1:max(len(self._data) - 5, 1)])
 
     @_bit_data.setter
     def _bit_data(self, value):
         # The same as getting the data, first and last 5 bits are ommitted, as they are defined...
-        for byte in range(len(self.data) - 6):
-            self.data[byte+1] = enocean.utils.from_bitarray(value[byte*8:(byte+1)*8])
+        length = len(self._data) - 6
+        if length <= 0:
+            return
+        value = enocean.utils.BitArray.from_bits(value).value & ((1 << (length * 8)) - 1)
+        self._data = self._data[:1] + bytes(value.to_bytes(length, 'big')) + self._data[-5:]
 
     # # COMMENTED OUT, AS NOTHING TOUCHES _bit_optional FOR NOW.
     # # Thus, this is also untested.
@@ -93,7 +239,7 @@ class Packet(object):
 
     @property
     def _bit_status(self):
-        return enocean.utils.to_bitarray(self.status)
+        return enocean.utils.BitArray(self.status, 8)
 
     @_bit_status.setter
     def _bit_status(self, value):
@@ -149,20 +295,24 @@ class Packet(object):
             return PARSE_RESULT.CRC_MISMATCH, buf, None
 
         # If we got this far, everything went ok (?)
+        return PARSE_RESULT.OK, buf, Packet.from_frame(packet_type, data, opt_data)
+
+    @staticmethod
+    def from_frame(packet_type, data, opt_data):
+        '''
+        Creates Packet from the contents of a received frame, with already validated CRCs.
+        returns subclass, if one is defined for the data type.
+        '''
         if packet_type == PACKET.RADIO_ERP1:
             # Need to handle UTE Teach-in here, as it's a separate packet type...
             if data[0] == RORG.UTE:
-                packet = UTETeachInPacket(packet_type, data, opt_data)
-            else:
-                packet = RadioPacket(packet_type, data, opt_data)
-        elif packet_type == PACKET.RESPONSE:
-            packet = ResponsePacket(packet_type, data, opt_data)
-        elif packet_type == PACKET.EVENT:
-            packet = EventPacket(packet_type, data, opt_data)
-        else:
-            packet = Packet(packet_type, data, opt_data)
-
-        return PARSE_RESULT.OK, buf, packet
+                return UTETeachInPacket(packet_type, data, opt_data)
+            return RadioPacket(packet_type, data, opt_data)
+        if packet_type == PACKET.RESPONSE:
+            return ResponsePacket(packet_type, data, opt_data)
+        if packet_type == PACKET.EVENT:
+            return EventPacket(packet_type, data, opt_data)
+        return Packet(packet_type, data, opt_data)
 
     @staticmethod
     def create(packet_type, rorg, rorg_func, rorg_type, direction=None, command=None,
@@ -208,56 +358,55 @@ class Packet(object):
         if not isinstance(sender, list) or len(sender) != 4:
             raise ValueError('Sender must a list containing 4 (numeric) values.')
 
-        packet = Packet(packet_type, data=[], optional=[])
-        packet.rorg = rorg
-        packet.data = [packet.rorg]
         # Select EEP at this point, so we know how many bits we're dealing with (for VLD).
-        packet.select_eep(rorg_func, rorg_type, direction, command)
+        profile = Packet.eep.find_profile(None, rorg, rorg_func, rorg_type, direction, command)
 
         # Initialize data depending on the profile.
         if rorg in [RORG.RPS, RORG.BS1]:
-            packet.data.extend([0])
+            data_length = 1
         elif rorg == RORG.BS4:
-            packet.data.extend([0, 0, 0, 0])
+            data_length = 4
         else:
-            packet.data.extend([0] * int(packet._profile.get('bits', '1')))
-        packet.data.extend(sender)
-        packet.data.extend([0])
-        # Always use sub-telegram 3, maximum dbm (as per spec, when sending),
-        # and no security (security not supported as per EnOcean Serial Protocol).
-        packet.optional = [3] + destination + [0xFF] + [0]
+            data_length = profile.bits or 1
+        bit_data = enocean.utils.BitArray(0, data_length * 8)
+        bit_status = enocean.utils.BitArray(0, 8)
 
         if command:
             # Set CMD to command, if applicable.. Helps with VLD.
             kwargs['CMD'] = command
 
-        packet.set_eep(kwargs)
+        bit_data, bit_status = Packet.eep.set_values(profile, bit_data, bit_status, kwargs)
         if rorg in [RORG.BS1, RORG.BS4] and not learn:
-            if rorg == RORG.BS1:
-                packet.data[1] |= (1 << 3)
-            if rorg == RORG.BS4:
-                packet.data[4] |= (1 << 3)
-        packet.data[-1] = packet.status
+            bit_data[DB0.BIT_3] = True
 
-        # Parse the built packet, so it corresponds to the received packages
+        data = [int(rorg)] + list(bit_data.to_bytes()) + sender + [bit_status.value]
+        # Always use sub-telegram 3, maximum dbm (as per spec, when sending),
+        # and no security (security not supported as per EnOcean Serial Protocol).
+        optional = [3] + destination + [0xFF] + [0]
+
+        # Create the packet directly from the data, so it corresponds to the received packages
         # For example, stuff like RadioPacket.learn should be set.
-        packet = Packet.parse_msg(packet.build())[2]
+        packet = RadioPacket(packet_type, data, optional)
         packet.rorg = rorg
-        packet.parse_eep(rorg_func, rorg_type, direction, command)
+        packet.rorg_func = rorg_func
+        packet.rorg_type = rorg_type
+        packet._profile = profile
+        packet.parse_eep()
         return packet
 
     def parse(self):
         ''' Parse data from Packet '''
         # Parse status from messages
         if self.rorg in [RORG.RPS, RORG.BS1, RORG.BS4]:
-            self.status = self.data[-1]
+            self.status = self._data[-1]
         if self.rorg == RORG.VLD:
-            self.status = self.optional[-1]
+            self.status = self._optional[-1]
 
         if self.rorg in [RORG.RPS, RORG.BS1, RORG.BS4]:
             # These message types should have repeater count in the last for bits of status.
-            self.repeater_count = enocean.utils.from_bitarray(self._bit_status[4:])
-        return self.parsed
+            self.repeater_count = self.status & 0x0F
+        # Avoid creating Packet.parsed for every packet, it's created when needed.
+        return self._parsed if self._parsed is not None else LazyValues()
 
     def select_eep(self, rorg_func, rorg_type, direction=None, command=None):
         ''' Set EEP based on FUNC and TYPE '''
@@ -267,13 +416,17 @@ class Packet(object):
         self._profile = self.eep.find_profile(self._bit_data, self.rorg, rorg_func, rorg_type, direction, command)
         return self._profile is not None
 
-    def parse_eep(self, rorg_func=None, rorg_type=None, direction=None, command=None):
-        ''' Parse EEP based on FUNC and TYPE '''
+    def parse_eep(self, rorg_func=None, rorg_type=None, direction=None, command=None, fields=None):
+        '''
+        Parse EEP based on FUNC and TYPE.
+        The values in Packet.parsed are decoded when accessed.
+        If fields (list of shortcuts) is given, only those fields are parsed.
+        '''
         # set EEP profile, if demanded
         if rorg_func is not None and rorg_type is not None:
             self.select_eep(rorg_func, rorg_type, direction, command)
         # parse data
-        provides, values = self.eep.get_values(self._profile, self._bit_data, self._bit_status)
+        provides, values = self.eep.get_values(self._profile, self._bit_data, self._bit_status, fields)
         self.parsed.update(values)
         return list(provides)
 
@@ -283,21 +436,17 @@ class Packet(object):
 
     def build(self):
         ''' Build Packet for sending to EnOcean controller '''
-        data_length = len(self.data)
-        ords = [0x55, (data_length >> 8) & 0xFF, data_length & 0xFF, len(self.optional), int(self.packet_type)]
+        data_length = len(self._data)
+        ords = [0x55, (data_length >> 8) & 0xFF, data_length & 0xFF, len(self._optional), int(self.packet_type)]
         ords.append(crc8.calc(ords[1:5]))
-        ords.extend(self.data)
-        ords.extend(self.optional)
+        ords.extend(self._data)
+        ords.extend(self._optional)
         ords.append(crc8.calc(ords[6:]))
         return ords
 
 
 class RadioPacket(Packet):
-    destination = [0xFF, 0xFF, 0xFF, 0xFF]
-    dBm = 0
-    sender = [0xFF, 0xFF, 0xFF, 0xFF]
-    learn = True
-    contains_eep = False
+    __slots__ = ('dBm', 'learn', 'contains_eep')
 
     def __str__(self):
         packet_str = super(RadioPacket, self).__str__()
@@ -309,9 +458,50 @@ class RadioPacket(Packet):
         return Packet.create(PACKET.RADIO_ERP1, rorg, rorg_func, rorg_type,
                              direction, command, destination, sender, learn, **kwargs)
 
+    @staticmethod
+    def create_group(rorg, rorg_func, rorg_type, destinations, direction=None, command=None,
+                     sender=None, learn=False, **kwargs):
+        '''
+        Creates packets with the same values for each destination (list of 4 bytes, or an int).
+        The profile is looked up and the values encoded once, only the destination differs between the packets.
+        Send the packets with Communicator.send_group().
+        '''
+        template = RadioPacket.create(rorg, rorg_func, rorg_type, direction, command,
+                                      [0xFF, 0xFF, 0xFF, 0xFF], sender, learn, **kwargs)
+        packets = []
+        for destination in destinations:
+            if isinstance(destination, int):
+                destination = destination.to_bytes(4, 'big')
+            packet = template.copy()
+            packet.destination = destination
+            packets.append(packet)
+        return packets
+
+    @property
+    def sender(self):
+        return PacketBytes(self, 'sender', self._data[-5:-1])
+
+    @sender.setter
+    def sender(self, value):
+        value = bytes(bytearray(value))
+        if len(value) != 4:
+            raise ValueError('Sender must contain 4 (numeric) values.')
+        self._data = self._data[:-5] + value + self._data[-1:]
+
+    @property
+    def destination(self):
+        return PacketBytes(self, 'destination', self._optional[1:5])
+
+    @destination.setter
+    def destination(self, value):
+        value = bytes(bytearray(value))
+        if len(value) != 4:
+            raise ValueError('Destination must contain 4 (numeric) values.')
+        self._optional = self._optional[:1] + value + self._optional[5:]
+
     @property
     def sender_int(self):
-        return enocean.utils.combine_hex(self.sender)
+        return int.from_bytes(self._data[-5:-1], 'big')
 
     @property
     def sender_hex(self):
@@ -319,33 +509,33 @@ class RadioPacket(Packet):
 
     @property
     def destination_int(self):
-        return enocean.utils.combine_hex(self.destination)
+        return int.from_bytes(self._optional[1:5], 'big')
 
     @property
     def destination_hex(self):
         return enocean.utils.to_hex_string(self.destination)
 
     def parse(self):
-        self.destination = self.optional[1:5]
-        self.dBm = -self.optional[5]
-        self.sender = self.data[-5:-1]
+        self.dBm = -self._optional[5]
         # Default to learn == True, as some devices don't have a learn button
         self.learn = True
+        self.contains_eep = False
 
-        self.rorg = self.data[0]
+        self.rorg = self._data[0]
 
         # parse learn bit and FUNC/TYPE, if applicable
         if self.rorg == RORG.BS1:
             self.learn = not self._bit_data[DB0.BIT_3]
         if self.rorg == RORG.BS4:
-            self.learn = not self._bit_data[DB0.BIT_3]
+            bit_data = self._bit_data
+            self.learn = not bit_data[DB0.BIT_3]
             if self.learn:
-                self.contains_eep = self._bit_data[DB0.BIT_7]
+                self.contains_eep = bit_data[DB0.BIT_7]
                 if self.contains_eep:
                     # Get rorg_func and rorg_type from an unidirectional learn packet
-                    self.rorg_func = enocean.utils.from_bitarray(self._bit_data[DB3.BIT_7:DB3.BIT_1])
-                    self.rorg_type = enocean.utils.from_bitarray(self._bit_data[DB3.BIT_1:DB2.BIT_2])
-                    self.rorg_manufacturer = enocean.utils.from_bitarray(self._bit_data[DB2.BIT_2:DB0.BIT_7])
+                    self.rorg_func = enocean.utils.from_bitarray(bit_data[DB3.BIT_7:DB3.BIT_1])
+                    self.rorg_type = enocean.utils.from_bitarray(bit_data[DB3.BIT_1:DB2.BIT_2])
+                    self.rorg_manufacturer = enocean.utils.from_bitarray(bit_data[DB2.BIT_2:DB0.BIT_7])
                     self.logger.debug('learn received, EEP detected, RORG: 0x%02X, FUNC: 0x%02X, TYPE: 0x%02X, Manufacturer: 0x%02X' % (self.rorg, self.rorg_func, self.rorg_type, self.rorg_manufacturer))  # noqa: E501
 
         return super(RadioPacket, self).parse()
@@ -363,14 +553,9 @@ class UTETeachInPacket(RadioPacket):
     DELETE_ACCEPTED = [True, False]
     EEP_NOT_SUPPORTED = [True, True]
 
-    unidirectional = False
-    response_expected = False
-    number_of_channels = 0xFF
-    rorg_of_eep = RORG.UNDEFINED
-    request_type = NOT_SPECIFIC
-    channel = None
-
-    contains_eep = True
+    __slots__ = (
+        'unidirectional', 'response_expected', 'number_of_channels', 'rorg_of_eep', 'request_type', 'channel',
+    )
 
     @property
     def bidirectional(self):
@@ -386,17 +571,20 @@ class UTETeachInPacket(RadioPacket):
 
     def parse(self):
         super(UTETeachInPacket, self).parse()
-        self.unidirectional = not self._bit_data[DB6.BIT_7]
-        self.response_expected = not self._bit_data[DB6.BIT_6]
-        self.request_type = enocean.utils.from_bitarray(self._bit_data[DB6.BIT_5:DB6.BIT_3])
-        self.rorg_manufacturer = enocean.utils.from_bitarray(self._bit_data[DB3.BIT_2:DB2.BIT_7] + self._bit_data[DB4.BIT_7:DB3.BIT_7])  # noqa: E501
-        self.channel = self.data[2]
-        self.rorg_type = self.data[5]
-        self.rorg_func = self.data[6]
-        self.rorg_of_eep = self.data[7]
+        self.contains_eep = True
+        self.number_of_channels = 0xFF
+        bit_data = self._bit_data
+        self.unidirectional = not bit_data[DB6.BIT_7]
+        self.response_expected = not bit_data[DB6.BIT_6]
+        self.request_type = enocean.utils.from_bitarray(bit_data[DB6.BIT_5:DB6.BIT_3])
+        self.rorg_manufacturer = enocean.utils.from_bitarray(bit_data[DB3.BIT_2:DB2.BIT_7] + bit_data[DB4.BIT_7:DB3.BIT_7])  # noqa: E501
+        self.channel = self._data[2]
+        self.rorg_type = self._data[5]
+        self.rorg_func = self._data[6]
+        self.rorg_of_eep = self._data[7]
         if self.teach_in:
             self.learn = True
-        return self.parsed
+        return self._parsed if self._parsed is not None else LazyValues()
 
     def create_response_packet(self, sender_id, response=TEACHIN_ACCEPTED):
         # Create data:
@@ -416,20 +604,24 @@ class UTETeachInPacket(RadioPacket):
 
 
 class ResponsePacket(Packet):
-    response = 0
-    response_data = []
+    __slots__ = ()
 
-    def parse(self):
-        self.response = self.data[0]
-        self.response_data = self.data[1:]
-        return super(ResponsePacket, self).parse()
+    @property
+    def response(self):
+        return self._data[0] if self._data else 0
+
+    @property
+    def response_data(self):
+        return list(self._data[1:])
 
 
 class EventPacket(Packet):
-    event = 0
-    event_data = []
+    __slots__ = ()
 
-    def parse(self):
-        self.event = self.data[0]
-        self.event_data = self.data[1:]
-        return super(EventPacket, self).parse()
+    @property
+    def event(self):
+        return self._data[0] if self._data else 0
+
+    @property
+    def event_data(self):
+        return list(self._data[1:])
@@ -0,0 +1,150 @@
+# -*- encoding: utf-8 -*-
+from __future__ import print_function, unicode_literals, division, absolute_import
+import logging
+import sqlite3
+import threading
+from collections import namedtuple
+
+from enocean.protocol.packet import Packet, RadioPacket, UTETeachInPacket
+from enocean.protocol.constants import RORG
+
+# EEP of a device. Direction and command are None, if they aren't fixed.
+Device = namedtuple('Device', ['sender', 'rorg', 'rorg_func', 'rorg_type', 'direction', 'command', 'manufacturer'])
+
+
+class DeviceRegistry(object):
+    '''
+    Registry of known devices: the EEP (RORG, FUNC, TYPE, direction, command) used by each sender.
+
+    The devices are stored in an SQLite database at `path` (in memory by default),
+    and loaded into a dict indexed by the sender ID (RadioPacket.sender_int) on creation,
+    so looking up a device doesn't touch the database.
+
+    Passed to a communicator as `registry`, devices are added from teach-in telegrams
+    (4BS telegrams containing the EEP, UTE teach-in), removed by UTE delete requests,
+    and the telegrams of known devices are decoded (Packet.parsed) before they're passed on:
+        registry = DeviceRegistry('devices.sqlite')
+        communicator = SerialCommunicator(registry=registry)
+    '''
+    logger = logging.getLogger('enocean.protocol.DeviceRegistry')
+
+    def __init__(self, path=':memory:'):
+        self.path = path
+        self._lock = threading.Lock()
+        # The communicator thread adds devices, while the registry may be created in another thread.
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS devices ('
+            'sender INTEGER PRIMARY KEY, rorg INTEGER NOT NULL, func INTEGER NOT NULL, type INTEGER NOT NULL, '
+            'direction INTEGER, command INTEGER, manufacturer INTEGER)'
+        )
+        self._connection.commit()
+        self._devices = dict(
+            (row[0], Device(*row))
+            for row in self._connection.execute(
+                'SELECT sender, rorg, func, type, direction, command, manufacturer FROM devices'
+            )
+        )
+        # Resolved data descriptions, by sender and command (None, if the EEP doesn't define commands)
+        self._profiles = {}
+
+    def __len__(self):
+        return len(self._devices)
+
+    def __contains__(self, sender):
+        return sender in self._devices
+
+    def __iter__(self):
+        return iter(list(self._devices.values()))
+
+    def get(self, sender):
+        ''' Returns the Device of the sender ID, None if the device isn't known '''
+        return self._devices.get(sender)
+
+    def add(self, sender, rorg, rorg_func, rorg_type, direction=None, command=None, manufacturer=None):
+        ''' Add or replace the device, returns the Device '''
+        device = Device(sender, rorg, rorg_func, rorg_type, direction, command, manufacturer)
+        with self._lock:
+            if self._devices.get(sender) == device:
+                return device
+            with self._connection:
+                self._connection.execute(
+                    'INSERT OR REPLACE INTO devices (sender, rorg, func, type, direction, command, manufacturer) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)', device
+                )
+            self._devices[sender] = device
+            self._profiles.pop(sender, None)
+        self.logger.info('Device %08X added: %02X-%02X-%02X', sender, rorg, rorg_func, rorg_type)
+        return device
+
+    def remove(self, sender):
+        ''' Remove the device, returns True if it was known '''
+        with self._lock:
+            if sender not in self._devices:
+                return False
+            with self._connection:
+                self._connection.execute('DELETE FROM devices WHERE sender = ?', (sender, ))
+            del self._devices[sender]
+            self._profiles.pop(sender, None)
+        self.logger.info('Device %08X removed', sender)
+        return True
+
+    def close(self):
+        self._connection.close()
+
+    def learn(self, packet):
+        '''
+        Add (or remove) the sender of a teach-in packet, with the EEP it contains.
+        Returns the Device added, None if the packet isn't a teach-in with an EEP.
+        '''
+        if isinstance(packet, UTETeachInPacket):
+            if packet.delete:
+                self.remove(packet.sender_int)
+                return None
+            return self.add(packet.sender_int, packet.rorg_of_eep, packet.rorg_func, packet.rorg_type,
+                            manufacturer=packet.rorg_manufacturer)
+        if isinstance(packet, RadioPacket) and packet.rorg == RORG.BS4 and packet.learn and packet.contains_eep:
+            return self.add(packet.sender_int, packet.rorg, packet.rorg_func, packet.rorg_type,
+                            manufacturer=packet.rorg_manufacturer)
+        return None
+
+    def _profile(self, device, packet):
+        ''' Returns the data description of the packet, resolved once for each device and command '''
+        command = device.command
+        field = Packet.eep.telegrams.get(device.rorg, {}).get(device.rorg_func, {}).get(device.rorg_type)
+        field = None if field is None else field.command
+        if command is None and field is not None:
+            # The command is read from each telegram.
+            bit_data = packet._bit_data
+            if field.offset + field.size > len(bit_data):
+                return None
+            command = bit_data.get(field.offset, field.size)
+        profiles = self._profiles.setdefault(device.sender, {})
+        try:
+            return profiles[command]
+        except KeyError:
+            profile = profiles[command] = Packet.eep.find_profile(
+                None, device.rorg, device.rorg_func, device.rorg_type, device.direction, command)
+            return profile
+
+    def decode(self, packet):
+        '''
+        Decode the packet with the EEP of its sender, setting Packet.parsed.
+        Returns True if the sender is known and the packet was decoded.
+        '''
+        if not isinstance(packet, RadioPacket) or isinstance(packet, UTETeachInPacket):
+            return False
+        device = self._devices.get(packet.sender_int)
+        if device is None or device.rorg != packet.rorg:
+            return False
+        if packet.rorg in (RORG.BS1, RORG.BS4) and packet.learn:
+            # Teach-in telegrams don't contain values.
+            return False
+        profile = self._profile(device, packet)
+        if profile is None:
+            return False
+        packet.rorg_func = device.rorg_func
+        packet.rorg_type = device.rorg_type
+        packet._profile = profile
+        packet.parse_eep()
+        return True
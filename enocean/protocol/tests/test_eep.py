@@ -1,5 +1,7 @@
 # -*- encoding: utf-8 -*-
 from __future__ import print_function, unicode_literals, division, absolute_import
+import json
+import threading
 
 from enocean.protocol.packet import Packet
 from enocean.protocol.eep import EEP
@@ -266,3 +268,108 @@ def test_fails():
     ]))
     assert eep.find_profile(packet._bit_data, 0xD2, 0x01, 0x01) is not None
     assert eep.find_profile(packet._bit_data, 0xD2, 0x01, 0x01, command=-1) is None
+
+
+def test_compiled_decoder():
+    status, buf, packet = Packet.parse_msg(bytearray([
+        0x55,
+        0x00, 0x0A, 0x07, 0x01,
+        0xEB,
+        0xA5, 0x32, 0x20, 0x89, 0x00, 0xDE, 0xAD, 0xBE, 0xEF, 0x00,
+        0x03, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0x00,
+        0x43
+    ]))
+    eep = EEP()
+    profile = eep.find_profile(packet._bit_data, 0xA5, 0x20, 0x01, direction=1)
+    provides, values = eep.get_values(profile, packet._bit_data, packet._bit_status)
+    # Decoder is compiled once per data description.
+    assert eep._get_decoder(profile) is eep._get_decoder(profile)
+    assert list(provides) == ['CV', 'SO', 'ENIE', 'ES', 'BCAP', 'CCO', 'FTS', 'DWO', 'ACO', 'TMP']
+    assert values['CV'] == {'description': 'Current Value', 'unit': '%', 'value': 50.0, 'raw_value': 50}
+    assert values['ES'] == {
+        'description': 'Energy storage sufficiently charged', 'unit': '', 'value': 'true', 'raw_value': 1}
+    assert values == EEP.compile_decoder(profile)(packet._bit_data, packet._bit_status)[1]
+
+
+def test_lazy_values():
+    status, buf, packet = Packet.parse_msg(bytearray([
+        0x55,
+        0x00, 0x0A, 0x07, 0x01,
+        0xEB,
+        0xA5, 0x32, 0x20, 0x89, 0x00, 0xDE, 0xAD, 0xBE, 0xEF, 0x00,
+        0x03, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0x00,
+        0x43
+    ]))
+    assert packet.parse_eep(0x20, 0x01, 1) == ['CV', 'SO', 'ENIE', 'ES', 'BCAP', 'CCO', 'FTS', 'DWO', 'ACO', 'TMP']
+    # Nothing is decoded, until accessed
+    assert len(packet.parsed._pending) == 10
+    assert packet.parsed['CV']['value'] == 50
+    assert len(packet.parsed._pending) == 9
+    assert 'CV' not in packet.parsed._pending
+
+    # Projection, only the requested fields are parsed
+    status, buf, packet = Packet.parse_msg(bytearray([
+        0x55,
+        0x00, 0x0A, 0x07, 0x01,
+        0xEB,
+        0xA5, 0x32, 0x20, 0x89, 0x00, 0xDE, 0xAD, 0xBE, 0xEF, 0x00,
+        0x03, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0x00,
+        0x43
+    ]))
+    assert packet.parse_eep(0x20, 0x01, 1, fields=['TMP', 'CV']) == ['CV', 'TMP']
+    assert list(packet.parsed) == ['CV', 'TMP']
+    assert packet.parsed['CV']['value'] == 50
+    # Parsing another profile keeps the previous fields pending.
+    assert packet.parse_eep(0x20, 0x01, 2, fields=['SP']) == ['SP']
+    assert list(packet.parsed) == ['CV', 'TMP', 'SP']
+    assert sorted(packet.parsed._pending) == ['SP', 'TMP']
+    assert packet.parsed['SP']['value'] == 50
+    assert dict(packet.parsed) == {
+        'CV': packet.parsed['CV'],
+        'TMP': packet.parsed['TMP'],
+        'SP': packet.parsed['SP'],
+    }
+
+    # to_dict() decodes everything, for code requiring an actual dict.
+    status, buf, packet = Packet.parse_msg(bytearray([
+        0x55,
+        0x00, 0x0A, 0x07, 0x01,
+        0xEB,
+        0xA5, 0x32, 0x20, 0x89, 0x00, 0xDE, 0xAD, 0xBE, 0xEF, 0x00,
+        0x03, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0x00,
+        0x43
+    ]))
+    packet.parse_eep(0x20, 0x01, 1)
+    values = packet.parsed.to_dict()
+    assert isinstance(values, dict)
+    assert list(values) == ['CV', 'SO', 'ENIE', 'ES', 'BCAP', 'CCO', 'FTS', 'DWO', 'ACO', 'TMP']
+    assert json.loads(json.dumps(values))['CV']['value'] == 50
+    assert not packet.parsed._pending
+
+
+def test_lazy_values_threads():
+    ''' Concurrent readers never see a field, which isn't decoded yet '''
+    status, buf, packet = Packet.parse_msg(bytearray([
+        0x55,
+        0x00, 0x0A, 0x07, 0x01,
+        0xEB,
+        0xA5, 0x32, 0x20, 0x89, 0x00, 0xDE, 0xAD, 0xBE, 0xEF, 0x00,
+        0x03, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0x00,
+        0x43
+    ]))
+    results = []
+
+    def read(parsed):
+        results.append([parsed[shortcut] for shortcut in ('CV', 'TMP', 'CV', 'TMP')])
+
+    for i in range(50):
+        packet.parsed = None
+        packet.parse_eep(0x20, 0x01, 1)
+        threads = [threading.Thread(target=read, args=(packet.parsed, )) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert len(results) == 200
+    assert all(result[0] is not None and result[0]['value'] == 50 for result in results)
+    assert all(result[1] is not None and result[1] == result[3] for result in results)
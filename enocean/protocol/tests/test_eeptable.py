@@ -0,0 +1,94 @@
+# -*- encoding: utf-8 -*-
+from __future__ import print_function, unicode_literals, division, absolute_import
+import os
+import shutil
+import tempfile
+
+from enocean.protocol import eeptable
+from enocean.protocol.eep import EEP
+
+
+def read_xml():
+    with open(eeptable.XML_PATH, 'rb') as xml_file:
+        return xml_file.read()
+
+
+def test_table_up_to_date():
+    ''' If this fails, EEP.json needs to be regenerated with generate_eep_table.py '''
+    table = eeptable.read_table()
+    assert table is not None
+    assert not eeptable.is_stale(table, read_xml())
+    assert table == eeptable.compile_xml(read_xml())
+
+
+def test_stale_table():
+    xml_data = read_xml()
+    table = eeptable.read_table()
+    assert eeptable.is_stale(None, xml_data)
+    assert eeptable.is_stale(dict(table, version=eeptable.TABLE_VERSION - 1), xml_data)
+    assert eeptable.is_stale(table, xml_data + b' ')
+
+    directory = tempfile.mkdtemp()
+    try:
+        xml_path = os.path.join(directory, 'EEP.xml')
+        table_path = os.path.join(directory, 'EEP.json')
+        shutil.copy(eeptable.XML_PATH, xml_path)
+
+        # Missing table -> compile XML
+        table, compiled = eeptable.load(xml_path, table_path)
+        assert compiled is True
+
+        # Up-to-date table is used as-is
+        eeptable.write_table(table, table_path)
+        table, compiled = eeptable.load(xml_path, table_path)
+        assert compiled is False
+
+        # Modified XML -> compile XML
+        with open(xml_path, 'ab') as xml_file:
+            xml_file.write(b'\n')
+        table, compiled = eeptable.load(xml_path, table_path)
+        assert compiled is True
+        assert table['digest'] == eeptable.digest(read_xml() + b'\n')
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_descriptors():
+    eep = EEP()
+    assert eep.init_ok
+    profile = eep.telegrams[0xD2][0x01][0x01]
+    assert profile.command.shortcut == 'CMD'
+    assert [data.command for data in profile.data] == [4, 1]
+
+    data = eep.find_profile([], 0xA5, 0x02, 0x05)
+    assert data.rorg == 0xA5
+    assert data.func == 0x02
+    assert data.type == 0x05
+    assert len(data.fields) == 1
+    field = data.fields[0]
+    assert field.kind == 'value'
+    assert field.shortcut == 'TMP'
+    assert field.unit == '°C'
+    assert (field.offset, field.size) == (16, 8)
+    assert field.range == (255.0, 0.0)
+    assert field.scale == (0.0, 40.0)
+
+
+def test_item_order():
+    ''' Items and rangeitems of an enum are kept in document order '''
+    table = eeptable.read_table()
+    telegram = [telegram for telegram in table['telegrams'] if telegram[0] == 0xD2][0]
+    types = [function for function in telegram[3] if function[0] == 0x01][0][2]
+    data = [profile for profile in types if profile[0] == 0x01][0][3]
+    field = [field for field in data[0][3] if field[1] == 'OV'][0]
+    assert field[8] == [
+        [0, 'Output value 0% or OFF'],
+        [1, 100, 'Output value {value}% or ON'],
+        [101, 126, 'Not used'],
+        [127, 'output value not valid / not set'],
+    ]
+
+    field = EEP().find_profile([], 0xD2, 0x01, 0x01, command=4).fields[-1]
+    assert field.shortcut == 'OV'
+    assert field.items == ((0, 'Output value 0% or OFF'), (127, 'output value not valid / not set'))
+    assert field.rangeitems == ((1, 100, 'Output value {value}% or ON'), (101, 126, 'Not used'))
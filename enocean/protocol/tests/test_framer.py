@@ -0,0 +1,86 @@
+# -*- encoding: utf-8 -*-
+from __future__ import print_function, unicode_literals, division, absolute_import
+
+from enocean.protocol.framer import PacketFramer
+from enocean.protocol.packet import RadioPacket, ResponsePacket
+from enocean.protocol.constants import PARSE_RESULT
+from enocean.decorators import timing
+
+RADIO = bytearray([
+    0x55,
+    0x00, 0x0A, 0x07, 0x01,
+    0xEB,
+    0xA5, 0x00, 0x00, 0x55, 0x08, 0x01, 0x81, 0xB7, 0x44, 0x00,
+    0x01, 0xFF, 0xFF, 0xFF, 0xFF, 0x2D, 0x00,
+    0x75
+])
+
+RESPONSE = bytearray([
+    0x55,
+    0x00, 0x05, 0x00, 0x02,
+    0xCE,
+    0x00, 0xFF, 0x87, 0xCA, 0x00,
+    0xA3
+])
+
+
+def parse_all(framer):
+    results = []
+    while True:
+        status, packet = framer.parse()
+        if status == PARSE_RESULT.INCOMPLETE:
+            return results
+        results.append((status, packet))
+
+
+def test_byte_by_byte():
+    framer = PacketFramer()
+    results = []
+    for byte in RADIO + RESPONSE:
+        framer.extend([byte])
+        results.extend(parse_all(framer))
+    assert [status for status, _ in results] == [PARSE_RESULT.OK, PARSE_RESULT.OK]
+    assert isinstance(results[0][1], RadioPacket)
+    assert results[0][1].sender_hex == '01:81:B7:44'
+    assert isinstance(results[1][1], ResponsePacket)
+    assert results[1][1].response_data == [0xFF, 0x87, 0xCA, 0x00]
+    assert len(framer) == 0
+
+
+def test_garbage():
+    framer = PacketFramer(bytearray([0x00, 0x12, 0xFF]) + RADIO + bytearray([0x01, 0x02]) + RESPONSE)
+    results = parse_all(framer)
+    assert [status for status, _ in results] == [PARSE_RESULT.OK, PARSE_RESULT.OK]
+    assert framer.remaining() == []
+
+
+def test_resynchronise():
+    # Corrupted header CRC, the frame is skipped.
+    corrupted = bytearray(RADIO)
+    corrupted[5] ^= 0xFF
+    framer = PacketFramer(corrupted + RESPONSE)
+    results = parse_all(framer)
+    assert [status for status, _ in results][0] == PARSE_RESULT.CRC_MISMATCH
+    assert results[-1][0] == PARSE_RESULT.OK
+    assert isinstance(results[-1][1], ResponsePacket)
+
+    # Frame is cut short, so a valid header claims the following frame as its data.
+    # The following frame must still be found.
+    truncated = RADIO[:10]
+    framer = PacketFramer(truncated + RADIO + RESPONSE)
+    results = parse_all(framer)
+    assert results[0][0] == PARSE_RESULT.CRC_MISMATCH
+    assert [type(packet) for status, packet in results if status == PARSE_RESULT.OK] == [RadioPacket, ResponsePacket]
+
+
+@timing(10)
+def test_backlog():
+    framer = PacketFramer()
+    framer.COMPACT_THRESHOLD = 1024
+    framer.extend((RADIO + RESPONSE) * 5000)
+    results = parse_all(framer)
+    assert len(results) == 10000
+    assert all(status == PARSE_RESULT.OK for status, _ in results)
+    assert len(framer) == 0
+    framer.extend(RESPONSE)
+    assert len(framer._buffer) == len(RESPONSE)
@@ -0,0 +1,48 @@
+# -*- encoding: utf-8 -*-
+from __future__ import print_function, unicode_literals, division, absolute_import
+import sys
+import threading
+import subprocess
+
+from enocean.protocol import eep
+from enocean.protocol.packet import Packet
+
+# Maximum time (in milliseconds) importing enocean.protocol.packet may take.
+IMPORT_BUDGET = 150
+
+IMPORT_SCRIPT = '''
+import sys
+import time
+start = time.time()
+import enocean.protocol.packet
+duration = (time.time() - start) * 1e3
+import enocean.protocol.eep
+print('%d %d %.03f' % ('bs4' in sys.modules, enocean.protocol.eep._shared_eep is not None, duration))
+'''
+
+
+def test_import_is_lazy():
+    output = subprocess.check_output([sys.executable, '-c', IMPORT_SCRIPT]).decode('utf-8').split()
+    bs4_imported, eep_loaded, duration = int(output[0]), int(output[1]), float(output[2])
+    print('Importing enocean.protocol.packet took %.03f ms.' % (duration))
+    assert not bs4_imported
+    assert not eep_loaded
+    assert duration < IMPORT_BUDGET, 'Import too slow: %.03f > %.03f' % (duration, IMPORT_BUDGET)
+
+
+def test_shared_eep():
+    instances = []
+
+    def load():
+        instances.append(eep.get_eep())
+
+    threads = [threading.Thread(target=load) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(instances) == 8
+    assert all(instance is instances[0] for instance in instances)
+    assert Packet.eep is instances[0]
+    assert Packet.eep.init_ok
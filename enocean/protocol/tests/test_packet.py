@@ -1,8 +1,8 @@
 # -*- encoding: utf-8 -*-
 from __future__ import print_function, unicode_literals, division, absolute_import
 
-from enocean.protocol.packet import Packet, EventPacket
-from enocean.protocol.constants import PACKET, PARSE_RESULT, EVENT_CODE
+from enocean.protocol.packet import Packet, RadioPacket, EventPacket
+from enocean.protocol.constants import PACKET, RORG, PARSE_RESULT, EVENT_CODE
 from enocean.decorators import timing
 
 
@@ -204,3 +204,14 @@ def test_event_packet():
     assert packet.event == EVENT_CODE.SA_RECLAIM_NOT_SUCCESFUL
     assert packet.event_data == []
     assert packet.optional == []
+
+
+def test_hash():
+    first = RadioPacket.create(RORG.BS4, 0x02, 0x05, sender=[0xDE, 0xAD, 0xBE, 0xEF], TMP=20)
+    second = RadioPacket.create(RORG.BS4, 0x02, 0x05, sender=[0xDE, 0xAD, 0xBE, 0xEF], TMP=20)
+    third = RadioPacket.create(RORG.BS4, 0x02, 0x05, sender=[0xDE, 0xAD, 0xBE, 0xEF], TMP=21)
+    assert first == second
+    assert hash(first) == hash(second)
+    assert first != third
+    assert len(set([first, second, third])) == 2
+    assert first != 'packet'
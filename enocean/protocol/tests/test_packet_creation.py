@@ -333,3 +333,24 @@ def test_fails():
         assert False
     except ValueError:
         assert True
+
+
+def test_create_group():
+    destinations = [[0xDE, 0xAD, 0xBE, i] for i in range(3)] + [0x01020304]
+    packets = RadioPacket.create_group(RORG.VLD, 0x01, 0x01, destinations, command=1,
+                                       sender=[0x01, 0x94, 0xE3, 0xB9], OV=100)
+    assert len(packets) == 4
+    for destination, packet in zip(destinations[:3], packets):
+        created = RadioPacket.create(RORG.VLD, 0x01, 0x01, command=1, destination=destination,
+                                     sender=[0x01, 0x94, 0xE3, 0xB9], OV=100)
+        assert packet == created
+        assert packet.build() == created.build()
+        assert packet.parsed['OV']['raw_value'] == 100
+        assert packet.profile is created.profile
+    assert packets[3].destination == [0x01, 0x02, 0x03, 0x04]
+
+    # Copies are independent.
+    packets[0].sender = [0x01, 0x02, 0x03, 0x04]
+    packets[0].parsed['OV'] = None
+    assert packets[1].sender == [0x01, 0x94, 0xE3, 0xB9]
+    assert packets[1].parsed['OV']['raw_value'] == 100
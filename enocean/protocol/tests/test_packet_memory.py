@@ -0,0 +1,73 @@
+# -*- encoding: utf-8 -*-
+from __future__ import print_function, unicode_literals, division, absolute_import
+import gc
+import json
+import tracemalloc
+
+from enocean.protocol.packet import Packet
+
+# Maximum memory (in bytes) a retained packet may use.
+# Before the packets were slotted and bytes-backed, a RadioPacket used roughly 800 bytes.
+PACKET_BUDGET = 400
+
+RADIO = bytearray([
+    0x55,
+    0x00, 0x0A, 0x07, 0x01,
+    0xEB,
+    0xA5, 0x00, 0x00, 0x55, 0x08, 0x01, 0x81, 0xB7, 0x44, 0x00,
+    0x01, 0xFF, 0xFF, 0xFF, 0xFF, 0x2D, 0x00,
+    0x75
+])
+
+RESPONSE = bytearray([
+    0x55,
+    0x00, 0x05, 0x00, 0x02,
+    0xCE,
+    0x00, 0xFF, 0x87, 0xCA, 0x00,
+    0xA3
+])
+
+
+def bytes_per_packet(msg, count=1000):
+    ''' Measure memory retained per packet, when keeping count packets parsed from msg '''
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        packets = [Packet.parse_msg(msg)[2] for i in range(count)]
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    assert len(packets) == count
+    return sum(stat.size_diff for stat in after.compare_to(before, 'filename')) / count
+
+
+def test_packet_memory():
+    for name, msg in (('RadioPacket', RADIO), ('ResponsePacket', RESPONSE)):
+        size = bytes_per_packet(msg)
+        print('Retained %s uses %.01f bytes.' % (name, size))
+        assert size < PACKET_BUDGET, 'Memory failure: %.01f > %d' % (size, PACKET_BUDGET)
+
+
+def test_no_instance_dict():
+    packet = Packet.parse_msg(RADIO)[2]
+    assert not hasattr(packet, '__dict__')
+    assert packet.sender == [0x01, 0x81, 0xB7, 0x44]
+    assert packet.destination == [0xFF, 0xFF, 0xFF, 0xFF]
+    assert packet.data == list(RADIO[6:16])
+    assert packet.optional == list(RADIO[16:23])
+
+    # Modifying the lists modifies the packet.
+    packet.data[1] = 0xFF
+    assert packet.data[1] == 0xFF
+    packet.data = [0xA5, 0x0F] + packet.data[2:]
+    assert packet.data[1] == 0x0F
+    packet.optional[1:5] = [0x01, 0x02, 0x03, 0x04]
+    assert packet.destination == [0x01, 0x02, 0x03, 0x04]
+    packet.sender[3] = 0x45
+    assert packet.sender == [0x01, 0x81, 0xB7, 0x45]
+    assert packet.data[-2] == 0x45
+    packet.destination = [0xFF, 0xFF, 0xFF, 0xFF]
+    assert packet.optional == [0x01, 0xFF, 0xFF, 0xFF, 0xFF, 0x2D, 0x00]
+    assert isinstance(packet.data, list)
+    assert json.loads(json.dumps(packet.data)) == packet.data
@@ -0,0 +1,84 @@
+# -*- encoding: utf-8 -*-
+from __future__ import print_function, unicode_literals, division, absolute_import
+import os
+import shutil
+import tempfile
+
+from enocean.protocol.registry import DeviceRegistry
+from enocean.protocol.packet import Packet, RadioPacket
+from enocean.protocol.constants import PACKET, RORG
+
+OPTIONAL = [0x01, 0xFF, 0xFF, 0xFF, 0xFF, 0x2D, 0x00]
+
+
+def received(packet):
+    return Packet.from_frame(packet.packet_type, packet.data, packet.optional)
+
+
+def teach_in_4bs():
+    # A5-02-05, manufacturer 0x7FF, LRN type (EEP included)
+    return Packet.from_frame(PACKET.RADIO_ERP1, [0xA5, 0x08, 0x2F, 0xFF, 0x80, 0x01, 0x81, 0xB7, 0x44, 0x00], OPTIONAL)
+
+
+def teach_in_ute(request=0xA0):
+    return Packet.from_frame(
+        PACKET.RADIO_ERP1,
+        [0xD4, request, 0xFF, 0x3E, 0x00, 0x01, 0x01, 0xD2, 0x01, 0x94, 0xE3, 0xB9, 0x00],
+        OPTIONAL,
+    )
+
+
+def test_registry():
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'devices.sqlite')
+        registry = DeviceRegistry(path)
+        assert len(registry) == 0
+        temperature = received(RadioPacket.create(RORG.BS4, 0x02, 0x05, sender=[0x01, 0x81, 0xB7, 0x44], TMP=26.7))
+        assert not registry.decode(temperature)
+
+        device = registry.learn(teach_in_4bs())
+        assert device.rorg == RORG.BS4
+        assert (device.rorg_func, device.rorg_type, device.manufacturer) == (0x02, 0x05, 0x7FF)
+        assert registry.get(0x0181B744) == device
+        # Teach-in telegrams aren't decoded as values.
+        assert not registry.decode(teach_in_4bs())
+        assert registry.decode(temperature)
+        assert (temperature.rorg_func, temperature.rorg_type) == (0x02, 0x05)
+        assert abs(temperature.parsed['TMP']['value'] - 26.7) < 0.2
+
+        assert registry.learn(teach_in_ute()).rorg == RORG.VLD
+        assert registry.learn(temperature) is None
+        registry.close()
+
+        # Loaded from the file
+        registry = DeviceRegistry(path)
+        assert len(registry) == 2
+        assert 0x0194E3B9 in registry
+        # The command of VLD telegrams is read from each telegram.
+        status = received(RadioPacket.create(RORG.VLD, 0x01, 0x01, sender=[0x01, 0x94, 0xE3, 0xB9], command=4, OV=100))
+        assert registry.decode(status)
+        assert status.profile.command == 4
+        assert status.parsed['OV']['raw_value'] == 100
+
+        registry.learn(teach_in_ute(request=0x90))
+        assert 0x0194E3B9 not in registry
+        assert not registry.decode(status)
+        assert [device.sender for device in registry] == [0x0181B744]
+        registry.close()
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_decode():
+    registry = DeviceRegistry()
+    try:
+        registry.add(0x0181B744, RORG.BS4, 0x02, 0x05)
+        packet = received(RadioPacket.create(RORG.BS4, 0x02, 0x05, sender=[0x01, 0x81, 0xB7, 0x44], TMP=20))
+        assert registry.decode(packet)
+        assert round(packet.parsed['TMP']['value']) == 20
+        # Other RORG from a known sender
+        rps = RadioPacket.create(RORG.RPS, 0x02, 0x02, sender=[0x01, 0x81, 0xB7, 0x44])
+        assert not registry.decode(received(rps))
+    finally:
+        registry.close()
@@ -6,6 +6,12 @@ eep = EEP()
 # profiles = eep.
 
 
+def tmp_scale(profile):
+    for field in profile.fields:
+        if field.shortcut == 'TMP':
+            return field.scale
+
+
 def test_first_range():
     offset = -40
     values = range(0x01, 0x0C)
@@ -14,8 +20,8 @@ def test_first_range():
         maximum = minimum + 40
         profile = eep.find_profile([], 0xA5, 0x02, values[i])
 
-        assert minimum == float(profile.find('value', {'shortcut': 'TMP'}).find('scale').find('min').text)
-        assert maximum == float(profile.find('value', {'shortcut': 'TMP'}).find('scale').find('max').text)
+        assert minimum == tmp_scale(profile)[0]
+        assert maximum == tmp_scale(profile)[1]
 
 
 def test_second_range():
@@ -26,15 +32,15 @@ def test_second_range():
         maximum = minimum + 80
         profile = eep.find_profile([], 0xA5, 0x02, values[i])
 
-        assert minimum == float(profile.find('value', {'shortcut': 'TMP'}).find('scale').find('min').text)
-        assert maximum == float(profile.find('value', {'shortcut': 'TMP'}).find('scale').find('max').text)
+        assert minimum == tmp_scale(profile)[0]
+        assert maximum == tmp_scale(profile)[1]
 
 
 def test_rest():
     profile = eep.find_profile([], 0xA5, 0x02, 0x20)
-    assert -10 == float(profile.find('value', {'shortcut': 'TMP'}).find('scale').find('min').text)
-    assert +41.2 == float(profile.find('value', {'shortcut': 'TMP'}).find('scale').find('max').text)
+    assert -10 == tmp_scale(profile)[0]
+    assert +41.2 == tmp_scale(profile)[1]
 
     profile = eep.find_profile([], 0xA5, 0x02, 0x30)
-    assert -40 == float(profile.find('value', {'shortcut': 'TMP'}).find('scale').find('min').text)
-    assert +62.3 == float(profile.find('value', {'shortcut': 'TMP'}).find('scale').find('max').text)
+    assert -40 == tmp_scale(profile)[0]
+    assert +62.3 == tmp_scale(profile)[1]
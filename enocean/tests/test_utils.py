@@ -28,3 +28,51 @@ def test_from_hex_string():
 
     assert enocean.utils.from_hex_string('00:0F:10:16') == [0, 15, 16, 22]
     assert enocean.utils.from_hex_string('00:0F:10:16') == [0x00, 0x0F, 0x10, 0x16]
+
+
+def test_bitarray():
+    from enocean.protocol.constants import DB0, DB1, DB3
+    bits = enocean.utils.BitArray.from_bytes([0x12, 0x34, 0x56, 0x78])
+    assert len(bits) == 32
+    assert int(bits) == 0x12345678
+    assert list(bits) == enocean.utils.to_bitarray([0x12, 0x34, 0x56, 0x78], 32)
+    assert bits == enocean.utils.to_bitarray([0x12, 0x34, 0x56, 0x78], 32)
+
+    # Indexing from the start and from the end (DBx.BIT_y)
+    assert bits[3] is True
+    assert bits[0] is False
+    assert bits[DB0.BIT_3] is True
+    assert bits[DB0.BIT_0] is False
+    assert bits[DB3.BIT_4] is True
+
+    # Slicing
+    assert bits[DB1.BIT_7:DB1.BIT_3] == [False, True, False, True]
+    assert enocean.utils.from_bitarray(bits[DB1.BIT_7:DB0.BIT_7]) == 0x56
+    assert enocean.utils.from_bitarray(bits[0:8] + bits[DB0.BIT_7:]) == 0x1278
+    assert bits.get(8, 8) == 0x34
+
+    # Setting bits and fields
+    bits[DB0.BIT_0] = True
+    assert bits.value == 0x12345679
+    bits[0:8] = 0xAB
+    assert bits.value == 0xAB345679
+    bits[8:12] = [True, True, True, True]
+    assert bits.value == 0xABF45679
+    bits.set(24, 8, 0x1FF)
+    assert bits.value == 0xABF456FF
+    assert bits.to_bytes() == bytearray([0xAB, 0xF4, 0x56, 0xFF])
+
+
+def test_bitarray_fails():
+    bits = enocean.utils.BitArray(0x00, 8)
+    for index in (8, -9):
+        try:
+            bits[index]
+            assert False
+        except IndexError:
+            assert True
+    try:
+        bits.set(4, 8, 0xFF)
+        assert False
+    except IndexError:
+        assert True
@@ -24,6 +24,8 @@ def to_bitarray(data, width=8):
 
 def from_bitarray(data):
     ''' Convert bit array back to integer '''
+    if isinstance(data, BitArray):
+        return data.value
     return int(''.join(['1' if x else '0' for x in data]), 2)
 
 
@@ -39,3 +41,120 @@ def from_hex_string(hex_string):
     if len(reval) == 1:
         return reval[0]
     return reval
+
+
+class BitArray(object):
+    '''
+    Fixed width array of bits, backed by a single integer.
+    Bits are indexed from the most significant bit, like the lists returned by to_bitarray().
+    Negative indexes count from the least significant bit, so DB0.BIT_0 etc. from
+    enocean.protocol.constants can be used as indexes and in slices.
+    Slicing returns a new BitArray, and fields are read and written with shifts and masks.
+    '''
+    __slots__ = ('value', 'width')
+
+    def __init__(self, value=0, width=8):
+        self.value = value
+        self.width = width
+
+    @classmethod
+    def from_bytes(cls, data):
+        ''' Create from a list of integers, bytes or bytearray '''
+        return cls(int.from_bytes(bytearray(data), 'big'), len(data) * 8)
+
+    @classmethod
+    def from_bits(cls, bits):
+        ''' Create from an iterable of booleans, such as the lists returned by to_bitarray() '''
+        if isinstance(bits, BitArray):
+            return cls(bits.value, bits.width)
+        value = 0
+        width = 0
+        for bit in bits:
+            value = (value << 1) | (1 if bit else 0)
+            width += 1
+        return cls(value, width)
+
+    def to_bytes(self):
+        return bytearray(self.value.to_bytes((self.width + 7) // 8, 'big'))
+
+    def copy(self):
+        return BitArray(self.value, self.width)
+
+    def _index(self, index):
+        if index < 0:
+            index += self.width
+        if index < 0 or index >= self.width:
+            raise IndexError('BitArray index out of range')
+        return index
+
+    def _slice(self, key):
+        start, stop, step = key.indices(self.width)
+        if step != 1:
+            raise ValueError('BitArray slices do not support steps')
+        return start, max(stop - start, 0)
+
+    def get(self, offset, size):
+        ''' Get field of size bits, starting at offset, as an integer '''
+        # As with slicing, fields continuing past the end are truncated.
+        size = min(size, self.width - offset)
+        if size <= 0:
+            raise ValueError('Field at offset %d is out of range' % (offset))
+        return (self.value >> (self.width - offset - size)) & ((1 << size) - 1)
+
+    def set(self, offset, size, value):
+        ''' Set field of size bits, starting at offset, to given integer '''
+        shift = self.width - offset - size
+        if shift < 0 or offset < 0:
+            raise IndexError('Field at offset %d is out of range' % (offset))
+        mask = ((1 << size) - 1) << shift
+        self.value = (self.value & ~mask) | ((value << shift) & mask)
+
+    def __len__(self):
+        return self.width
+
+    def __int__(self):
+        return self.value
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, size = self._slice(key)
+            if size == 0:
+                return BitArray(0, 0)
+            return BitArray(self.get(start, size), size)
+        return (self.value >> (self.width - 1 - self._index(key))) & 0x01 == 1
+
+    def __setitem__(self, key, value):
+        if isinstance(key, slice):
+            start, size = self._slice(key)
+            if not isinstance(value, int):
+                value = from_bitarray(value) if len(value) else 0
+            self.set(start, size, value)
+            return
+        self.set(self._index(key), 1, 1 if value else 0)
+
+    def __iter__(self):
+        for shift in range(self.width - 1, -1, -1):
+            yield (self.value >> shift) & 0x01 == 1
+
+    def __add__(self, other):
+        if not isinstance(other, BitArray):
+            other = BitArray.from_bits(other)
+        return BitArray((self.value << other.width) | other.value, self.width + other.width)
+
+    def __eq__(self, other):
+        if isinstance(other, BitArray):
+            return self.width == other.width and self.value == other.value
+        if isinstance(other, (list, tuple)):
+            return list(self) == [bool(bit) for bit in other]
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    __hash__ = None
+
+    def __repr__(self):
+        return 'BitArray(0b%s, %d)' % (bin(self.value)[2:].zfill(self.width), self.width)
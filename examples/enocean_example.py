@@ -4,6 +4,7 @@ from enocean.consolelogger import init_logging
 import enocean.utils
 from enocean.communicators.serialcommunicator import SerialCommunicator
 from enocean.protocol.packet import RadioPacket
+from enocean.protocol.registry import DeviceRegistry
 from enocean.protocol.constants import PACKET, RORG
 import sys
 import traceback
@@ -23,7 +24,8 @@ def assemble_radio_packet(transmitter_id):
 
 
 init_logging()
-communicator = SerialCommunicator()
+# Devices taught in are remembered, and their packets decoded automatically.
+communicator = SerialCommunicator(registry=DeviceRegistry('devices.sqlite'))
 communicator.start()
 print('The Base ID of your module is %s.' % enocean.utils.to_hex_string(communicator.base_id))
 
@@ -36,6 +38,11 @@ while communicator.is_alive():
     try:
         # Loop to empty the queue...
         packet = communicator.receive.get(block=True, timeout=1)
+        if packet.packet_type == PACKET.RADIO_ERP1 and packet.profile is not None:
+            # decoded with the EEP of a known device
+            for k in packet.parsed:
+                print('%s: %s' % (k, packet.parsed[k]))
+            continue
         if packet.packet_type == PACKET.RADIO_ERP1 and packet.rorg == RORG.VLD:
             packet.select_eep(0x05, 0x00)
             packet.parse_eep()
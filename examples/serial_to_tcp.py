@@ -2,30 +2,22 @@
 # -*- encoding: utf-8 -*-
 from enocean.consolelogger import init_logging
 from enocean.communicators.serialcommunicator import SerialCommunicator
-from enocean.communicators.utils import send_to_tcp_socket
-import sys
-import traceback
-
-try:
-    import queue
-except ImportError:
-    import Queue as queue
+from enocean.communicators.forwarder import TCPForwarder
+import time
 
 init_logging()
-communicator = SerialCommunicator()
+# Forward all received packets to the TCPCommunicator, over a persistent connection.
+forwarder = TCPForwarder('localhost', 9637)
+forwarder.start()
+communicator = SerialCommunicator(callback=forwarder.send)
 communicator.start()
 while communicator.is_alive():
     try:
-        # Loop to empty the queue...
-        packet = communicator.receive.get(block=True, timeout=1)
-        send_to_tcp_socket('localhost', 9637, packet)
-    except queue.Empty:
-        continue
+        time.sleep(1)
     except KeyboardInterrupt:
         break
-    except Exception:
-        traceback.print_exc(file=sys.stdout)
-        break
 
 if communicator.is_alive():
     communicator.stop()
+forwarder.stop()
+forwarder.join(5)
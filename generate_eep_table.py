@@ -0,0 +1,10 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+from __future__ import print_function, unicode_literals, division, absolute_import
+from enocean.protocol import eeptable
+
+with open(eeptable.XML_PATH, 'rb') as xml_file:
+    table = eeptable.compile_xml(xml_file.read())
+
+eeptable.write_table(table)
+print('Wrote EEP table version %d (EEP %s) to %s' % (table['version'], table['eep_version'], eeptable.TABLE_PATH))
@@ -20,7 +20,7 @@ setup(
         'examples/enocean_example.py',
     ],
     package_data={
-        '': ['EEP.xml']
+        '': ['EEP.xml', 'EEP.json']
     },
     install_requires=[
         'enum-compat>=0.0.2',